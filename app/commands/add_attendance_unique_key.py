@@ -0,0 +1,109 @@
+# app/commands/add_attendance_unique_key.py
+"""
+Thêm khoá unique (employee_id, date) cho bảng attendances đã có sẵn
+(create_all không sửa bảng cũ). Clock-in / clock-out cần khoá này.
+
+    python -m app.commands.add_attendance_unique_key            # báo trùng rồi dừng
+    python -m app.commands.add_attendance_unique_key --dedupe   # gộp bản ghi trùng rồi thêm khoá
+
+--dedupe giữ bản ghi có id nhỏ nhất của mỗi (nhân viên, ngày), lấy giờ vào
+sớm nhất + giờ ra muộn nhất, xoá các bản còn lại (có ghi tombstone).
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, func
+
+from app.database import Base, SessionLocal, engine
+from app.models import analytics, attendance, employee, leave_request, payroll  # noqa: F401
+from app.models.attendance import Attendance, AttendanceTombstone
+from app.services.attendance_rollup import refresh_rollups
+from app.services.payroll_service import mark_payroll_dirty
+
+UNIQUE_NAME = "uq_attendances_employee_date"
+OLD_INDEX_NAME = "ix_attendances_employee_date"
+
+
+def find_duplicates(db):
+    return (
+        db.query(Attendance.employee_id, Attendance.date, func.count(Attendance.id))
+        .group_by(Attendance.employee_id, Attendance.date)
+        .having(func.count(Attendance.id) > 1)
+        .all()
+    )
+
+
+def dedupe(db, duplicates) -> int:
+    removed = 0
+    now = datetime.utcnow()
+    for emp_id, d, _ in duplicates:
+        rows = (
+            db.query(Attendance)
+            .filter(Attendance.employee_id == emp_id, Attendance.date == d)
+            .order_by(Attendance.id)
+            .all()
+        )
+        keep, extra = rows[0], rows[1:]
+        check_ins = [r.check_in for r in rows if r.check_in is not None]
+        check_outs = [r.check_out for r in rows if r.check_out is not None]
+        keep.check_in = min(check_ins) if check_ins else None
+        keep.check_out = max(check_outs) if check_outs else None
+        keep.updated_at = now
+        for r in extra:
+            db.add(
+                AttendanceTombstone(
+                    attendance_id=r.id, employee_id=r.employee_id, date=r.date, deleted_at=now
+                )
+            )
+            db.delete(r)
+            removed += 1
+
+    db.flush()
+    keys = {(emp_id, d.year, d.month) for emp_id, d, _ in duplicates}
+    refresh_rollups(db, keys)
+    mark_payroll_dirty(db, keys)
+    db.commit()
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add unique (employee_id, date) to attendances")
+    parser.add_argument("--dedupe", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    # đọc cấu trúc thật trong DB (model đã khai báo sẵn khoá mới)
+    table = Table(Attendance.__tablename__, MetaData(), autoload_with=engine)
+    existing = {ix.name: ix for ix in table.indexes}
+    if UNIQUE_NAME in existing or any(
+        uq.name == UNIQUE_NAME for uq in table.constraints
+    ):
+        print(f"✅ {UNIQUE_NAME} đã có, không cần làm gì")
+        return
+
+    db = SessionLocal()
+    try:
+        duplicates = find_duplicates(db)
+        if duplicates:
+            if not args.dedupe:
+                for emp_id, d, n in duplicates[:20]:
+                    print(f"  employee_id={emp_id} date={d}: {n} bản ghi")
+                print(f"❌ {len(duplicates)} cặp (nhân viên, ngày) bị trùng. Chạy lại với --dedupe")
+                sys.exit(1)
+            removed = dedupe(db, duplicates)
+            print(f"🧹 Đã gộp {len(duplicates)} cặp trùng, xoá {removed} bản ghi")
+    finally:
+        db.close()
+
+    unique = next(ix for ix in Attendance.__table__.indexes if ix.name == UNIQUE_NAME)
+    unique.create(bind=engine)
+    # index thường cũ cùng cột giờ thừa
+    if OLD_INDEX_NAME in existing:
+        existing[OLD_INDEX_NAME].drop(bind=engine)
+    print(f"✅ Đã thêm {UNIQUE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# app/commands/ensure_indexes.py
+"""
+Tạo các index thường đã khai báo trong model nhưng DB cũ chưa có
+(create_all chỉ tạo bảng mới, không thêm index vào bảng đã tồn tại).
+
+    python -m app.commands.ensure_indexes            # tạo index còn thiếu
+    python -m app.commands.ensure_indexes --dry-run  # chỉ liệt kê
+
+Index unique cần kiểm tra dữ liệu trùng trước nên không tạo ở đây:
+uq_attendances_employee_date -> python -m app.commands.add_attendance_unique_key
+Index trên cột DB cũ chưa có (vd. attendances.updated_at) bị bỏ qua ->
+chạy python -m app.commands.migrate_schema trước.
+"""
+import argparse
+
+from sqlalchemy import MetaData, Table
+
+from app.database import Base, engine
+from app.models import (  # noqa: F401  (đăng ký mọi bảng)
+    analytics,
+    attendance,
+    compliance,
+    employee,
+    leave_request,
+    payroll,
+    performance_review,
+    report_job,
+    user,
+)
+
+# index cũ đã được index mới (cột đầu giống nhau) thay thế
+SUPERSEDED = {
+    "attendances": ["ix_attendances_date"],  # -> ix_attendances_date_id (date, id)
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create missing model indexes")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    created = dropped = 0
+    for table in Base.metadata.sorted_tables:
+        # đọc index thật trong DB (model luôn có đủ index đã khai báo)
+        reflected = Table(table.name, MetaData(), autoload_with=engine)
+        existing = {ix.name: ix for ix in reflected.indexes}
+        for ix in sorted(table.indexes, key=lambda i: i.name):
+            if ix.name in existing:
+                continue
+            if ix.unique:
+                print(f"⚠️  {table.name}.{ix.name} (unique) chưa có - dùng lệnh riêng để thêm")
+                continue
+            if any(c.name not in reflected.columns for c in ix.columns):
+                print(f"⚠️  {table.name}.{ix.name} thiếu cột - chạy python -m app.commands.migrate_schema trước")
+                continue
+            print(f"➕ {table.name}.{ix.name} ({', '.join(c.name for c in ix.columns)})")
+            if not args.dry_run:
+                ix.create(bind=engine)
+            created += 1
+
+        for name in SUPERSEDED.get(table.name, []):
+            if name in existing:
+                print(f"➖ {table.name}.{name} (đã được thay thế)")
+                if not args.dry_run:
+                    existing[name].drop(bind=engine)
+                dropped += 1
+
+    suffix = " (dry-run)" if args.dry_run else ""
+    print(f"✅ Tạo {created} index, bỏ {dropped} index cũ{suffix}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# app/commands/migrate_schema.py
+"""
+Thêm các cột mới vào bảng đã có sẵn của DB cũ (create_all chỉ tạo bảng
+mới, không thêm cột vào bảng đã tồn tại). Chạy lại nhiều lần không sao:
+cột nào có rồi thì bỏ qua.
+
+    python -m app.commands.migrate_schema            # thêm cột còn thiếu
+    python -m app.commands.migrate_schema --dry-run  # chỉ liệt kê
+
+Dòng cũ để NULL ở các cột mới (code đọc đã xử lý NULL). Chạy trước
+ensure_indexes (ix_attendances_updated_at cần cột attendances.updated_at).
+"""
+import argparse
+
+from sqlalchemy import MetaData, Table
+from sqlalchemy.schema import CreateColumn
+
+from app.database import Base, engine
+from app.models import (  # noqa: F401  (đăng ký mọi bảng)
+    analytics,
+    attendance,
+    compliance,
+    employee,
+    leave_request,
+    payroll,
+    performance_review,
+    report_job,
+    user,
+)
+
+# bảng -> các cột được thêm sau khi bảng đã có dữ liệu
+ADDED_COLUMNS = {
+    "payrolls": ["updated_at"],  # ETag / Last-Modified phiếu lương
+    "attendances": ["created_at", "updated_at"],  # xuất thay đổi theo cursor
+}
+
+
+def missing_columns(conn):
+    """[(bảng, cột model)] còn thiếu trong DB"""
+    missing = []
+    for table_name, names in ADDED_COLUMNS.items():
+        if not engine.dialect.has_table(conn, table_name):
+            continue  # bảng chưa có -> create_all tạo đủ cột
+        reflected = Table(table_name, MetaData(), autoload_with=conn)
+        table = Base.metadata.tables[table_name]
+        for name in names:
+            if name not in reflected.columns:
+                missing.append((table_name, table.columns[name]))
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add new model columns to existing tables")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        missing = missing_columns(conn)
+        for table_name, column in missing:
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            print(f"➕ {table_name}.{ddl}")
+            if not args.dry_run:
+                conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {ddl}")
+
+    Base.metadata.create_all(bind=engine)
+    suffix = " (dry-run)" if args.dry_run else ""
+    print(f"✅ Thêm {len(missing)} cột{suffix}")
+
+
+if __name__ == "__main__":
+    main()
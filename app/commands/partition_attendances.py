@@ -0,0 +1,121 @@
+# app/commands/partition_attendances.py
+"""
+Partition bảng attendances theo tháng (PostgreSQL 12+).
+
+    # 1 lần: chuyển bảng hiện có sang bảng partition (khoá bảng -> chạy lúc vắng)
+    python -m app.commands.partition_attendances convert [--keep-legacy]
+    # định kỳ (cron hằng tháng; app cũng tự chạy lúc khởi động)
+    python -m app.commands.partition_attendances create-future [--months 3]
+    # lưu trữ tháng cũ: DETACH -> dump CSV gzip -> DROP
+    python -m app.commands.partition_attendances archive [--retention-months 36] [--out DIR] [--keep-tables] [--dry-run]
+    # xem danh sách partition
+    python -m app.commands.partition_attendances list
+
+Mặc định lấy từ env ATTENDANCE_PARTITION_AHEAD_MONTHS, ATTENDANCE_RETENTION_MONTHS,
+ATTENDANCE_ARCHIVE_DIR. Khôi phục 1 tháng đã lưu trữ:
+    CREATE TABLE attendances_y2022m01 (LIKE attendances INCLUDING DEFAULTS);
+    \\copy attendances_y2022m01 FROM PROGRAM 'gzip -dc attendances_y2022m01.csv.gz' CSV HEADER
+    ALTER TABLE attendances ATTACH PARTITION attendances_y2022m01
+        FOR VALUES FROM ('2022-01-01') TO ('2022-02-01');
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from app.database import Base, engine
+from app.models import analytics, attendance, employee, leave_request, payroll  # noqa: F401
+from app.services.attendance_partitions import (
+    AHEAD_MONTHS,
+    ARCHIVE_DIR,
+    RETENTION_MONTHS,
+    PartitionError,
+    archive_cutoff,
+    archive_partitions,
+    convert_to_partitioned,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+
+def cmd_convert(args):
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print("✅ attendances đã là bảng partition, không cần làm gì")
+            return
+        stats = convert_to_partitioned(conn, ahead=args.months, keep_legacy=args.keep_legacy)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE attendances")
+    print(f"✅ Đã chuyển {stats['rows']} dòng sang {stats['partitions']} partition tháng")
+
+
+def cmd_create_future(args):
+    with engine.begin() as conn:
+        created = ensure_partitions(conn, ahead=args.months)
+    for name in created:
+        print(f"➕ {name}")
+    print(f"✅ Tạo {len(created)} partition mới")
+
+
+def cmd_archive(args):
+    cutoff = archive_cutoff(retention_months=args.retention_months)
+    print(f"📦 Lưu trữ các tháng trước {cutoff} vào {args.out}")
+    archived = archive_partitions(
+        engine,
+        retention_months=args.retention_months,
+        out_dir=args.out,
+        drop=not args.keep_tables,
+        dry_run=args.dry_run,
+    )
+    for item in archived:
+        if args.dry_run:
+            print(f"  {item['partition']}")
+        else:
+            print(f"  {item['partition']}: {item['rows']} dòng -> {item['file']}")
+    suffix = " (dry-run)" if args.dry_run else ""
+    print(f"✅ {len(archived)} partition{suffix}")
+
+
+def cmd_list(args):
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            print("attendances chưa partition")
+            return
+        for name, lo, hi in list_partitions(conn):
+            print(f"  {name}: {lo} -> {hi}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly partitions for attendances (PostgreSQL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert")
+    p.add_argument("--months", type=int, default=AHEAD_MONTHS, help="số tháng tạo sẵn phía trước")
+    p.add_argument("--keep-legacy", action="store_true", help="giữ bảng cũ là attendances_legacy")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("create-future")
+    p.add_argument("--months", type=int, default=AHEAD_MONTHS)
+    p.set_defaults(func=cmd_create_future)
+
+    p = sub.add_parser("archive")
+    p.add_argument("--retention-months", type=int, default=RETENTION_MONTHS)
+    p.add_argument("--out", type=Path, default=ARCHIVE_DIR)
+    p.add_argument("--keep-tables", action="store_true", help="chỉ detach + dump, không DROP")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("list")
+    p.set_defaults(func=cmd_list)
+
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    try:
+        args.func(args)
+    except PartitionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
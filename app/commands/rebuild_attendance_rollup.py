@@ -0,0 +1,43 @@
+# app/commands/rebuild_attendance_rollup.py
+"""
+Dựng lại bảng attendance_monthly_rollup từ dữ liệu chấm công gốc.
+Bắt buộc 1 lần khi nâng cấp DB cũ (app cũng tự backfill nền sau khởi động, chỉ
+1 worker chạy; tháng nào chưa dựng xong thì đọc thẳng attendances).
+
+    python -m app.commands.rebuild_attendance_rollup
+    python -m app.commands.rebuild_attendance_rollup --year 2025 --month 12
+"""
+import argparse
+
+from app.database import Base, SessionLocal, engine
+from app.models import attendance  # noqa: F401  (đăng ký bảng)
+from app.services.attendance_rollup import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild attendance_monthly_rollup")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    args = parser.parse_args()
+
+    if args.month is not None and args.year is None:
+        parser.error("--month cần đi kèm --year")
+
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[
+            attendance.AttendanceMonthlyRollup.__table__,
+            attendance.AttendanceRollupMonth.__table__,
+        ],
+    )
+
+    db = SessionLocal()
+    try:
+        written = rebuild_rollups(db, args.year, args.month)
+        print(f"✅ Rebuilt attendance rollup: {written} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# app/commands/refresh_analytics_cube.py
+"""
+Tính lại analytics cube (chạy định kỳ bằng cron / Task Scheduler).
+
+    python -m app.commands.refresh_analytics_cube                 # các tháng bị đánh dấu
+    python -m app.commands.refresh_analytics_cube --year 2025     # ép tính lại cả năm
+    python -m app.commands.refresh_analytics_cube --year 2025 --month 12
+"""
+import argparse
+
+from app.database import Base, SessionLocal, engine
+from app.models import analytics, attendance, employee, leave_request, payroll  # noqa: F401
+from app.services.analytics_cube import refresh_months, refresh_stale_months
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh analytics_cube")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    args = parser.parse_args()
+
+    if args.month is not None and args.year is None:
+        parser.error("--month cần đi kèm --year")
+
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[analytics.AnalyticsCube.__table__, analytics.AnalyticsStaleMonth.__table__],
+    )
+
+    db = SessionLocal()
+    try:
+        if args.year is None:
+            result = refresh_stale_months(db)
+        else:
+            months = [args.month] if args.month is not None else range(1, 13)
+            result = refresh_months(db, [(args.year, m) for m in months])
+        print(f"✅ Refreshed analytics cube: {result['months']} months, {result['cells']} cells")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -48,37 +48,51 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-# ====== LẤY USER TỪ TOKEN ======
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+# ====== ĐỌC TOKEN ======
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Không thể xác thực người dùng",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def decode_access_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
 
-        username = payload.get("username")
-        role = payload.get("role")
-
-        token_data = TokenData(
+        return TokenData(
             sub=int(user_id),
-            username=username,
-            role=role,
+            username=payload.get("username"),
+            role=payload.get("role"),
+            employee_id=payload.get("employee_id"),
+            has_employee_claim="employee_id" in payload,
         )
-    except JWTError:
-        raise credentials_exception
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """
+    Chỉ giải mã JWT, KHÔNG query DB: dùng cho endpoint gọi rất dày
+    (chấm công giờ cao điểm). Đổi quyền / xoá user chỉ có hiệu lực khi token hết hạn.
+    """
+    return decode_access_token(token)
+
+
+# ====== LẤY USER TỪ TOKEN ======
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    token_data = decode_access_token(token)
 
     user = db.query(User).filter(User.id == token_data.sub).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
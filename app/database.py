@@ -1,7 +1,10 @@
 import os
+import tempfile
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # ✅ load .env ở ROOT project (auto đúng kể cả chạy uvicorn ở đâu)
@@ -22,3 +25,92 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def upsert(db, model, rows, conflict_cols, update_cols=(), update_exprs=None):
+    """
+    INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE cho MySQL, Postgres, SQLite.
+    - rows: list dict cùng bộ cột; chạy executemany trên 1 câu lệnh đã compile
+      (cache được), driver tự gộp thành INSERT nhiều dòng
+    - update_cols: các cột lấy theo giá trị mới khi trùng khoá
+    - update_exprs: hàm nhận "dòng mới" (excluded/inserted) -> dict biểu thức
+    Không có gì để update -> chỉ bỏ qua dòng trùng (insert-ignore).
+    """
+    if not rows:
+        return None
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert chưa hỗ trợ dialect {dialect}")
+
+    stmt = insert(model.__table__)
+    new = stmt.inserted if dialect == "mysql" else stmt.excluded
+
+    set_ = {col: new[col] for col in update_cols}
+    if update_exprs is not None:
+        set_.update(update_exprs(new))
+
+    if dialect == "mysql":
+        # MySQL không có DO NOTHING -> gán lại chính cột khoá (no-op)
+        col = conflict_cols[0]
+        stmt = stmt.on_duplicate_key_update(set_ or {col: model.__table__.c[col]})
+    elif set_:
+        stmt = stmt.on_conflict_do_update(index_elements=conflict_cols, set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_cols)
+
+    return db.execute(stmt, rows)
+
+
+@contextmanager
+def leader_lock(name: str):
+    """
+    Khoá dùng chung giữa mọi worker/máy chạy app (không chờ): yield True nếu
+    giành được, False nếu worker khác đang giữ. Tự nhả khi ra khỏi with
+    hoặc khi connection đứt (process chết).
+    - MySQL: GET_LOCK, Postgres: pg_try_advisory_lock (giữ trên 1 connection riêng)
+    - SQLite: flock file lock cạnh thư mục tạm (chỉ 1 máy dùng được SQLite)
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        import fcntl
+
+        path = Path(tempfile.gettempdir()) / f"hr_{zlib.crc32(DATABASE_URL.encode())}_{name}.lock"
+        with open(path, "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return
+
+    with engine.connect() as conn:
+        if dialect == "mysql":
+            acquire = text("SELECT GET_LOCK(:key, 0)")
+            release = text("SELECT RELEASE_LOCK(:key)")
+            key = name
+        elif dialect == "postgresql":
+            acquire = text("SELECT pg_try_advisory_lock(:key)")
+            release = text("SELECT pg_advisory_unlock(:key)")
+            key = zlib.crc32(name.encode())
+        else:
+            raise NotImplementedError(f"leader_lock chưa hỗ trợ dialect {dialect}")
+
+        got = bool(conn.execute(acquire, {"key": key}).scalar())
+        conn.commit()  # lock theo session, không theo transaction
+        try:
+            yield got
+        finally:
+            if got:
+                conn.execute(release, {"key": key})
+                conn.commit()
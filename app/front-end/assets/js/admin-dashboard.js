@@ -258,6 +258,70 @@ async function loadDashboard() {
     }
 }
 
+// ---------- LIVE UPDATE (SSE /dashboard/stream) ----------
+// Server đẩy delta khi có chấm công / đơn nghỉ mới -> khỏi gọi lại /stats/overview
+let dashboardStream = null;
+let attendanceReloadTimer = null;
+
+function addToCard(id, delta) {
+    const el = document.getElementById(id);
+    const current = Number(el.textContent);
+    if (!delta || Number.isNaN(current)) return;
+    el.textContent = current + delta;
+}
+
+function connectDashboardStream() {
+    if (dashboardStream || !window.EventSource) return;
+
+    // EventSource không gửi được header Authorization -> token đi qua query
+    dashboardStream = new EventSource(
+        `${API_BASE_URL}/dashboard/stream?token=${encodeURIComponent(token)}`
+    );
+
+    dashboardStream.addEventListener("snapshot", (e) => {
+        const data = JSON.parse(e.data);
+        document.getElementById("totalEmployees").textContent = data.total_employees;
+        document.getElementById("todayAttendance").textContent = data.today_attendance;
+        document.getElementById("pendingLeaves").textContent = data.pending_leaves;
+        document.getElementById("totalSalary").textContent =
+            data.current_month_total_salary.toLocaleString("vi-VN") + " đ";
+    });
+
+    dashboardStream.addEventListener("attendance", (e) => {
+        const ev = JSON.parse(e.data);
+        addToCard("todayAttendance", ev.delta.todays_attendance_count);
+        // giờ cao điểm có hàng trăm lượt chấm / phút -> gom lại, tải bảng 1 lần
+        if (views.attendance?.classList.contains("active") && !attendanceReloadTimer) {
+            attendanceReloadTimer = setTimeout(() => {
+                attendanceReloadTimer = null;
+                loadAttendance();
+            }, 2000);
+        }
+    });
+
+    dashboardStream.addEventListener("leave", (e) => {
+        const ev = JSON.parse(e.data);
+        addToCard("pendingLeaves", ev.delta.pending_leave_requests);
+        if (views.leaves?.classList.contains("active")) loadLeaves();
+    });
+
+    dashboardStream.addEventListener("payroll", (e) => {
+        const ev = JSON.parse(e.data);
+        const now = new Date();
+        if (ev.year === now.getFullYear() && ev.month === now.getMonth() + 1) {
+            loadDashboard();
+        }
+    });
+
+    // lỗi mạng thì trình duyệt tự nối lại (retry do server gửi);
+    // token hết hạn (401) thì EventSource đóng hẳn -> thôi
+    dashboardStream.onerror = () => {
+        if (dashboardStream.readyState === EventSource.CLOSED) {
+            dashboardStream = null;
+        }
+    };
+}
+
 // =====================================================================
 //                              USERS
 // =====================================================================
@@ -494,19 +558,29 @@ btnResetEmployeeForm.addEventListener("click", (e) => {
 // =====================================================================
 const attForm = document.getElementById("attendanceFilterForm");
 const attTableBody = document.querySelector("#attendanceTable tbody");
+const btnAttLoadMore = document.getElementById("btnAttLoadMore");
+let attNextCursor = null;
 
-async function loadAttendance() {
+// append = true: nối trang sau (cursor) vào bảng thay vì tải lại từ đầu
+async function loadAttendance(append = false) {
     try {
         const empId = document.getElementById("attEmployeeId").value;
-        const dateVal = document.getElementById("attDate").value;
+        const fromDate = document.getElementById("attFromDate").value;
+        const toDate = document.getElementById("attToDate").value;
+        const department = document.getElementById("attDepartment").value.trim();
+        const status = document.getElementById("attStatus").value;
 
         const params = new URLSearchParams();
         if (empId) params.append("employee_id", empId);
-        if (dateVal) params.append("work_date", dateVal);
+        if (fromDate) params.append("from_date", fromDate);
+        if (toDate) params.append("to_date", toDate);
+        if (department) params.append("department", department);
+        if (status) params.append("status", status);
+        if (append && attNextCursor) params.append("cursor", attNextCursor);
 
         const data = await apiGet(`/attendances?${params.toString()}`);
-        attTableBody.innerHTML = "";
-        data.forEach(a => {
+        if (!append) attTableBody.innerHTML = "";
+        data.items.forEach(a => {
             const tr = document.createElement("tr");
             tr.innerHTML = `
                 <td>${a.id}</td>
@@ -517,12 +591,16 @@ async function loadAttendance() {
             `;
             attTableBody.appendChild(tr);
         });
+        attNextCursor = data.next_cursor;
+        btnAttLoadMore.style.display = attNextCursor ? "" : "none";
     } catch (err) {
         console.error(err);
         alert("Không tải được dữ liệu chấm công");
     }
 }
 
+btnAttLoadMore.addEventListener("click", () => loadAttendance(true));
+
 attForm.addEventListener("submit", (e) => {
     e.preventDefault();
     loadAttendance();
@@ -1133,3 +1211,4 @@ if (heatmapForm) {
 //                              INIT
 // =====================================================================
 showView("dashboard");
+connectDashboardStream();
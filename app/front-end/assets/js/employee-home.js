@@ -115,23 +115,26 @@ async function loadProfile() {
 // ====== ATTENDANCE ======
 const attForm = document.getElementById("attFilterForm");
 const attTableBody = document.querySelector("#attTable tbody");
+const btnAttLoadMore = document.getElementById("btnAttLoadMore");
+let attNextCursor = null;
 
-async function loadAttendance() {
+// append = true: nối trang sau (cursor) vào bảng thay vì tải lại từ đầu
+async function loadAttendance(append = false) {
     try {
         const fromDate = document.getElementById("attFromDate").value;
         const toDate = document.getElementById("attToDate").value;
 
         const params = new URLSearchParams();
         if (employeeId) params.append("employee_id", employeeId);
+        // lọc ngày phía server
+        if (fromDate) params.append("from_date", fromDate);
+        if (toDate) params.append("to_date", toDate);
+        if (append && attNextCursor) params.append("cursor", attNextCursor);
 
         const data = await apiGet(`/attendances?${params.toString()}`);
 
-        attTableBody.innerHTML = "";
-        data.forEach((a) => {
-            // filter theo ngày nếu có chọn
-            if (fromDate && a.date < fromDate) return;
-            if (toDate && a.date > toDate) return;
-
+        if (!append) attTableBody.innerHTML = "";
+        data.items.forEach((a) => {
             const tr = document.createElement("tr");
             tr.innerHTML = `
                 <td>${a.date}</td>
@@ -140,12 +143,16 @@ async function loadAttendance() {
             `;
             attTableBody.appendChild(tr);
         });
+        attNextCursor = data.next_cursor;
+        btnAttLoadMore.style.display = attNextCursor ? "" : "none";
     } catch (err) {
         console.error(err);
         alert("Không tải được dữ liệu chấm công");
     }
 }
 
+btnAttLoadMore.addEventListener("click", () => loadAttendance(true));
+
 attForm.addEventListener("submit", (e) => {
     e.preventDefault();
     loadAttendance();
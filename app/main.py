@@ -1,13 +1,14 @@
 # app/main.py
 from pathlib import Path
 import os
+import threading
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
-from app.database import Base, engine, SessionLocal
+from app.database import Base, engine, SessionLocal, leader_lock
 from app.models import (
     employee,
     attendance,
@@ -16,9 +17,17 @@ from app.models import (
     user,
     performance_review,
     compliance,
+    analytics,
+    report_job,
 )
 from app.models.user import User
 from app.core.security import get_password_hash
+from app.services.attendance_partitions import ensure_future_partitions
+from app.services.attendance_rollup import backfill_rollups
+from app.services.pdf_fonts import register_fonts
+from app.services.punch_buffer import BUFFER_ENABLED, punch_buffer
+from app.services.render_pool import shutdown_render_pool
+from app.services.report_jobs import report_jobs
 
 from app.routers import auth, reports, dashboard
 from app.routers.employee import router as employee_router
@@ -66,8 +75,37 @@ def seed_default_admin():
         db.close()
 
 
+def backfill_attendance_rollup():
+    # DB cũ nâng cấp lên: dựng rollup cho các tháng chưa có (lần sau không làm gì)
+    db = SessionLocal()
+    try:
+        built = backfill_rollups(db)
+        if built:
+            print(f"✅ Backfilled attendance rollup: {len(built)} month(s)")
+    except Exception as e:
+        db.rollback()
+        print("❌ Backfill attendance rollup failed:", e)
+    finally:
+        db.close()
+
+
+def _backfill_rollup_leader():
+    # nhiều worker cùng khởi động: chỉ worker giành được khoá mới backfill
+    with leader_lock("attendance_rollup_backfill") as leader:
+        if leader:
+            backfill_attendance_rollup()
+
+
+def start_rollup_backfill():
+    # chạy nền, không chặn startup (tháng chưa dựng xong thì đọc thẳng attendances)
+    threading.Thread(
+        target=_backfill_rollup_leader, name="rollup-backfill", daemon=True
+    ).start()
+
+
 @app.on_event("startup")
 def on_startup():
+    register_fonts()
     if os.getenv("AUTO_CREATE_TABLES", "true").lower() == "true":
         try:
             Base.metadata.create_all(bind=engine)
@@ -76,6 +114,23 @@ def on_startup():
             print("[WARN] DB not ready, skip create_all:", e)
             return
     seed_default_admin()
+    if os.getenv("AUTO_BACKFILL_ROLLUP", "true").lower() == "true":
+        start_rollup_backfill()
+    try:
+        # Postgres đã partition attendances: luôn có sẵn partition vài tháng tới
+        for name in ensure_future_partitions(engine):
+            print(f"✅ Created partition {name}")
+    except Exception as e:
+        print("[WARN] Ensure attendance partitions failed:", e)
+    if BUFFER_ENABLED:
+        # ghi lại các lượt chấm còn trong journal nếu lần trước bị tắt đột ngột
+        punch_buffer.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    punch_buffer.stop()
+    report_jobs.shutdown()
+    shutdown_render_pool()
 
 app.add_middleware(
     CORSMiddleware,
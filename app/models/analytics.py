@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, Float, String, DateTime, UniqueConstraint
+
+from app.database import Base
+
+
+class AnalyticsCube(Base):
+    """
+    Số liệu tổng hợp sẵn theo (tháng, phòng ban, chức vụ).
+    department / position rỗng ("") = nhân viên chưa có phòng ban / chức vụ
+    (dùng "" thay NULL để unique key hoạt động trên mọi DB).
+    """
+    __tablename__ = "analytics_cube"
+    __table_args__ = (
+        UniqueConstraint("year", "month", "department", "position", name="uq_analytics_cube_cell"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    department = Column(String(50), nullable=False, default="")
+    position = Column(String(50), nullable=False, default="")
+
+    headcount = Column(Integer, nullable=False, default=0)
+    # số ngày có check_in / số ngày làm việc (T2-T6) x headcount
+    present_days = Column(Integer, nullable=False, default=0)
+    expected_days = Column(Integer, nullable=False, default=0)
+    paid_leave_days = Column(Integer, nullable=False, default=0)
+
+    payroll_count = Column(Integer, nullable=False, default=0)
+    payroll_gross = Column(Float, nullable=False, default=0.0)
+    payroll_net = Column(Float, nullable=False, default=0.0)
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AnalyticsStaleMonth(Base):
+    """Các tháng có dữ liệu nguồn thay đổi -> cube của tháng đó cần tính lại"""
+    __tablename__ = "analytics_stale_months"
+    __table_args__ = (
+        UniqueConstraint("year", "month", name="uq_analytics_stale_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    marked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,11 +1,35 @@
-from sqlalchemy import Column, Integer, Date, Time, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    BigInteger,
+    Date,
+    Time,
+    DateTime,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.employee import Employee
 
 
 class Attendance(Base):
+    # PostgreSQL: có thể partition theo tháng trên date
+    # (python -m app.commands.partition_attendances); khoá chính thật khi đó là (id, date)
     __tablename__ = "attendances"
+    __table_args__ = (
+        # lọc theo khoảng ngày + phân trang keyset (date, id)
+        Index("ix_attendances_date_id", "date", "id"),
+        # mỗi nhân viên 1 bản ghi / ngày; là khoá upsert của clock-in / clock-out
+        # (DB cũ: python -m app.commands.add_attendance_unique_key)
+        Index("uq_attendances_employee_date", "employee_id", "date", unique=True),
+        # export thay đổi kể từ 1 mốc (đồng bộ sang hệ thống khác)
+        Index("ix_attendances_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -13,4 +37,82 @@ class Attendance(Base):
     check_in = Column(Time, nullable=True)
     check_out = Column(Time, nullable=True)
 
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     employee = relationship(Employee, backref="attendances")
+
+
+class AttendanceTombstone(Base):
+    """
+    Dấu vết bản ghi chấm công đã xoá, để export thay đổi báo được
+    cả thao tác xoá cho hệ thống đồng bộ phía sau.
+    """
+    __tablename__ = "attendance_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    attendance_id = Column(Integer, nullable=False)
+    employee_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class AttendanceMonthlyRollup(Base):
+    """
+    Tổng hợp chấm công theo (nhân viên, tháng), cập nhật cùng transaction
+    với mọi thao tác ghi vào attendances.
+    - present_days: số ngày có check_in
+    - worked_minutes: tổng số phút (check_out - check_in)
+    - day_mask: bit (ngày - 1) = 1 nếu ngày đó có check_in
+    """
+    __tablename__ = "attendance_monthly_rollup"
+    __table_args__ = (
+        UniqueConstraint("employee_id", "year", "month", name="uq_attendance_rollup_period"),
+        # đọc cả công ty theo tháng: tổng quan, ma trận, cube, ngày công hàng loạt
+        # (DB cũ: python -m app.commands.ensure_indexes)
+        Index("ix_attendance_rollup_period", "year", "month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+
+    present_days = Column(Integer, nullable=False, default=0)
+    worked_minutes = Column(Integer, nullable=False, default=0)
+    day_mask = Column(BigInteger, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AttendanceRollupMonth(Base):
+    """
+    Các tháng mà attendance_monthly_rollup đã đủ (dựng lại từ dữ liệu gốc).
+    DB cũ vừa nâng cấp: tháng chưa có ở đây thì các hàm đọc quét thẳng
+    attendances cho tới khi backfill dựng xong tháng đó.
+    """
+    __tablename__ = "attendance_rollup_months"
+    __table_args__ = (
+        UniqueConstraint("year", "month", name="uq_attendance_rollup_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    built_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class PunchDeadLetter(Base):
+    """
+    Lượt chấm từ journal ghi đệm (punch_buffer) không ghi được vào
+    attendances kể cả khi ghi riêng từng dòng (vd. nhân viên đã bị xoá).
+    Tách ra đây để cả lô không kẹt mãi; admin xem rồi xử lý tay.
+    """
+    __tablename__ = "punch_dead_letters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(3), nullable=False)  # in / out
+    employee_id = Column(Integer, nullable=False)
+    punched_at = Column(DateTime, nullable=False)
+    error = Column(String(500), nullable=True)
+    failed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -10,6 +10,6 @@ class Employee(Base):
     phone = Column(String(20))
     gender = Column(String(10))
     birth_date = Column(Date)
-    position = Column(String(50))
-    department = Column(String(50))
+    position = Column(String(50), index=True)
+    department = Column(String(50), index=True)
     start_date = Column(Date)
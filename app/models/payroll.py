@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -8,6 +8,11 @@ from app.models.employee import Employee
 
 class Payroll(Base):
     __tablename__ = "payrolls"
+    __table_args__ = (
+        UniqueConstraint("employee_id", "year", "month", name="uq_payroll_employee_period"),
+        # báo cáo lọc theo kỳ của cả công ty
+        Index("ix_payrolls_period", "year", "month"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -24,5 +29,24 @@ class Payroll(Base):
     net_salary = Column(Float, nullable=False, default=0.0)
 
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     employee = relationship(Employee, backref="payrolls")
+
+
+class PayrollDirtyPeriod(Base):
+    """
+    Hàng đợi (employee_id, year, month) có dữ liệu chấm công / nghỉ phép
+    thay đổi -> Payroll của kỳ đó cần tính lại.
+    """
+    __tablename__ = "payroll_dirty_periods"
+    __table_args__ = (
+        UniqueConstraint("employee_id", "year", "month", name="uq_payroll_dirty_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+
+    marked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+
+from app.database import Base
+
+
+class ReportJob(Base):
+    """
+    Job xuất báo cáo chạy nền. Lưu trong DB (file kết quả nằm ở thư mục
+    dùng chung REPORT_JOB_DIR) để mọi worker uvicorn đều trả được trạng thái
+    và file, không phụ thuộc worker nào đã nhận job.
+    """
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        # đếm job đang chờ / chạy, dọn job hết hạn
+        Index("ix_report_jobs_status", "status"),
+        Index("ix_report_jobs_expires_at", "expires_at"),
+    )
+
+    id = Column(String(32), primary_key=True)
+    report_type = Column(String(30), nullable=False)
+    filters = Column(Text, nullable=False, default="{}")  # ReportFilters dạng JSON
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    status = Column(String(10), nullable=False, default="queued")  # queued / running / done / failed
+    processed_rows = Column(Integer, nullable=False, default=0)
+    total_rows = Column(Integer, nullable=True)
+    error = Column(String(500), nullable=True)
+    file_name = Column(String(100), nullable=True)  # tên file trong REPORT_JOB_DIR
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # worker đang chạy job cập nhật mỗi lần báo tiến độ; lâu không đổi = worker đã chết
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+    @property
+    def progress(self) -> float:
+        if self.status == "done":
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.processed_rows / self.total_rows, 0.99)
+
+    @property
+    def eta_seconds(self):
+        if self.status != "running" or self.started_at is None:
+            return None
+        p = self.progress
+        if p <= 0:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        return round(elapsed * (1 - p) / p, 1)
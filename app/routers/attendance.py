@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+from typing import Literal
+from datetime import date, datetime
 
 from app.database import get_db
 from app.models.attendance import Attendance
@@ -10,14 +11,66 @@ from app.schemas.attendance import (
     AttendanceCreate,
     AttendanceUpdate,
     AttendanceOut,
+    AttendanceImportResult,
+    AttendancePage,
+    PunchOut,
 )
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_token_claims
 from app.models.user import User
+from app.schemas.user import TokenData
+from app.services.attendance_changes import record_tombstone
+from app.services.attendance_import import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_MAX_ERRORS,
+    ImportFileError,
+    import_attendances,
+    iter_upload_records,
+)
+from app.services.attendance_listing import (
+    MAX_PAGE_SIZE,
+    PAGE_SIZE,
+    InvalidCursor,
+    list_attendances,
+)
+from app.services.attendance_rollup import apply_day_changes
+from app.services.event_bus import event_bus
+from app.services.overview_service import overview_cache
+from app.services.payroll_service import mark_payroll_dirty
+from app.services.punch_buffer import CLOCK_IN, CLOCK_OUT, punch_buffer
+from app.services.punch_service import EmployeeNotFound, clock_in, clock_out, punch_time
 
 router = APIRouter(prefix="/attendances", tags=["Attendance"])
 
 
+def _times(att: Attendance):
+    return att.check_in, att.check_out
+
+
+def _after_attendance_write(db: Session, att: Attendance, old=None, new=None):
+    """
+    Cập nhật rollup tháng + đánh dấu kỳ lương, cùng transaction với thao tác ghi.
+    old / new: (check_in, check_out) trước / sau khi ghi, None = không có dòng.
+    """
+    apply_day_changes(db, [(att.employee_id, att.date, old, new)])
+    mark_payroll_dirty(db, [(att.employee_id, att.date.year, att.date.month)])
+
+
+def _present_today(att: Attendance) -> int:
+    return int(att.date == date.today() and att.check_in is not None)
+
+
+def _publish_attendance(action: str, employee_id: int, d: date, delta: int):
+    """Gọi sau commit: dashboard chỉ cần biết số người đi làm hôm nay đổi bao nhiêu"""
+    event_bus.publish(
+        "attendance",
+        action=action,
+        employee_id=employee_id,
+        date=d.isoformat(),
+        delta={"todays_attendance_count": delta},
+    )
+
+
 # ✅ Tạo bản ghi chấm công
 @router.post("/", response_model=AttendanceOut)
 def create_attendance(
@@ -51,21 +104,155 @@ def create_attendance(
 
     att = Attendance(**data.dict())
     db.add(att)
+    try:
+        db.flush()
+    except IntegrityError:
+        # request song song vừa chấm cùng ngày (unique employee_id + date)
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Nhân viên đã được chấm công cho ngày này rồi",
+        )
+    _after_attendance_write(db, att, new=_times(att))
     db.commit()
+    overview_cache.attendance_changed(att.date)
+    _publish_attendance("created", att.employee_id, att.date, _present_today(att))
     db.refresh(att)
     return att
 
 
-# ✅ Lấy danh sách chấm công
-@router.get("/", response_model=List[AttendanceOut])
+def _punch_employee_id(claims: TokenData, db: Session) -> int:
+    """Lấy nhân viên từ claim của token; token cũ chưa có claim thì tra users 1 lần"""
+    employee_id = claims.employee_id
+    if not claims.has_employee_claim:
+        employee_id = db.query(User.employee_id).filter(User.id == claims.sub).scalar()
+    if employee_id is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Tài khoản chưa được gắn với nhân viên nào",
+        )
+    return employee_id
+
+
+def _ensure_punch_employee(db: Session, employee_id: int) -> None:
+    """Chế độ ghi đệm: không nhận vào journal lượt chấm của nhân viên không tồn tại"""
+    if not punch_buffer.employee_exists(db, employee_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
+
+
+# ✅ Chấm công vào (giờ server) cho chính mình
+@router.post("/clock-in", response_model=PunchOut)
+def clock_in_now(
+    db: Session = Depends(get_db),
+    claims: TokenData = Depends(get_token_claims),
+):
+    employee_id = _punch_employee_id(claims, db)
+    now = datetime.now()
+    if punch_buffer.started:
+        _ensure_punch_employee(db, employee_id)
+        punch_buffer.append(CLOCK_IN, employee_id, now)
+        return PunchOut(
+            employee_id=employee_id, date=now.date(), time=punch_time(now), queued=True
+        )
+
+    try:
+        recorded = clock_in(db, employee_id, now)
+    except EmployeeNotFound:
+        raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
+    if recorded:
+        overview_cache.adjust("todays_attendance_count", 1)
+        _publish_attendance("clock_in", employee_id, now.date(), 1)
+    return PunchOut(
+        employee_id=employee_id, date=now.date(), time=punch_time(now), recorded=recorded
+    )
+
+
+# ✅ Chấm công ra (giờ server) cho chính mình
+@router.post("/clock-out", response_model=PunchOut)
+def clock_out_now(
+    db: Session = Depends(get_db),
+    claims: TokenData = Depends(get_token_claims),
+):
+    employee_id = _punch_employee_id(claims, db)
+    now = datetime.now()
+    if punch_buffer.started:
+        _ensure_punch_employee(db, employee_id)
+        # chưa chấm vào thì flusher bỏ lượt này (xem metrics dropped_clock_outs)
+        punch_buffer.append(CLOCK_OUT, employee_id, now)
+        return PunchOut(
+            employee_id=employee_id, date=now.date(), time=punch_time(now), queued=True
+        )
+
+    if not clock_out(db, employee_id, now):
+        raise HTTPException(
+            status_code=400,
+            detail="Hôm nay bạn chưa chấm công vào",
+        )
+
+    _publish_attendance("clock_out", employee_id, now.date(), 0)
+    return PunchOut(employee_id=employee_id, date=now.date(), time=punch_time(now))
+
+
+# ✅ Tình trạng hàng đợi ghi đệm clock-in / clock-out (chỉ admin)
+@router.get("/punch-buffer/metrics")
+def punch_buffer_metrics(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ quản trị viên mới được xem trạng thái hàng đợi chấm công",
+        )
+    return punch_buffer.metrics()
+
+
+# ✅ Nhập chấm công hàng loạt từ file CSV / XLSX của máy chấm công (chỉ admin)
+@router.post("/import", response_model=AttendanceImportResult)
+def import_attendance_file(
+    file: UploadFile = File(..., description="CSV/XLSX: employee_id, date, check_in, check_out"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=100, le=20000),
+    max_errors: int = Query(IMPORT_MAX_ERRORS, ge=0, le=100000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ quản trị viên mới được phép nhập chấm công từ file",
+        )
+
+    try:
+        records = iter_upload_records(file.filename, file.file)
+        report = import_attendances(db, records, batch_size, max_errors)
+    except ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if report.touched_today:
+        overview_cache.invalidate()
+    if report.inserted:
+        event_bus.publish(
+            "attendance",
+            action="imported",
+            count=report.inserted,
+            delta={"todays_attendance_count": report.present_today},
+        )
+    return report.as_dict()
+
+
+# ✅ Lấy danh sách chấm công (lọc + phân trang keyset theo (date, id) mới nhất trước)
+@router.get("/", response_model=AttendancePage)
 def get_attendances(
     employee_id: int | None = None,
     work_date: date | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    department: str | None = None,
+    status_filter: Literal["present", "absent", "missing_checkout", "complete"] | None = Query(
+        None, alias="status"
+    ),
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    query = db.query(Attendance)
-
     # ❌ User thường: CHỈ được xem chấm công của chính mình
     if current_user.role != "admin":
         if employee_id is not None and employee_id != current_user.employee_id:
@@ -73,17 +260,30 @@ def get_attendances(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Bạn không được phép xem chấm công của nhân viên khác",
             )
-        query = query.filter(Attendance.employee_id == current_user.employee_id)
-
-    # ✅ Admin: được xem / filter theo bất kỳ employee_id nào
-    else:
-        if employee_id is not None:
-            query = query.filter(Attendance.employee_id == employee_id)
+        employee_id = current_user.employee_id
+        if employee_id is None:
+            return {"items": [], "next_cursor": None}
+        department = None  # đã giới hạn theo 1 nhân viên
 
+    # work_date = lọc đúng 1 ngày (giữ tương thích tham số cũ)
     if work_date is not None:
-        query = query.filter(Attendance.date == work_date)
+        from_date = to_date = work_date
+
+    try:
+        items, next_cursor = list_attendances(
+            db,
+            employee_id=employee_id,
+            from_date=from_date,
+            to_date=to_date,
+            department=department,
+            status=status_filter,
+            cursor=cursor,
+            limit=limit,
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="cursor không hợp lệ")
 
-    return query.all()
+    return {"items": items, "next_cursor": next_cursor}
 
 
 # ✅ Lấy 1 bản ghi chấm công
@@ -114,7 +314,8 @@ def update_attendance(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    att = db.query(Attendance).filter(Attendance.id == att_id).first()
+    # khoá dòng: giờ cũ dùng để cập nhật rollup theo chênh lệch
+    att = db.query(Attendance).filter(Attendance.id == att_id).with_for_update().first()
     if not att:
         raise HTTPException(status_code=404, detail="Không tìm thấy bản ghi chấm công")
 
@@ -124,10 +325,18 @@ def update_attendance(
             detail="Bạn không được phép sửa chấm công của người khác",
         )
 
+    was_present = _present_today(att)
+    old = _times(att)
     for key, value in data.dict(exclude_unset=True).items():
         setattr(att, key, value)
 
+    db.flush()
+    _after_attendance_write(db, att, old=old, new=_times(att))
     db.commit()
+    overview_cache.attendance_changed(att.date)
+    _publish_attendance(
+        "updated", att.employee_id, att.date, _present_today(att) - was_present
+    )
     db.refresh(att)
     return att
 
@@ -145,10 +354,15 @@ def delete_attendance(
             detail="Chỉ quản trị viên mới được phép xoá bản ghi chấm công",
         )
 
-    att = db.query(Attendance).filter(Attendance.id == att_id).first()
+    att = db.query(Attendance).filter(Attendance.id == att_id).with_for_update().first()
     if not att:
         raise HTTPException(status_code=404, detail="Không tìm thấy bản ghi chấm công")
 
+    record_tombstone(db, att)
     db.delete(att)
+    db.flush()
+    _after_attendance_write(db, att, old=_times(att))
     db.commit()
+    overview_cache.attendance_changed(att.date)
+    _publish_attendance("deleted", att.employee_id, att.date, -_present_today(att))
     return {"message": "Xoá bản ghi chấm công thành công"}
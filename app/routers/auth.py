@@ -66,6 +66,8 @@ def login(
             "sub": user.id,          # sub = user id
             "username": user.username,
             "role": user.role,
+            # clock-in / clock-out lấy nhân viên từ token, khỏi query users
+            "employee_id": user.employee_id,
         },
         expires_delta=access_token_expires,
     )
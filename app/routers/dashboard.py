@@ -1,63 +1,131 @@
-from datetime import date
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+import os
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from app.database import get_db
-from app.models.employee import Employee
-from app.models.attendance import Attendance
-from app.models.leave_request import LeaveRequest
-from app.models.payroll import Payroll
+from app.database import SessionLocal, get_db
 
-from app.core.security import get_current_admin
+from app.core.security import decode_access_token, get_current_admin
 from app.models.user import User
+from app.services.event_bus import event_bus
+from app.services.overview_service import overview_cache
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+# gửi comment giữ kết nối (proxy hay cắt kết nối im lặng quá lâu)
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("DASHBOARD_STREAM_KEEPALIVE_SECONDS", "15"))
+# client mất kết nối sẽ tự nối lại sau khoảng này (ms)
+STREAM_RETRY_MS = 3000
+
+
+def _overview_payload(data: dict) -> dict:
+    return {
+        "total_employees": data["total_employees"],
+        "today_attendance": data["todays_attendance_count"],
+        "pending_leaves": data["pending_leave_requests"],
+        "current_month_total_salary": data["current_month_total_payroll"],
+    }
+
 
 @router.get("/overview")
 def dashboard_overview(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    today = date.today()
-    year = today.year
-    month = today.month
-
-    # 1. Tổng nhân viên
-    total_employees = db.query(func.count(Employee.id)).scalar() or 0
-
-    # 2. Nhân viên đã chấm công hôm nay
-    today_attendance = (
-        db.query(Attendance.employee_id)
-        .filter(
-            Attendance.date == today,
-            Attendance.check_in.isnot(None)
-        )
-        .distinct()
-        .count()
-    )
+    # dùng chung cache với /stats/overview (0 query khi cache còn hạn)
+    return _overview_payload(overview_cache.get(db))
 
-    # 3. Đơn nghỉ chờ duyệt
-    pending_leaves = (
-        db.query(func.count(LeaveRequest.id))
-        .filter(LeaveRequest.status == "pending")
-        .scalar() or 0
-    )
 
-    # 4. Tổng quỹ lương tháng hiện tại
-    total_salary = (
-        db.query(func.coalesce(func.sum(Payroll.net_salary), 0))
-        .filter(
-            Payroll.year == year,
-            Payroll.month == month
-        )
-        .scalar() or 0
-    )
+# ====== STREAM SSE ======
+def _stream_admin(token: str = Query(..., description="access token (EventSource không gửi được header)")):
+    """
+    Xác thực 1 lần lúc mở stream rồi trả session về pool ngay:
+    kết nối SSE sống hàng giờ, không được giữ DB session.
+    """
+    # cùng cách giải mã / kiểm tra với get_current_user (chỉ khác nguồn token)
+    token_data = decode_access_token(token)
 
-    return {
-        "total_employees": total_employees,
-        "today_attendance": today_attendance,
-        "pending_leaves": pending_leaves,
-        "current_month_total_salary": float(total_salary)
-    }
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == token_data.sub).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Không thể xác thực người dùng",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if user.role != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Chỉ admin mới được phép thực hiện chức năng này",
+            )
+        return user.id
+    finally:
+        db.close()
+
+
+def _snapshot() -> dict:
+    db = SessionLocal()
+    try:
+        return _overview_payload(overview_cache.get(db))
+    finally:
+        db.close()
+
+
+def _sse(event_type: str, data: dict, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _dashboard_events(request: Request):
+    queue = event_bus.subscribe()
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+
+        # đăng ký trước rồi mới lấy snapshot -> không lỡ sự kiện nào;
+        # sự kiện commit trước lúc lấy snapshot đã nằm trong snapshot thì bỏ
+        snapshot_at = time.time()
+        yield _sse("snapshot", await run_in_threadpool(_snapshot))
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+
+            if event["type"] == "resync":
+                # client đọc chậm bị tràn hàng đợi -> gửi lại số liệu đầy đủ
+                snapshot_at = time.time()
+                yield _sse("snapshot", await run_in_threadpool(_snapshot), event["id"])
+                continue
+            if event["ts"] < snapshot_at:
+                continue
+            yield _sse(event["type"], event, event["id"])
+    finally:
+        event_bus.unsubscribe(queue)
+
+
+@router.get("/stream")
+async def dashboard_stream(request: Request, admin_id: int = Depends(_stream_admin)):
+    """
+    Server-sent events cho dashboard admin:
+      - snapshot: 4 con số tổng quan (lúc mở stream / khi cần đồng bộ lại)
+      - attendance / leave: kèm delta để cộng thẳng vào con số đang hiển thị
+      - payroll: bảng lương tháng nào vừa đổi
+    """
+    return StreamingResponse(
+        _dashboard_events(request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx: đừng buffer
+        },
+    )
@@ -8,6 +8,8 @@ from app.models.user import User
 from app.database import get_db
 from app.models.employee import Employee
 from app.schemas.employee import EmployeeCreate, EmployeeUpdate, EmployeeOut
+from app.services.analytics_cube import mark_all_months_stale
+from app.services.overview_service import overview_cache
 
 router = APIRouter(prefix="/employees", tags=["Employees"])
 
@@ -21,7 +23,9 @@ def create_employee(
 ):
     new_emp = Employee(**emp.dict())
     db.add(new_emp)
+    mark_all_months_stale(db)
     db.commit()
+    overview_cache.adjust("total_employees", 1)
     db.refresh(new_emp)
     return new_emp
 
@@ -70,6 +74,7 @@ def update_employee(
     for key, value in emp_update.dict(exclude_unset=True).items():
         setattr(emp, key, value)
 
+    mark_all_months_stale(db)
     db.commit()
     db.refresh(emp)
     return emp
@@ -87,5 +92,7 @@ def delete_employee(
         raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
 
     db.delete(emp)
+    mark_all_months_stale(db)
     db.commit()
+    overview_cache.adjust("total_employees", -1)
     return {"message": "Xóa nhân viên thành công"}
@@ -16,10 +16,32 @@ from app.schemas.leave_request import (
 
 from app.core.security import get_current_user
 from app.models.user import User
+from app.services.event_bus import event_bus
+from app.services.overview_service import overview_cache
+from app.services.payroll_service import mark_leave_dirty
 
 router = APIRouter(prefix="/leaves", tags=["Leave Requests"])
 
 
+def _publish_leave(
+    action: str, leave: LeaveRequest, pending_delta: int, emp: Optional[Employee] = None
+):
+    """Gọi sau commit -> đẩy lên stream dashboard (đơn mới kèm tên để hiện luôn)"""
+    payload = dict(
+        action=action,
+        leave_id=leave.id,
+        employee_id=leave.employee_id,
+        delta={"pending_leave_requests": pending_delta},
+    )
+    if action == "created":
+        payload.update(
+            employee_name=emp.full_name if emp else None,
+            start_date=leave.start_date.isoformat(),
+            end_date=leave.end_date.isoformat(),
+        )
+    event_bus.publish("leave", **payload)
+
+
 # ✅ Tạo đơn xin nghỉ (mặc định status = pending)
 @router.post("/", response_model=LeaveOut)
 def create_leave(
@@ -41,7 +63,9 @@ def create_leave(
     leave = LeaveRequest(**data.dict())
     db.add(leave)
     db.commit()
+    overview_cache.adjust("pending_leave_requests", 1)
     db.refresh(leave)
+    _publish_leave("created", leave, 1, emp)
     return leave
 
     # 🔓 Endpoint PUBLIC cho form HTML (không cần login)
@@ -58,7 +82,9 @@ def create_leave_public(
     leave = LeaveRequest(**data.dict())
     db.add(leave)
     db.commit()
+    overview_cache.adjust("pending_leave_requests", 1)
     db.refresh(leave)
+    _publish_leave("created", leave, 1, emp)
     return leave
 
 
@@ -167,9 +193,14 @@ def approve_leave(
     if not leave:
         raise HTTPException(status_code=404, detail="Không tìm thấy đơn xin nghỉ")
 
+    was_pending = leave.status == "pending"
     leave.status = "approved"
+    mark_leave_dirty(db, leave.employee_id, leave.start_date, leave.end_date)
     db.commit()
+    if was_pending:
+        overview_cache.adjust("pending_leave_requests", -1)
     db.refresh(leave)
+    _publish_leave(leave.status, leave, -int(was_pending))
     
     # GỬI EMAIL THÔNG BÁO ĐƯỢC DUYỆT
     try:
@@ -204,9 +235,15 @@ def reject_leave(
     if not leave:
         raise HTTPException(status_code=404, detail="Không tìm thấy đơn xin nghỉ")
 
+    was_pending = leave.status == "pending"
+    if leave.status == "approved":
+        mark_leave_dirty(db, leave.employee_id, leave.start_date, leave.end_date)
     leave.status = "rejected"
     db.commit()
+    if was_pending:
+        overview_cache.adjust("pending_leave_requests", -1)
     db.refresh(leave)
+    _publish_leave(leave.status, leave, -int(was_pending))
     
     # GỬI EMAIL THÔNG BÁO BỊ TỪ CHỐI
     try:
@@ -241,6 +278,12 @@ def delete_leave(
     if not leave:
         raise HTTPException(status_code=404, detail="Không tìm thấy đơn xin nghỉ")
 
+    was_pending = leave.status == "pending"
+    if leave.status == "approved":
+        mark_leave_dirty(db, leave.employee_id, leave.start_date, leave.end_date)
     db.delete(leave)
     db.commit()
+    if was_pending:
+        overview_cache.adjust("pending_leave_requests", -1)
+    _publish_leave("deleted", leave, -int(was_pending))
     return {"message": "Xoá đơn xin nghỉ thành công"}
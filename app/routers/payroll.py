@@ -1,77 +1,82 @@
-from calendar import monthrange
-from datetime import date
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, upsert
 from app.models.employee import Employee
 from app.services.email_service import send_payroll_email
-from app.models.attendance import Attendance
-from app.models.leave_request import LeaveRequest
-from app.models.payroll import Payroll
-from app.schemas.payroll import PayrollCreate, PayrollOut
+from app.models.payroll import Payroll, PayrollDirtyPeriod
+from app.schemas.payroll import (
+    PayrollCreate,
+    PayrollOut,
+    PayrollBatchCreate,
+    PayrollBatchItem,
+    PayrollBatchResult,
+    PayrollSimulationRequest,
+    PayrollSimulationResult,
+)
+from app.services.payroll_service import (
+    attendance_days_by_employee,
+    paid_leave_days_by_employee,
+    compute_salary,
+    recompute_dirty_payrolls,
+)
+from app.services.analytics_cube import mark_months_stale
+from app.services.event_bus import event_bus
+from app.services.overview_service import overview_cache
+from app.services.slip_cache import slip_cache
+from app.services.payroll_simulator import load_payroll_frame, simulate
 
 from app.core.security import get_current_user
 from app.models.user import User
 
 router = APIRouter(prefix="/payrolls", tags=["Payroll"])
 
+PAYROLL_KEY = ["employee_id", "year", "month"]
+PAYROLL_VALUE_COLS = [
+    "base_daily_salary",
+    "attendance_days",
+    "paid_leave_days",
+    "gross_salary",
+    "deductions",
+    "net_salary",
+    "updated_at",
+]
+# số dòng tối đa trong 1 câu INSERT nhiều dòng
+BATCH_CHUNK_SIZE = 1000
+
 
 def _calc_paid_leave_days(
     employee_id: int, year: int, month: int, db: Session
 ) -> int:
-    """Tính số ngày nghỉ có phép (approved) trong tháng"""
-    start_month = date(year, month, 1)
-    last_day = monthrange(year, month)[1]
-    end_month = date(year, month, last_day)
-
-    leaves = (
-        db.query(LeaveRequest)
-        .filter(
-            LeaveRequest.employee_id == employee_id,
-            LeaveRequest.status == "approved",
-            LeaveRequest.start_date <= end_month,
-            LeaveRequest.end_date >= start_month,
-        )
-        .all()
+    """
+    Số ngày nghỉ có phép (approved) trong tháng, lấy từ SQL của
+    paid_leave_days_by_employee (COUNT DISTINCT ngày khi join đơn với các
+    ngày trong tháng -> các đơn chồng nhau không bị đếm 2 lần)
+    """
+    return paid_leave_days_by_employee(db, year, month, [employee_id]).get(
+        employee_id, 0
     )
 
-    total_days = 0
-    for lv in leaves:
-        s = max(lv.start_date, start_month)
-        e = min(lv.end_date, end_month)
-        total_days += (e - s).days + 1
-    return total_days
-
 
 def _calc_attendance_days(
     employee_id: int, year: int, month: int, db: Session
 ) -> int:
-    """Tính số ngày đi làm (có check_in) trong tháng"""
-    start_month = date(year, month, 1)
-    last_day = monthrange(year, month)[1]
-    end_month = date(year, month, last_day)
-
-    q = (
-        db.query(Attendance.date)
-        .filter(
-            Attendance.employee_id == employee_id,
-            Attendance.date >= start_month,
-            Attendance.date <= end_month,
-            Attendance.check_in.isnot(None),
-        )
-        .distinct()
+    """Tính số ngày đi làm (có check_in) trong tháng – đọc từ rollup"""
+    return attendance_days_by_employee(db, year, month, [employee_id]).get(
+        employee_id, 0
     )
 
-    return q.count()
-
 
 # Tính lương và lưu Payroll (CHỈ ADMIN)
 @router.post("/calculate", response_model=PayrollOut)
 def calculate_payroll(
     data: PayrollCreate,
+    mode: Literal["create", "recalculate"] = "create",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -85,22 +90,6 @@ def calculate_payroll(
     if not emp:
         raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
 
-    # check đã có bảng lương tháng này chưa
-    existed = (
-        db.query(Payroll)
-        .filter(
-            Payroll.employee_id == data.employee_id,
-            Payroll.year == data.year,
-            Payroll.month == data.month,
-        )
-        .first()
-    )
-    if existed:
-        raise HTTPException(
-            status_code=400,
-            detail="Đã tồn tại bảng lương của nhân viên này trong tháng này",
-        )
-
     attendance_days = _calc_attendance_days(
         data.employee_id, data.year, data.month, db
     )
@@ -113,7 +102,7 @@ def calculate_payroll(
     )
     net_salary = gross_salary - data.deductions
 
-    payroll = Payroll(
+    values = dict(
         employee_id=data.employee_id,
         year=data.year,
         month=data.month,
@@ -123,11 +112,46 @@ def calculate_payroll(
         gross_salary=gross_salary,
         deductions=data.deductions,
         net_salary=net_salary,
+        updated_at=datetime.utcnow(),
     )
 
-    db.add(payroll)
-    db.commit()
-    db.refresh(payroll)
+    if mode == "recalculate":
+        # 1 câu INSERT ... ON CONFLICT UPDATE theo khoá (employee_id, year, month)
+        upsert(db, Payroll, [values], PAYROLL_KEY, update_cols=PAYROLL_VALUE_COLS)
+        mark_months_stale(db, [(data.year, data.month)])
+        db.commit()
+        payroll = (
+            db.query(Payroll)
+            .filter(
+                Payroll.employee_id == data.employee_id,
+                Payroll.year == data.year,
+                Payroll.month == data.month,
+            )
+            .one()
+        )
+        slip_cache.invalidate([payroll.id])
+        overview_cache.payroll_changed(data.year, data.month)
+        event_bus.publish(
+            "payroll", action="recalculated", year=data.year, month=data.month, count=1
+        )
+    else:
+        # unique key chặn trùng (kể cả 2 request song song), khỏi SELECT trước
+        payroll = Payroll(**values)
+        db.add(payroll)
+        mark_months_stale(db, [(data.year, data.month)])
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail="Đã tồn tại bảng lương của nhân viên này trong tháng này",
+            )
+        db.refresh(payroll)
+        overview_cache.payroll_changed(data.year, data.month)
+        event_bus.publish(
+            "payroll", action="created", year=data.year, month=data.month, count=1
+        )
     
     
     # GỬI EMAIL THÔNG BÁO PHIẾU LƯƠNG
@@ -147,6 +171,213 @@ def calculate_payroll(
     return payroll
 
 
+# Tính lương hàng loạt cho cả công ty / phòng ban (CHỈ ADMIN)
+@router.post("/calculate-batch", response_model=PayrollBatchResult)
+def calculate_payroll_batch(
+    data: PayrollBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Chốt lương cả tháng bằng vài câu query gom nhóm thay vì gọi
+    /payrolls/calculate cho từng nhân viên:
+    - 1 query nhân viên, 1 query bảng lương đã có
+    - 1 query GROUP BY ngày công, 1 query đơn nghỉ approved
+    - insert toàn bộ Payroll trong 1 transaction
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ quản trị viên mới được phép tính lương",
+        )
+
+    emp_q = db.query(Employee.id, Employee.full_name, Employee.email)
+    existed_q = db.query(Payroll.employee_id).filter(
+        Payroll.year == data.year,
+        Payroll.month == data.month,
+    )
+    recalculate = data.mode == "recalculate"
+
+    # scope = None -> tính cho tất cả, khỏi cần IN (...)
+    scope = None
+    if data.department is not None:
+        emp_q = emp_q.filter(Employee.department == data.department)
+        scope = select(Employee.id).where(Employee.department == data.department)
+        existed_q = existed_q.filter(Payroll.employee_id.in_(scope))
+
+    employees = emp_q.order_by(Employee.id).all()
+    emp_by_id = {e.id: e for e in employees}
+    # create: bỏ qua dòng đã có | recalculate: ghi đè bằng upsert, chỉ cần để
+    # đếm riêng số bảng lương tạo mới / tính lại
+    existed_ids = {row[0] for row in existed_q}
+
+    attendance_map = attendance_days_by_employee(db, data.year, data.month, scope)
+    leave_map = paid_leave_days_by_employee(db, data.year, data.month, scope)
+
+    items: List[PayrollBatchItem] = []
+    rows = []
+    now = datetime.utcnow()
+
+    # id được chỉ định lương riêng nhưng không thuộc phạm vi tính
+    for emp_id in sorted(set(data.daily_salaries) - set(emp_by_id)):
+        items.append(PayrollBatchItem(
+            employee_id=emp_id,
+            status="error",
+            detail="Không tìm thấy nhân viên (hoặc không thuộc phòng ban đã chọn)",
+        ))
+
+    for emp in employees:
+        if emp.id in existed_ids and not recalculate:
+            items.append(PayrollBatchItem(
+                employee_id=emp.id,
+                status="error",
+                detail="Đã tồn tại bảng lương của nhân viên này trong tháng này",
+            ))
+            continue
+
+        base_daily_salary = data.daily_salaries.get(emp.id, data.default_daily_salary)
+        if base_daily_salary is None:
+            items.append(PayrollBatchItem(
+                employee_id=emp.id,
+                status="error",
+                detail="Chưa có lương/ngày cho nhân viên này",
+            ))
+            continue
+
+        attendance_days = attendance_map.get(emp.id, 0)
+        paid_leave_days = leave_map.get(emp.id, 0)
+        deductions = data.deductions.get(emp.id, data.default_deductions)
+        gross_salary, net_salary = compute_salary(
+            base_daily_salary, attendance_days, paid_leave_days, deductions
+        )
+
+        rows.append({
+            "employee_id": emp.id,
+            "year": data.year,
+            "month": data.month,
+            "base_daily_salary": base_daily_salary,
+            "attendance_days": attendance_days,
+            "paid_leave_days": paid_leave_days,
+            "gross_salary": gross_salary,
+            "deductions": deductions,
+            "net_salary": net_salary,
+            "updated_at": now,
+        })
+        items.append(PayrollBatchItem(
+            employee_id=emp.id,
+            status="recalculated" if emp.id in existed_ids else "created",
+            attendance_days=attendance_days,
+            paid_leave_days=paid_leave_days,
+            net_salary=net_salary,
+        ))
+
+    if rows:
+        try:
+            if recalculate:
+                for i in range(0, len(rows), BATCH_CHUNK_SIZE):
+                    upsert(
+                        db,
+                        Payroll,
+                        rows[i:i + BATCH_CHUNK_SIZE],
+                        PAYROLL_KEY,
+                        update_cols=PAYROLL_VALUE_COLS,
+                    )
+            else:
+                # executemany -> driver gộp thành multi-row INSERT
+                db.execute(insert(Payroll), rows)
+            mark_months_stale(db, [(data.year, data.month)])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail="Có bảng lương vừa được tạo song song trong tháng này, "
+                "hãy chạy lại hoặc dùng mode=recalculate",
+            )
+        except Exception:
+            db.rollback()
+            raise
+        if recalculate:
+            # xoá phiếu lương cache của các bảng lương vừa ghi đè (sau commit)
+            written_q = db.query(Payroll.id).filter(
+                Payroll.year == data.year,
+                Payroll.month == data.month,
+            )
+            if scope is not None:
+                written_q = written_q.filter(Payroll.employee_id.in_(scope))
+            slip_cache.invalidate(payroll_id for (payroll_id,) in written_q)
+        overview_cache.payroll_changed(data.year, data.month)
+        event_bus.publish(
+            "payroll", action="batch", year=data.year, month=data.month, count=len(rows)
+        )
+
+    if data.send_email:
+        for row in rows:
+            emp = emp_by_id[row["employee_id"]]
+            background_tasks.add_task(
+                send_payroll_email,
+                employee_email=emp.email,
+                employee_name=emp.full_name,
+                year=data.year,
+                month=data.month,
+                net_salary=row["net_salary"],
+            )
+
+    updated = sum(1 for item in items if item.status == "recalculated")
+    return PayrollBatchResult(
+        year=data.year,
+        month=data.month,
+        created=len(rows) - updated,
+        updated=updated,
+        failed=len(items) - len(rows),
+        items=items,
+    )
+
+
+# Tính lại các bảng lương bị "bẩn" do sửa chấm công / nghỉ phép (CHỈ ADMIN)
+@router.post("/recompute-dirty")
+def recompute_dirty(
+    batch_size: int = Query(500, ge=1, le=5000),
+    max_batches: int = Query(20, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ quản trị viên mới được phép tính lại bảng lương",
+        )
+
+    result = recompute_dirty_payrolls(db, batch_size, max_batches)
+    result["remaining"] = db.query(func.count(PayrollDirtyPeriod.id)).scalar() or 0
+    return result
+
+
+# Mô phỏng what-if trên bảng lương đã tính (CHỈ ADMIN, không ghi DB)
+@router.post("/simulate", response_model=PayrollSimulationResult)
+def simulate_payroll(
+    data: PayrollSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Chỉ quản trị viên mới được phép mô phỏng bảng lương",
+        )
+
+    frame = load_payroll_frame(db, data.year, data.month, data.department)
+    if frame.size == 0:
+        raise HTTPException(
+            status_code=404,
+            detail="Chưa có bảng lương nào trong kỳ này để mô phỏng",
+        )
+
+    result = simulate(frame, data.scenarios)
+    return PayrollSimulationResult(year=data.year, month=data.month, **result)
+
+
 # Lấy danh sách bảng lương
 @router.get("/", response_model=List[PayrollOut])
 def list_payrolls(
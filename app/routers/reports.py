@@ -1,68 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+import tempfile
+from datetime import date, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Literal, Optional
 
-from openpyxl import Workbook
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.payroll import Payroll
-from app.models.attendance import Attendance
 from app.models.employee import Employee
-
+from app.schemas.report import (
+    ReportFilters,
+    ReportJobCreate,
+    ReportJobOut,
+    SlipBatchRequest,
+)
+from app.services.attendance_changes import (
+    format_cursor,
+    next_cursor,
+    parse_cursor,
+    stream_attendance_changes,
+)
+from app.services.render_pool import get_render_pool
+from app.services.slip_cache import slip_cache, slip_digest
+from app.services.report_jobs import JobQueueFull, report_jobs
+from app.services.report_service import (
+    ATTENDANCE_HEADER,
+    CSV_MEDIA_TYPE,
+    GZIP_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    PAYROLL_HEADER,
+    PDF_MEDIA_TYPE,
+    XLSX_MEDIA_TYPE,
+    iter_attendance_rows,
+    iter_file,
+    iter_payroll_pdf_rows,
+    iter_payroll_rows,
+    render_salary_slip,
+    render_salary_slips_zip,
+    slip_data,
+    stream_records,
+    write_excel,
+    write_payroll_pdf,
+)
 
 from app.core.security import get_current_admin, get_current_user
 from app.models.user import User
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
+# Mỗi request render vào buffer riêng (không dùng tên file cố định trong CWD):
+# file nhỏ hơn ngưỡng này nằm trong RAM, lớn hơn thì tự tràn ra file tạm
+# ẩn danh, tự xoá khi stream xong (iter_file đóng file).
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def _stream_file(f, media_type: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_file(f),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+ExportFormat = Literal["xlsx", "csv", "ndjson"]
+
+
+def report_filters(
+    employee_id: Optional[int] = None,
+    department: Optional[str] = None,
+    position: Optional[str] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    from_year: Optional[int] = None,
+    from_month: Optional[int] = Query(None, ge=1, le=12),
+    to_year: Optional[int] = None,
+    to_month: Optional[int] = Query(None, ge=1, le=12),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+) -> ReportFilters:
+    """Query params lọc báo cáo, VD: ?year=2024&month=12&department=Kế toán"""
+    return ReportFilters(
+        employee_id=employee_id,
+        department=department,
+        position=position,
+        year=year,
+        month=month,
+        from_year=from_year,
+        from_month=from_month,
+        to_year=to_year,
+        to_month=to_month,
+        from_date=from_date,
+        to_date=to_date,
+    )
+
+
+def _stream_records(
+    kind: str, fmt: str, filters: ReportFilters, gzip: bool, basename: str
+) -> StreamingResponse:
+    filename = f"{basename}.{fmt}" + (".gz" if gzip else "")
+    if gzip:
+        media_type = GZIP_MEDIA_TYPE
+    else:
+        media_type = CSV_MEDIA_TYPE if fmt == "csv" else NDJSON_MEDIA_TYPE
+    return StreamingResponse(
+        stream_records(kind, fmt, filters, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
 # =========================
 # EXPORT BẢNG LƯƠNG EXCEL (ADMIN)
 # =========================
 @router.get("/payroll-excel")
 def export_payroll_excel(
+    format: ExportFormat = "xlsx",
+    gzip: bool = False,
+    filters: ReportFilters = Depends(report_filters),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    payrolls = (
-        db.query(Payroll, Employee)
-        .join(Employee, Payroll.employee_id == Employee.id)
-        .all()
-    )
+    if format != "xlsx":
+        return _stream_records("payroll", format, filters, gzip, "bang_luong")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Bang luong"
-
-    ws.append([
-        "ID", "Ten nhan vien", "Thang", "Nam",
-        "So ngay lam", "Luong 1 ngay",
-        "Tong luong", "Khau tru", "Luong thuc"
-    ])
-
-    for p, e in payrolls:
-        ws.append([
-            p.id,
-            e.full_name,             
-            p.month,
-            p.year,
-            p.attendance_days,
-            p.base_daily_salary,
-            p.gross_salary,
-            p.deductions,
-            p.net_salary
-        ])
-
-    filename = "bang_luong.xlsx"
-    wb.save(filename)
-
-    return FileResponse(
-        filename,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=filename
-    )
+    # stream dòng từ server-side cursor -> openpyxl write_only -> file tạm
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_excel(out, "Bang luong", PAYROLL_HEADER, iter_payroll_rows(db, filters))
+
+    return _stream_file(out, XLSX_MEDIA_TYPE, "bang_luong.xlsx")
 
 
 
@@ -71,35 +138,14 @@ def export_payroll_excel(
 # =========================
 @router.get("/payroll-pdf")
 def export_payroll_pdf(
+    filters: ReportFilters = Depends(report_filters),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    payrolls = (
-        db.query(Payroll, Employee)
-        .join(Employee, Payroll.employee_id == Employee.id)
-        .all()
-    )
-
-    filename = "bang_luong.pdf"
-    c = canvas.Canvas(filename, pagesize=A4)
-    y = 800
-    c.setFont("Helvetica", 10)
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_payroll_pdf(out, iter_payroll_pdf_rows(db, filters))
 
-    c.drawString(200, y, "BANG LUONG NHAN VIEN")
-    y -= 30
-
-    for p, e in payrolls:
-        line = f"{e.full_name} | {p.month}/{p.year} | Luong thuc: {p.net_salary}"
-        c.drawString(50, y, line)
-        y -= 20
-
-        if y < 50:
-            c.showPage()
-            c.setFont("Helvetica", 10)
-            y = 800
-
-    c.save()
-    return FileResponse(filename, media_type="application/pdf", filename=filename)
+    return _stream_file(out, PDF_MEDIA_TYPE, "bang_luong.pdf")
 
 
 
@@ -108,51 +154,57 @@ def export_payroll_pdf(
 # =========================
 @router.get("/attendance-excel")
 def export_attendance_excel(
+    format: ExportFormat = "xlsx",
+    gzip: bool = False,
+    filters: ReportFilters = Depends(report_filters),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    attends = (
-        db.query(Attendance, Employee)
-        .join(Employee, Attendance.employee_id == Employee.id)
-        .all()
-    )
+    # csv / ndjson: bỏ qua openpyxl, stream thẳng từ cursor (nhanh hơn nhiều)
+    if format != "xlsx":
+        return _stream_records("attendance", format, filters, gzip, "cham_cong")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Cham cong"
-
-    ws.append([
-        "ID",
-        "Ten nhan vien",     # ✅ TÊN
-        "Ngay",
-        "Gio vao",
-        "Gio ra",
-        "Trang thai"
-    ])
-
-    for a, e in attends:
-        status_text = "Có mặt" if a.check_in else "Vắng"
-
-        ws.append([
-            a.id,
-            e.full_name,           
-            str(a.date),
-            str(a.check_in) if a.check_in else "",
-            str(a.check_out) if a.check_out else "",
-            status_text
-        ])
-
-    filename = "cham_cong.xlsx"
-    wb.save(filename)
-
-    return FileResponse(
-        filename,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=filename
-    )
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_excel(out, "Cham cong", ATTENDANCE_HEADER, iter_attendance_rows(db, filters))
+
+    return _stream_file(out, XLSX_MEDIA_TYPE, "cham_cong.xlsx")
     
     
 
+# =========================
+# THAY ĐỔI CHẤM CÔNG KỂ TỪ 1 CURSOR (ĐỒNG BỘ, ADMIN)
+# =========================
+@router.get("/attendance/changes")
+def export_attendance_changes(
+    since: Optional[str] = None,
+    gzip: bool = False,
+    current_user: User = Depends(get_current_admin),
+):
+    """
+    NDJSON các bản ghi chấm công được thêm / sửa / xoá sau `since`.
+    - Không có since: snapshot toàn bộ
+    - Cursor mới nằm ở header X-Next-Cursor và dòng cuối của body
+    - Mỗi lần đọc lại vài phút trước since (transaction commit muộn):
+      client bỏ trùng theo (op, id, changed_at)
+    """
+    try:
+        since_ts = parse_cursor(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+
+    until = next_cursor()
+    if since_ts is not None and since_ts > until:
+        # gọi lại quá sớm -> giữ nguyên cursor, không có thay đổi nào
+        until = since_ts
+
+    return StreamingResponse(
+        stream_attendance_changes(since_ts, until, gzip),
+        media_type=GZIP_MEDIA_TYPE if gzip else NDJSON_MEDIA_TYPE,
+        headers={"X-Next-Cursor": format_cursor(until)},
+    )
+
+
+
 # =========================
 # SALARY SLIP PDF CHO 1 NHÂN VIÊN / 1 THÁNG
 # =========================
@@ -161,6 +213,7 @@ def export_payroll_slip_pdf(
     employee_id: int,
     year: int,
     month: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -198,73 +251,165 @@ def export_payroll_slip_pdf(
         )
 
     payroll, emp = result
+    slip = slip_data(payroll, emp)
+
+    # ETag = hash nội dung phiếu -> trình duyệt gửi If-None-Match, khớp thì 304
+    digest = slip_digest(slip)
+    etag = f'"{digest}"'
+    last_modified = payroll.updated_at or payroll.created_at
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+    }
+    if last_modified:
+        cache_headers["Last-Modified"] = format_datetime(
+            last_modified.replace(tzinfo=timezone.utc), usegmt=True
+        )
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    pdf_bytes = slip_cache.get(payroll.id, digest)
+    if pdf_bytes is None:
+        pdf_bytes = render_salary_slip(slip)
+        slip_cache.put(payroll.id, digest, pdf_bytes)
+
+    return Response(
+        pdf_bytes,
+        media_type=PDF_MEDIA_TYPE,
+        headers={
+            **cache_headers,
+            "Content-Disposition": (
+                f'attachment; filename="salary_slip_{employee_id}_{year}_{month}.pdf"'
+            ),
+        },
+    )
+
+
+def _not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return etag in tags or "*" in tags
 
-    # Tạo file PDF
-    filename = f"salary_slip_{employee_id}_{year}_{month}.pdf"
-    c = canvas.Canvas(filename, pagesize=A4)
-
-    # Khởi tạo layout đơn giản
-    width, height = A4
-    y = height - 50
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(width / 2, y, "PHIẾU LƯƠNG NHÂN VIÊN")
-    y -= 30
-
-    c.setFont("Helvetica", 11)
-    c.drawString(50, y, f"Tháng/Năm: {month}/{year}")
-    y -= 20
-    c.drawString(50, y, f"Họ tên: {emp.full_name}")
-    y -= 20
-    if emp.position:
-        c.drawString(50, y, f"Chức vụ: {emp.position}")
-        y -= 20
-    if emp.department:
-        c.drawString(50, y, f"Phòng ban: {emp.department}")
-        y -= 20
-
-    y -= 10
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(50, y, "Chi tiết lương:")
-    y -= 20
-    c.setFont("Helvetica", 11)
-
-    # Format số tiền cho đẹp
-    def fmt_money(v: float) -> str:
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
         try:
-            return f"{v:,.0f} VND"
-        except Exception:
-            return f"{v} VND"
-
-    lines = [
-        f"Số ngày làm việc       : {payroll.attendance_days}",
-        f"Số ngày nghỉ có phép   : {payroll.paid_leave_days}",
-        f"Lương cơ bản 1 ngày    : {fmt_money(payroll.base_daily_salary)}",
-        f"Tổng lương (gross)     : {fmt_money(payroll.gross_salary)}",
-        f"Khấu trừ               : {fmt_money(payroll.deductions)}",
-        f"Lương thực nhận (net)  : {fmt_money(payroll.net_salary)}",
-    ]
-
-    for line in lines:
-        c.drawString(70, y, line)
-        y -= 18
-
-    y -= 20
-    c.drawString(50, y, "Ghi chú: Phiếu lương này được tạo tự động từ hệ thống HR.")
-    y -= 40
-
-    c.drawRightString(width - 50, y, "Người lập phiếu")
-    y -= 60
-
-    c.setFont("Helvetica-Oblique", 9)
-    c.drawString(50, 30, "Hệ thống HR Employee Management")
-
-    c.save()
-
-    return FileResponse(
-        filename,
-        media_type="application/pdf",
-        filename=filename,
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP date chỉ chính xác tới giây
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+
+# =========================
+# PHIẾU LƯƠNG HÀNG LOẠT CẢ THÁNG (ADMIN)
+# =========================
+@router.post("/payroll-slips/batch")
+def export_payroll_slips_batch(
+    data: SlipBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    """
+    Xuất phiếu lương của cả tháng (có thể lọc phòng ban) thành 1 file ZIP.
+    Dữ liệu lấy bằng 1 query, PDF render song song trên process pool.
+    """
+    q = (
+        db.query(Payroll, Employee)
+        .join(Employee, Payroll.employee_id == Employee.id)
+        .filter(Payroll.year == data.year, Payroll.month == data.month)
+    )
+    if data.department is not None:
+        q = q.filter(Employee.department == data.department)
+    if data.position is not None:
+        q = q.filter(Employee.position == data.position)
+
+    slips = [slip_data(p, e) for p, e in q.order_by(Payroll.employee_id)]
+    if not slips:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không có bảng lương nào trong tháng này",
+        )
+    db.close()
+
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    render_salary_slips_zip(out, slips, get_render_pool())
+
+    return _stream_file(
+        out, "application/zip", f"salary_slips_{data.year}_{data.month}.zip"
+    )
+
+
+
+# =========================
+# JOB XUẤT BÁO CÁO CHẠY NỀN (ADMIN)
+# =========================
+def _job_out(job) -> ReportJobOut:
+    return ReportJobOut(
+        id=job.id,
+        report_type=job.report_type,
+        status=job.status,
+        progress=round(job.progress, 3),
+        processed_rows=job.processed_rows,
+        total_rows=job.total_rows,
+        eta_seconds=job.eta_seconds,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        download_url=(
+            f"/reports/jobs/{job.id}/download" if job.status == "done" else None
+        ),
     )
 
 
+@router.post("/jobs", response_model=ReportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(
+    data: ReportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    try:
+        job = report_jobs.submit(db, data.report_type, data.filters, current_user.id)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Đang có quá nhiều báo cáo chờ xử lý, vui lòng thử lại sau",
+        )
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobOut)
+def get_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    # job của admin khác cũng trả 404 (không lộ là job có tồn tại)
+    job = report_jobs.get(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job báo cáo")
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    job = report_jobs.get(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job báo cáo")
+    if job.status != "done" or not job.file_name:
+        raise HTTPException(status_code=409, detail="Báo cáo chưa tạo xong")
+
+    path, filename, media_type = report_jobs.file_of(job)
+    if not path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="File báo cáo không còn (REPORT_JOB_DIR phải dùng chung giữa các worker)",
+        )
+    return FileResponse(path, media_type=media_type, filename=filename)
@@ -1,19 +1,22 @@
 from calendar import monthrange
 from datetime import date
-from typing import List
+from typing import List, Literal, Optional
 
-from datetime import timedelta
-from app.schemas.stats import AttendanceHeatmap, AttendanceHeatmapDay
+from app.schemas.stats import (
+    AttendanceHeatmap,
+    AttendanceHeatmapDay,
+    AttendanceMatrix,
+    AttendanceMatrixRow,
+    CubeCell,
+    CubeRefreshRequest,
+    CubeResult,
+)
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.employee import Employee
-from app.models.attendance import Attendance
-from app.models.leave_request import LeaveRequest
-from app.models.payroll import Payroll
 from app.schemas.stats import (
     OverviewStats,
     AttendanceSummary,
@@ -24,6 +27,23 @@ from app.schemas.stats import (
 
 from app.core.security import get_current_admin, get_current_user
 from app.models.user import User
+from app.services.analytics_cube import (
+    query_cube,
+    refresh_months,
+    refresh_stale_months,
+    stale_months,
+)
+from app.services.attendance_matrix import STATUS_CODES, attendance_matrix
+from app.services.attendance_rollup import (
+    present_days_by_employee,
+    present_mask,
+)
+from app.services.overview_service import overview_cache
+from app.services.month_calendar import CALENDAR_ORDER, HEATMAP_ORDER, day_statuses
+from app.services.payroll_service import (
+    paid_leave_days_by_employee,
+    paid_leave_masks_by_employee,
+)
 
 router = APIRouter(prefix="/stats", tags=["Statistics"])
 
@@ -34,43 +54,7 @@ def get_overview_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    today = date.today()
-    year = today.year
-    month = today.month
-
-    # tổng nhân viên
-    total_employees = db.query(func.count(Employee.id)).scalar() or 0
-
-    # số nhân viên đã chấm công hôm nay
-    todays_attendance_count = (
-        db.query(Attendance.employee_id)
-        .filter(Attendance.date == today, Attendance.check_in.isnot(None))
-        .distinct()
-        .count()
-    )
-
-    # số đơn nghỉ đang pending
-    pending_leave_requests = (
-        db.query(func.count(LeaveRequest.id))
-        .filter(LeaveRequest.status == "pending")
-        .scalar()
-        or 0
-    )
-
-    # tổng lương tháng hiện tại (net_salary)
-    current_month_total_payroll = (
-        db.query(func.coalesce(func.sum(Payroll.net_salary), 0.0))
-        .filter(Payroll.year == year, Payroll.month == month)
-        .scalar()
-        or 0.0
-    )
-
-    return OverviewStats(
-        total_employees=total_employees,
-        todays_attendance_count=todays_attendance_count,
-        pending_leave_requests=pending_leave_requests,
-        current_month_total_payroll=float(current_month_total_payroll),
-    )
+    return OverviewStats(**overview_cache.get(db))
 
 
 # ✅ Tổng hợp chấm công theo tháng – CHỈ ADMIN
@@ -81,27 +65,12 @@ def get_attendance_summary(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    start_month = date(year, month, 1)
-    last_day = monthrange(year, month)[1]
-    end_month = date(year, month, last_day)
-
-    rows = (
-        db.query(
-            Attendance.employee_id,
-            func.count(func.distinct(Attendance.date)).label("days"),
-        )
-        .filter(
-            Attendance.date >= start_month,
-            Attendance.date <= end_month,
-            Attendance.check_in.isnot(None),
-        )
-        .group_by(Attendance.employee_id)
-        .all()
-    )
+    # 1 dòng rollup / nhân viên thay vì quét toàn bộ chấm công của tháng
+    days_by_emp = present_days_by_employee(db, year, month)
 
     items = [
-        AttendanceSummaryItem(employee_id=row.employee_id, days=row.days)
-        for row in rows
+        AttendanceSummaryItem(employee_id=emp_id, days=days)
+        for emp_id, days in days_by_emp.items()
     ]
 
     return AttendanceSummary(year=year, month=month, items=items)
@@ -115,30 +84,8 @@ def get_leave_summary(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin),
 ):
-    start_month = date(year, month, 1)
-    last_day = monthrange(year, month)[1]
-    end_month = date(year, month, last_day)
-
-    rows = (
-        db.query(
-            LeaveRequest.employee_id,
-            LeaveRequest.start_date,
-            LeaveRequest.end_date,
-        )
-        .filter(
-            LeaveRequest.status == "approved",
-            LeaveRequest.start_date <= end_month,
-            LeaveRequest.end_date >= start_month,
-        )
-        .all()
-    )
-
-    days_by_emp = {}
-    for emp_id, start, end in rows:
-        s = max(start, start_month)
-        e = min(end, end_month)
-        days = (e - s).days + 1
-        days_by_emp[emp_id] = days_by_emp.get(emp_id, 0) + days
+    # tính trong DB: cắt theo tháng + gộp đơn trùng ngày, 1 dòng / nhân viên
+    days_by_emp = paid_leave_days_by_employee(db, year, month)
 
     items = [
         LeaveSummaryItem(employee_id=emp_id, days=days)
@@ -148,6 +95,87 @@ def get_leave_summary(
     return LeaveSummary(year=year, month=month, items=items)
 
 
+# ✅ Analytics cube: phòng ban / chức vụ x tháng – CHỈ ADMIN
+@router.get("/cube", response_model=CubeResult)
+def get_cube(
+    group_by: List[Literal["department", "position"]] = Query(["department"]),
+    from_year: Optional[int] = None,
+    from_month: int = Query(1, ge=1, le=12),
+    to_year: Optional[int] = None,
+    to_month: int = Query(12, ge=1, le=12),
+    department: Optional[str] = None,
+    position: Optional[str] = None,
+    rollup: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    """
+    Đọc thẳng bảng analytics_cube (không đụng bảng chấm công gốc).
+    - group_by: lặp lại được, VD ?group_by=department&group_by=position
+    - rollup: kèm tổng toàn công ty từng tháng + tổng cả khoảng
+    """
+    dims = list(dict.fromkeys(group_by))
+    filters = dict(
+        from_period=(from_year, from_month) if from_year is not None else None,
+        to_period=(to_year, to_month) if to_year is not None else None,
+        department=department,
+        position=position,
+    )
+
+    rows = query_cube(db, dims, **filters)
+    totals, grand_total = [], None
+    if rollup:
+        totals = query_cube(db, (), **filters)
+        grand = query_cube(db, (), per_month=False, **filters)
+        grand_total = CubeCell(**grand[0]) if grand else None
+
+    return CubeResult(
+        group_by=dims,
+        rows=[CubeCell(**r) for r in rows],
+        totals=[CubeCell(**r) for r in totals],
+        grand_total=grand_total,
+        stale_months=[f"{y}-{m:02d}" for y, m in stale_months(db)],
+    )
+
+
+@router.post("/cube/refresh")
+def refresh_cube(
+    data: CubeRefreshRequest = CubeRefreshRequest(),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    """Tính lại cube cho các tháng bị đánh dấu (hoặc 1 tháng / 1 năm chỉ định)"""
+    if data.year is None:
+        return refresh_stale_months(db, data.max_months)
+
+    months = [data.month] if data.month is not None else range(1, 13)
+    return refresh_months(db, [(data.year, m) for m in months])
+
+
+# ✅ Ma trận chấm công cả công ty / 1 phòng ban – CHỈ ADMIN
+@router.get("/attendance-matrix", response_model=AttendanceMatrix)
+def get_attendance_matrix(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    department: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+):
+    """
+    Trạng thái từng ngày của mọi nhân viên trong tháng (2 query cho cả công ty).
+    Mỗi nhân viên là 1 chuỗi mã, VD "PPPWWPLA...": P=present, L=paid_leave,
+    A=absent_unexcused, W=weekend, F=future.
+    """
+    rows = attendance_matrix(db, year, month, department)
+    return AttendanceMatrix(
+        year=year,
+        month=month,
+        days_in_month=monthrange(year, month)[1],
+        codes=STATUS_CODES,
+        employees=[AttendanceMatrixRow(**r) for r in rows],
+    )
+
+
 @router.get("/attendance-heatmap", response_model=AttendanceHeatmap)
 def get_attendance_heatmap(
     employee_id: int,
@@ -161,65 +189,17 @@ def get_attendance_heatmap(
     if not emp:
         raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
 
-    start_month = date(year, month, 1)
-    last_day = monthrange(year, month)[1]
-    end_month = date(year, month, last_day)
-
-    # 1) attendance days (có check_in)
-    att_rows = (
-        db.query(Attendance.date)
-        .filter(
-            Attendance.employee_id == employee_id,
-            Attendance.date >= start_month,
-            Attendance.date <= end_month,
-            Attendance.check_in.isnot(None),
-        )
-        .all()
-    )
-    present_days = {r[0] for r in att_rows}
-
-    # 2) paid leave days (approved, overlap month)
-    leaves = (
-        db.query(LeaveRequest)
-        .filter(
-            LeaveRequest.employee_id == employee_id,
-            LeaveRequest.status == "approved",
-            LeaveRequest.start_date <= end_month,
-            LeaveRequest.end_date >= start_month,
-        )
-        .all()
+    # present / nghỉ phép đều là bitmask của tháng -> gộp bằng month_calendar
+    present = present_mask(db, employee_id, year, month)
+    paid_leave = paid_leave_masks_by_employee(db, year, month, [employee_id]).get(
+        employee_id, 0
     )
+    statuses = day_statuses(year, month, present, paid_leave, date.today(), HEATMAP_ORDER)
 
-    paid_leave_days = set()
-    for lv in leaves:
-        s = max(lv.start_date, start_month)
-        e = min(lv.end_date, end_month)
-        d = s
-        while d <= e:
-            paid_leave_days.add(d)
-            d += timedelta(days=1)
-
-    # 3) build days
-    today = date.today()
-    out_days = []
-
-    d = start_month
-    while d <= end_month:
-        # weekend: Saturday(5) Sunday(6)
-        is_weekend = d.weekday() in (5, 6)
-
-        if d in present_days:
-            status_str = "present"
-        elif d in paid_leave_days:
-            status_str = "paid_leave"
-        else:
-            if d > today:
-                status_str = "future"
-            else:
-                status_str = "weekend" if is_weekend else "absent_unexcused"
-
-        out_days.append(AttendanceHeatmapDay(date=d, status=status_str))
-        d += timedelta(days=1)
+    out_days = [
+        AttendanceHeatmapDay(date=date(year, month, i + 1), status=st)
+        for i, st in enumerate(statuses)
+    ]
 
     return AttendanceHeatmap(
         employee_id=employee_id,
@@ -246,65 +226,13 @@ def my_attendance_calendar(
 
     employee_id = current_user.employee_id
 
-    start_month = date(year, month, 1)
-    last_day = monthrange(year, month)[1]
-    end_month = date(year, month, last_day)
-
-    # 1️⃣ attendance days
-    att_rows = (
-        db.query(Attendance.date)
-        .filter(
-            Attendance.employee_id == employee_id,
-            Attendance.date >= start_month,
-            Attendance.date <= end_month,
-            Attendance.check_in.isnot(None),
-        )
-        .all()
-    )
-    present_days = {r[0] for r in att_rows}
-
-    # 2️⃣ paid leave days
-    leaves = (
-        db.query(LeaveRequest)
-        .filter(
-            LeaveRequest.employee_id == employee_id,
-            LeaveRequest.status == "approved",
-            LeaveRequest.start_date <= end_month,
-            LeaveRequest.end_date >= start_month,
-        )
-        .all()
+    present = present_mask(db, employee_id, year, month)
+    paid_leave = paid_leave_masks_by_employee(db, year, month, [employee_id]).get(
+        employee_id, 0
     )
+    statuses = day_statuses(year, month, present, paid_leave, date.today(), CALENDAR_ORDER)
 
-    paid_leave_days = set()
-    for lv in leaves:
-        s = max(lv.start_date, start_month)
-        e = min(lv.end_date, end_month)
-        d = s
-        while d <= e:
-            paid_leave_days.add(d)
-            d += timedelta(days=1)
-
-    # 3️⃣ build days
-    today = date.today()
-    days = []
-    d = start_month
-    while d <= end_month:
-        if d in present_days:
-            status = "present"
-        elif d in paid_leave_days:
-            status = "paid_leave"
-        elif d.weekday() in (5, 6):
-            status = "weekend"
-        elif d > today:
-            status = "future"
-        else:
-            status = "absent_unexcused"
-
-        days.append({
-            "day": d.day,
-            "status": status
-        })
-        d += timedelta(days=1)
+    days = [{"day": i + 1, "status": st} for i, st in enumerate(statuses)]
 
     return {
         "year": year,
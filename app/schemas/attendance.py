@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, time
-from typing import Optional
+from typing import List, Optional
 
 
 class AttendanceBase(BaseModel):
@@ -24,3 +24,44 @@ class AttendanceOut(AttendanceBase):
 
     class Config:
         from_attributes = True
+
+
+class AttendancePage(BaseModel):
+    items: List[AttendanceOut]
+    # truyền lại vào ?cursor= để lấy trang sau; None = hết dữ liệu
+    next_cursor: Optional[str] = None
+
+
+class AttendanceImportError(BaseModel):
+    line: int
+    employee_id: Optional[int] = None
+    error: str
+
+
+class AttendanceImportBatchError(BaseModel):
+    # khoảng dòng trong file của lô ghi DB thất bại
+    first_line: int
+    last_line: int
+    rows: int
+    error: str
+
+
+class AttendanceImportResult(BaseModel):
+    total_rows: int
+    inserted: int
+    failed: int
+    errors: List[AttendanceImportError]
+    # chỉ trả tối đa max_errors lỗi đầu tiên
+    errors_truncated: bool = False
+    batch_errors: List[AttendanceImportBatchError] = []
+
+
+class PunchOut(BaseModel):
+    """Payload tối thiểu cho clock-in / clock-out"""
+    employee_id: int
+    date: date
+    time: time
+    # False: đã chấm vào từ trước, giữ giờ vào cũ
+    recorded: bool = True
+    # True: mới ghi vào journal (chế độ ghi đệm), vài trăm ms sau mới có trong DB
+    queued: bool = False
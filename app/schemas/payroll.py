@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 
 class PayrollBase(BaseModel):
@@ -37,3 +37,103 @@ class PayrollOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ====== Tính lương hàng loạt (chốt tháng) ======
+class PayrollBatchCreate(BaseModel):
+    year: int
+    month: int
+    department: Optional[str] = None
+
+    # lương/ngày mặc định, có thể ghi đè theo từng nhân viên
+    default_daily_salary: Optional[float] = None
+    daily_salaries: Dict[int, float] = {}
+
+    default_deductions: float = 0.0
+    deductions: Dict[int, float] = {}
+
+    send_email: bool = False
+
+    # create: bỏ qua nhân viên đã có bảng lương | recalculate: ghi đè
+    mode: Literal["create", "recalculate"] = "create"
+
+    @field_validator("month")
+    @classmethod
+    def check_month(cls, v):
+        if v < 1 or v > 12:
+            raise ValueError("month must be between 1 and 12")
+        return v
+
+
+class PayrollBatchItem(BaseModel):
+    employee_id: int
+    status: Literal["created", "recalculated", "error"]
+    attendance_days: Optional[int] = None
+    paid_leave_days: Optional[int] = None
+    net_salary: Optional[float] = None
+    detail: Optional[str] = None
+
+
+class PayrollBatchResult(BaseModel):
+    year: int
+    month: int
+    created: int
+    updated: int  # mode=recalculate: bảng lương đã có, được tính lại
+    failed: int
+    items: List[PayrollBatchItem]
+
+
+# ====== Mô phỏng what-if (chỉ đọc) ======
+class SimulationRule(BaseModel):
+    field: Literal["base_daily_salary", "deductions"]
+    # percent: +7 = tăng 7% | absolute: -200000 = giảm 200k
+    change: Literal["percent", "absolute"]
+    value: float
+    department: Optional[str] = None
+    position: Optional[str] = None
+
+
+class SimulationScenario(BaseModel):
+    name: str
+    rules: List[SimulationRule] = []
+
+
+class PayrollSimulationRequest(BaseModel):
+    year: int
+    month: int
+    department: Optional[str] = None
+    scenarios: List[SimulationScenario]
+
+    @field_validator("month")
+    @classmethod
+    def check_month(cls, v):
+        if v < 1 or v > 12:
+            raise ValueError("month must be between 1 and 12")
+        return v
+
+
+class SimulationDistribution(BaseModel):
+    min: float
+    p10: float
+    p50: float
+    p90: float
+    max: float
+    mean: float
+
+
+class SimulationScenarioResult(BaseModel):
+    name: str
+    employees: int
+    total_gross: float
+    total_deductions: float
+    total_net: float
+    delta_net: float
+    net_distribution: SimulationDistribution
+    net_by_department: Dict[str, float]
+
+
+class PayrollSimulationResult(BaseModel):
+    year: int
+    month: int
+    baseline: SimulationScenarioResult
+    scenarios: List[SimulationScenarioResult]
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class ReportFilters(BaseModel):
+    """
+    Bộ lọc chung cho mọi báo cáo, áp thẳng vào WHERE của câu SQL.
+    Kỳ (year/month, from_*/to_*) và khoảng ngày dùng được cho cả
+    bảng lương lẫn chấm công.
+    """
+    employee_id: Optional[int] = None
+    department: Optional[str] = None
+    position: Optional[str] = None
+
+    # 1 kỳ cụ thể (chỉ year = cả năm, chỉ month = tháng đó của mọi năm)
+    year: Optional[int] = None
+    month: Optional[int] = Field(default=None, ge=1, le=12)
+
+    # khoảng kỳ: from_year/from_month .. to_year/to_month (thiếu tháng = cả năm)
+    from_year: Optional[int] = None
+    from_month: Optional[int] = Field(default=None, ge=1, le=12)
+    to_year: Optional[int] = None
+    to_month: Optional[int] = Field(default=None, ge=1, le=12)
+
+    # khoảng ngày
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+
+
+ReportType = Literal["payroll-excel", "payroll-pdf", "attendance-excel"]
+
+
+class ReportJobCreate(BaseModel):
+    report_type: ReportType
+    filters: ReportFilters = ReportFilters()
+
+
+class ReportJobOut(BaseModel):
+    id: str
+    report_type: ReportType
+    status: Literal["queued", "running", "done", "failed"]
+    progress: float  # 0..1
+    processed_rows: int
+    total_rows: Optional[int] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+
+class SlipBatchRequest(BaseModel):
+    year: int
+    month: int
+    department: Optional[str] = None
+    position: Optional[str] = None
+
+    @field_validator("month")
+    @classmethod
+    def check_month(cls, v):
+        if v < 1 or v > 12:
+            raise ValueError("month must be between 1 and 12")
+        return v
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import date
 
 
@@ -44,3 +44,51 @@ class AttendanceHeatmap(BaseModel):
     month: int
     days: List[AttendanceHeatmapDay]
 
+
+
+# ====== Attendance Matrix (Admin, cả công ty) ======
+class AttendanceMatrixRow(BaseModel):
+    employee_id: int
+    full_name: str
+    department: Optional[str] = None
+    statuses: str  # ký tự thứ i = trạng thái ngày i + 1 (xem codes)
+
+
+class AttendanceMatrix(BaseModel):
+    year: int
+    month: int
+    days_in_month: int
+    codes: Dict[str, str]  # mã -> present | paid_leave | ...
+    employees: List[AttendanceMatrixRow]
+
+
+# ====== Analytics cube ======
+class CubeCell(BaseModel):
+    year: Optional[int] = None
+    month: Optional[int] = None
+    department: Optional[str] = None  # "" = chưa có phòng ban
+    position: Optional[str] = None
+
+    headcount: int  # tổng nhiều tháng (grand_total) = số người-tháng
+    present_days: int
+    expected_days: int
+    attendance_rate: float  # present_days / expected_days
+    paid_leave_days: int
+    payroll_count: int
+    payroll_gross: float
+    payroll_net: float
+
+
+class CubeResult(BaseModel):
+    group_by: List[str]
+    rows: List[CubeCell]
+    totals: List[CubeCell] = []  # toàn công ty theo tháng (rollup)
+    grand_total: Optional[CubeCell] = None  # cả khoảng thời gian
+    stale_months: List[str] = []  # "YYYY-MM" chưa refresh, số liệu có thể cũ
+
+
+class CubeRefreshRequest(BaseModel):
+    # bỏ trống -> chỉ tính lại các tháng bị đánh dấu
+    year: Optional[int] = None
+    month: Optional[int] = Field(default=None, ge=1, le=12)
+    max_months: Optional[int] = Field(default=None, ge=1)
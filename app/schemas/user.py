@@ -41,3 +41,6 @@ class TokenData(BaseModel):
     sub: Optional[int] = None
     username: Optional[str] = None
     role: Optional[str] = None
+    employee_id: Optional[int] = None
+    # token cũ (trước khi có claim employee_id) -> False
+    has_employee_claim: bool = False
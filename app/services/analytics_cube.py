@@ -0,0 +1,246 @@
+# app/services/analytics_cube.py
+"""
+Analytics cube: headcount, tỉ lệ đi làm, ngày nghỉ có phép, quỹ lương
+theo (tháng, phòng ban, chức vụ), tính sẵn vào bảng analytics_cube.
+
+- Các đường ghi gọi mark_months_stale() trong transaction của chúng
+  (mark_payroll_dirty, tính lương, sửa nhân viên).
+- refresh_stale_months() chỉ tính lại các tháng bị đánh dấu, mỗi tháng
+  vài query GROUP BY trên rollup / payrolls (không quét bảng attendances,
+  trừ tháng chưa được backfill rollup).
+- query_cube() chỉ đọc analytics_cube.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+
+from app.database import upsert
+from app.models.analytics import AnalyticsCube, AnalyticsStaleMonth
+from app.models.employee import Employee
+from app.models.payroll import Payroll
+from app.services.attendance_rollup import present_days_subquery
+from app.services.month_calendar import count_days, full_mask, month_bounds, weekend_mask
+
+CUBE_MEASURES = (
+    "headcount",
+    "present_days",
+    "expected_days",
+    "paid_leave_days",
+    "payroll_count",
+    "payroll_gross",
+    "payroll_net",
+)
+
+
+# ====== Đánh dấu tháng cần tính lại ======
+def mark_months_stale(db: Session, periods: Iterable[Tuple[int, int]]) -> None:
+    """Chạy trong transaction của request ghi (không commit ở đây)"""
+    now = datetime.utcnow()
+    rows = [{"year": y, "month": m, "marked_at": now} for y, m in set(periods)]
+    upsert(db, AnalyticsStaleMonth, rows, ["year", "month"], update_cols=["marked_at"])
+
+
+def mark_all_months_stale(db: Session) -> None:
+    """
+    Đổi phòng ban / chức vụ / thêm bớt nhân viên ảnh hưởng mọi tháng đã có
+    trong cube (và tháng hiện tại).
+    """
+    today = date.today()
+    periods = set(db.query(AnalyticsCube.year, AnalyticsCube.month).distinct())
+    periods.add((today.year, today.month))
+    mark_months_stale(db, periods)
+
+
+# ====== Tính lại ======
+def _dims(department, position) -> Tuple[str, str]:
+    return department or "", position or ""
+
+
+def refresh_month(db: Session, year: int, month: int) -> int:
+    """Tính lại toàn bộ ô của 1 tháng (không commit). Trả về số ô đã ghi."""
+    # tránh import vòng: payroll_service -> analytics_cube
+    from app.services.payroll_service import paid_leave_days_by_employee
+
+    _, end_month = month_bounds(year, month)
+    workdays = count_days(full_mask(year, month) & ~weekend_mask(year, month))
+    cells: Dict[Tuple[str, str], dict] = defaultdict(
+        lambda: {name: 0 for name in CUBE_MEASURES}
+    )
+
+    headcount_q = (
+        db.query(Employee.department, Employee.position, func.count(Employee.id))
+        .filter(or_(Employee.start_date.is_(None), Employee.start_date <= end_month))
+        .group_by(Employee.department, Employee.position)
+    )
+    for dept, pos, n in headcount_q:
+        cell = cells[_dims(dept, pos)]
+        cell["headcount"] += n
+        cell["expected_days"] += n * workdays
+
+    present = present_days_subquery(db, year, month)
+    present_q = (
+        db.query(
+            Employee.department,
+            Employee.position,
+            func.sum(present.c.present_days),
+        )
+        .join(Employee, present.c.employee_id == Employee.id)
+        .group_by(Employee.department, Employee.position)
+    )
+    for dept, pos, days in present_q:
+        cells[_dims(dept, pos)]["present_days"] += days or 0
+
+    payroll_q = (
+        db.query(
+            Employee.department,
+            Employee.position,
+            func.count(Payroll.id),
+            func.sum(Payroll.gross_salary),
+            func.sum(Payroll.net_salary),
+        )
+        .join(Employee, Payroll.employee_id == Employee.id)
+        .filter(Payroll.year == year, Payroll.month == month)
+        .group_by(Employee.department, Employee.position)
+    )
+    for dept, pos, n, gross, net in payroll_q:
+        cell = cells[_dims(dept, pos)]
+        cell["payroll_count"] += n
+        cell["payroll_gross"] += float(gross or 0)
+        cell["payroll_net"] += float(net or 0)
+
+    leave_days = paid_leave_days_by_employee(db, year, month)
+    if leave_days:
+        dims_q = db.query(Employee.id, Employee.department, Employee.position).filter(
+            Employee.id.in_(list(leave_days))
+        )
+        for emp_id, dept, pos in dims_q:
+            cells[_dims(dept, pos)]["paid_leave_days"] += leave_days[emp_id]
+
+    db.query(AnalyticsCube).filter(
+        AnalyticsCube.year == year, AnalyticsCube.month == month
+    ).delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "year": year,
+            "month": month,
+            "department": dept,
+            "position": pos,
+            "refreshed_at": now,
+            **measures,
+        }
+        for (dept, pos), measures in cells.items()
+    ]
+    if rows:
+        db.execute(insert(AnalyticsCube), rows)
+    return len(rows)
+
+
+def refresh_stale_months(db: Session, max_months: Optional[int] = None) -> Dict[str, int]:
+    """Tính lại các tháng bị đánh dấu, mỗi tháng 1 transaction"""
+    months = cells = 0
+    stale = db.query(AnalyticsStaleMonth).order_by(
+        AnalyticsStaleMonth.year, AnalyticsStaleMonth.month
+    )
+    if max_months is not None:
+        stale = stale.limit(max_months)
+
+    for mark_id, year, month in [(s.id, s.year, s.month) for s in stale]:
+        started_at = datetime.utcnow()
+        cells += refresh_month(db, year, month)
+        # tháng bị đánh dấu lại trong lúc đang tính thì giữ dấu
+        db.query(AnalyticsStaleMonth).filter(
+            AnalyticsStaleMonth.id == mark_id,
+            AnalyticsStaleMonth.marked_at <= started_at,
+        ).delete(synchronize_session=False)
+        db.commit()
+        months += 1
+
+    return {"months": months, "cells": cells}
+
+
+def refresh_months(db: Session, periods: Iterable[Tuple[int, int]]) -> Dict[str, int]:
+    """Ép tính lại các tháng chỉ định (kể cả không bị đánh dấu)"""
+    months = cells = 0
+    for year, month in sorted(set(periods)):
+        cells += refresh_month(db, year, month)
+        db.query(AnalyticsStaleMonth).filter(
+            AnalyticsStaleMonth.year == year, AnalyticsStaleMonth.month == month
+        ).delete(synchronize_session=False)
+        db.commit()
+        months += 1
+    return {"months": months, "cells": cells}
+
+
+def stale_months(db: Session) -> List[Tuple[int, int]]:
+    return [
+        (y, m)
+        for y, m in db.query(AnalyticsStaleMonth.year, AnalyticsStaleMonth.month).order_by(
+            AnalyticsStaleMonth.year, AnalyticsStaleMonth.month
+        )
+    ]
+
+
+# ====== Đọc cube ======
+def query_cube(
+    db: Session,
+    group_by: Sequence[str] = ("department",),
+    from_period: Optional[Tuple[int, int]] = None,
+    to_period: Optional[Tuple[int, int]] = None,
+    department: Optional[str] = None,
+    position: Optional[str] = None,
+    per_month: bool = True,
+) -> List[dict]:
+    """
+    Cộng các ô của cube theo tháng (per_month) + các chiều trong group_by.
+    group_by rỗng + per_month -> tổng toàn công ty từng tháng.
+    """
+    dims = [getattr(AnalyticsCube, name) for name in group_by]
+    keys = ([AnalyticsCube.year, AnalyticsCube.month] if per_month else []) + dims
+
+    q = db.query(
+        *keys,
+        *[func.sum(getattr(AnalyticsCube, name)) for name in CUBE_MEASURES],
+    )
+    if from_period is not None:
+        y, m = from_period
+        q = q.filter(
+            AnalyticsCube.year >= y,
+            or_(AnalyticsCube.year > y, AnalyticsCube.month >= m),
+        )
+    if to_period is not None:
+        y, m = to_period
+        q = q.filter(
+            AnalyticsCube.year <= y,
+            or_(AnalyticsCube.year < y, AnalyticsCube.month <= m),
+        )
+    if department is not None:
+        q = q.filter(AnalyticsCube.department == department)
+    if position is not None:
+        q = q.filter(AnalyticsCube.position == position)
+    if keys:
+        q = q.group_by(*keys).order_by(*keys)
+
+    names = (["year", "month"] if per_month else []) + list(group_by)
+    out = []
+    for row in q:
+        item = dict(zip(names, row[: len(names)]))
+        measures = dict(zip(CUBE_MEASURES, row[len(names):]))
+        if measures["headcount"] is None:
+            continue  # không có ô nào khớp
+        for name in CUBE_MEASURES:
+            measures[name] = measures[name] or 0
+        measures["payroll_gross"] = float(measures["payroll_gross"])
+        measures["payroll_net"] = float(measures["payroll_net"])
+        measures["attendance_rate"] = (
+            measures["present_days"] / measures["expected_days"]
+            if measures["expected_days"]
+            else 0.0
+        )
+        item.update(measures)
+        out.append(item)
+    return out
@@ -0,0 +1,153 @@
+# app/services/attendance_changes.py
+"""
+Export chấm công theo thay đổi (delta) cho hệ thống đồng bộ phía sau.
+
+Cursor = mốc thời gian (UTC, ISO 8601, chính xác tới giây), cursor mới = lúc
+gọi. updated_at được gán lúc flush, transaction commit muộn có thể mang
+updated_at cũ hơn cursor client đã nhận -> mỗi lần gọi đọc lại thêm 1 cửa sổ
+chồng lấn: (since - CHANGES_OVERLAP_SECONDS, until]. Cửa sổ phải dài hơn
+transaction ghi chấm công lâu nhất (import lớn, flush buffer).
+
+Dòng trong cửa sổ chồng lấn được trả lại y hệt lần trước -> client bỏ trùng
+theo (op, id, changed_at). op chỉ phụ thuộc vào chính dòng đó (không phụ
+thuộc since) nên 2 lần trả cùng 1 thay đổi luôn giống nhau.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.attendance import Attendance, AttendanceTombstone
+from app.models.employee import Employee
+from app.services.report_service import FETCH_SIZE, encode_ndjson, gzip_chunks
+
+CHANGES_OVERLAP_SECONDS = int(os.getenv("ATTENDANCE_CHANGES_OVERLAP_SECONDS", "300"))
+
+CHANGE_COLUMNS = [
+    "op", "id", "employee_id", "full_name", "department",
+    "date", "check_in", "check_out", "changed_at",
+]
+
+
+def format_cursor(ts: datetime) -> str:
+    return ts.isoformat(timespec="seconds")
+
+
+def parse_cursor(cursor: str) -> datetime:
+    """ValueError nếu cursor không hợp lệ"""
+    return datetime.fromisoformat(cursor).replace(tzinfo=None)
+
+
+def next_cursor() -> datetime:
+    # cắt tới giây: DATETIME của MySQL mặc định không lưu phần micro giây
+    return datetime.utcnow().replace(microsecond=0)
+
+
+def _is_insert(created_at, updated_at) -> bool:
+    # created_at / updated_at gán cùng lúc khi thêm (lệch vài micro giây với ORM)
+    if created_at is None or updated_at is None:
+        return False
+    return updated_at - created_at < timedelta(seconds=1)
+
+
+def record_tombstone(db: Session, att: Attendance) -> None:
+    """Gọi khi xoá 1 bản ghi chấm công, cùng transaction với lệnh xoá"""
+    db.add(
+        AttendanceTombstone(
+            attendance_id=att.id,
+            employee_id=att.employee_id,
+            date=att.date,
+        )
+    )
+
+
+def iter_attendance_changes(
+    db: Session, since: Optional[datetime], until: datetime
+) -> Iterator[tuple]:
+    """
+    Các thay đổi trong (since - CHANGES_OVERLAP_SECONDS, until], theo thứ tự
+    thời gian trong từng loại (có thể lặp lại thay đổi đã trả lần trước).
+    since=None -> snapshot đầy đủ (mọi dòng hiện có, không kèm tombstone).
+    """
+    stmt = (
+        select(
+            Attendance.id,
+            Attendance.employee_id,
+            Employee.full_name,
+            Employee.department,
+            Attendance.date,
+            Attendance.check_in,
+            Attendance.check_out,
+            Attendance.created_at,
+            Attendance.updated_at,
+        )
+        .join(Employee, Attendance.employee_id == Employee.id)
+        .order_by(Attendance.updated_at, Attendance.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    if since is None:
+        # dòng cũ (trước khi có cột updated_at) chỉ xuất hiện trong snapshot
+        stmt = stmt.where(
+            or_(Attendance.updated_at.is_(None), Attendance.updated_at <= until)
+        )
+    else:
+        since = since - timedelta(seconds=CHANGES_OVERLAP_SECONDS)
+        stmt = stmt.where(Attendance.updated_at > since, Attendance.updated_at <= until)
+
+    for (
+        att_id, emp_id, full_name, department, d,
+        check_in, check_out, created_at, updated_at,
+    ) in db.execute(stmt):
+        is_new = since is None or _is_insert(created_at, updated_at)
+        yield (
+            "insert" if is_new else "update",
+            att_id, emp_id, full_name, department,
+            d, check_in, check_out, updated_at,
+        )
+
+    if since is None:
+        return
+
+    tombstones = (
+        select(
+            AttendanceTombstone.attendance_id,
+            AttendanceTombstone.employee_id,
+            AttendanceTombstone.date,
+            AttendanceTombstone.deleted_at,
+        )
+        .where(
+            AttendanceTombstone.deleted_at > since,
+            AttendanceTombstone.deleted_at <= until,
+        )
+        .order_by(AttendanceTombstone.deleted_at, AttendanceTombstone.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    for att_id, emp_id, d, deleted_at in db.execute(tombstones):
+        yield ("delete", att_id, emp_id, None, None, d, None, None, deleted_at)
+
+
+def stream_attendance_changes(
+    since: Optional[datetime], until: datetime, gzip: bool = False
+) -> Iterator[bytes]:
+    """
+    NDJSON: mỗi dòng 1 thay đổi, dòng cuối {"op": "cursor", "cursor": ...}
+    để client lưu lại cho lần gọi sau (cũng có trong header X-Next-Cursor).
+    """
+
+    def generate():
+        db = SessionLocal()
+        try:
+            for text in encode_ndjson(
+                CHANGE_COLUMNS, iter_attendance_changes(db, since, until)
+            ):
+                yield text.encode("utf-8")
+        finally:
+            db.close()
+        yield (
+            '{"op": "cursor", "cursor": "%s"}\n' % format_cursor(until)
+        ).encode("utf-8")
+
+    return gzip_chunks(generate()) if gzip else generate()
@@ -0,0 +1,370 @@
+# app/services/attendance_import.py
+"""
+Nhập chấm công hàng loạt từ file CSV / XLSX (file xuất của máy chấm công).
+
+- Đọc file kiểu stream: CSV bằng csv.reader, XLSX bằng openpyxl read_only,
+  không nạp cả file vào bộ nhớ.
+- Kiểm tra theo lô (IMPORT_BATCH_SIZE dòng): mã nhân viên tồn tại và ngày đã
+  chấm công được tra bằng 2 query/lô rồi so trong set, không SELECT từng dòng.
+  Trùng (nhân viên, ngày) ngay trong lô bị loại bằng set của lô đó; trùng với
+  lô trước (đã commit) thì query ngày đã chấm công bắt được -> bộ nhớ không
+  tăng theo số dòng của file.
+- Mỗi lô 1 transaction: ghi dòng hợp lệ (Postgres dùng COPY, DB khác dùng
+  executemany), cập nhật rollup + đánh dấu bảng lương, rồi commit. Lô nào
+  ghi lỗi (DB) thì rollback riêng lô đó, ghi vào báo cáo theo khoảng dòng
+  và nhập tiếp các lô sau.
+- Trả về báo cáo lỗi theo số dòng trong file.
+"""
+import csv
+import io
+from datetime import date, datetime, time
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.services.attendance_rollup import apply_day_changes
+from app.services.payroll_service import mark_payroll_dirty
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 1000
+
+IMPORT_COLUMNS = ("employee_id", "date", "check_in", "check_out")
+_REQUIRED = ("employee_id", "date")
+_COPY_COLUMNS = ("employee_id", "date", "check_in", "check_out", "created_at", "updated_at")
+
+
+class ImportFileError(ValueError):
+    """File sai định dạng (thiếu cột, không đọc được) -> từ chối cả file"""
+
+
+# ====== Đọc file ======
+def _header_index(header) -> Dict[str, int]:
+    names = [str(h or "").strip().lower() for h in header]
+    missing = [c for c in _REQUIRED if c not in names]
+    if missing:
+        raise ImportFileError(f"Thiếu cột bắt buộc: {', '.join(missing)}")
+    return {c: names.index(c) for c in IMPORT_COLUMNS if c in names}
+
+
+def _pick(values, index: Dict[str, int]) -> dict:
+    n = len(values)
+    return {c: (values[i] if i < n else None) for c, i in index.items()}
+
+
+def iter_csv_records(raw: IO[bytes]) -> Iterator[Tuple[int, dict]]:
+    """(số dòng trong file, dict cột) - dòng 1 là header"""
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ImportFileError("File rỗng")
+    except UnicodeDecodeError:
+        raise ImportFileError("File CSV phải mã hoá UTF-8")
+    index = _header_index(header)
+
+    try:
+        for values in reader:
+            if not any(values):
+                continue  # dòng trống
+            yield reader.line_num, _pick(values, index)
+    except UnicodeDecodeError:
+        raise ImportFileError("File CSV phải mã hoá UTF-8")
+    finally:
+        text.detach()
+
+
+def iter_xlsx_records(raw: IO[bytes]) -> Iterator[Tuple[int, dict]]:
+    try:
+        wb = load_workbook(raw, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError("Không đọc được file XLSX")
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        try:
+            header = next(rows)
+        except StopIteration:
+            raise ImportFileError("File rỗng")
+        index = _header_index(header)
+
+        for line_no, values in enumerate(rows, start=2):
+            if not any(v is not None and v != "" for v in values):
+                continue
+            yield line_no, _pick(values, index)
+    finally:
+        wb.close()
+
+
+def iter_upload_records(filename: str, raw: IO[bytes]) -> Iterator[Tuple[int, dict]]:
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return iter_xlsx_records(raw)
+    if name.endswith(".csv"):
+        return iter_csv_records(raw)
+    raise ImportFileError("Chỉ hỗ trợ file .csv hoặc .xlsx")
+
+
+# ====== Chuẩn hoá 1 dòng ======
+def _parse_int(value) -> int:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)  # ô số trong Excel
+    return int(str(value).strip())
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if "/" in text:  # dd/mm/yyyy
+        d, m, y = text.split("/")
+        return date(int(y), int(m), int(d))
+    return date.fromisoformat(text)
+
+
+def _parse_time(value) -> Optional[time]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return time.fromisoformat(text)
+    except ValueError:
+        return time(*(int(p) for p in text.split(":")))  # "8:05"
+
+
+def _parse_record(record: dict) -> Tuple[int, date, Optional[time], Optional[time]]:
+    """ValueError với thông báo hiển thị được cho người dùng"""
+    raw_emp = record.get("employee_id")
+    if raw_emp is None or str(raw_emp).strip() == "":
+        raise ValueError("Thiếu employee_id")
+    try:
+        emp_id = _parse_int(raw_emp)
+    except ValueError:
+        raise ValueError(f"employee_id không hợp lệ: {raw_emp!r}")
+
+    raw_date = record.get("date")
+    if raw_date is None or str(raw_date).strip() == "":
+        raise ValueError("Thiếu date")
+    try:
+        d = _parse_date(raw_date)
+    except (TypeError, ValueError):
+        raise ValueError(f"Ngày không hợp lệ: {raw_date!r}")
+
+    times = []
+    for col in ("check_in", "check_out"):
+        try:
+            times.append(_parse_time(record.get(col)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Giờ {col} không hợp lệ: {record.get(col)!r}")
+    check_in, check_out = times
+    if check_in is None and check_out is not None:
+        raise ValueError("Có check_out nhưng thiếu check_in")
+    if check_in is not None and check_out is not None and check_out < check_in:
+        raise ValueError("check_out sớm hơn check_in")
+    return emp_id, d, check_in, check_out
+
+
+# ====== Ghi DB ======
+def _copy_rows(db: Session, rows: List[dict]) -> None:
+    """COPY ... FROM STDIN qua psycopg2, chạy trên connection của session"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        writer.writerow(
+            [
+                r["employee_id"],
+                r["date"].isoformat(),
+                r["check_in"].isoformat() if r["check_in"] else "",
+                r["check_out"].isoformat() if r["check_out"] else "",
+                r["created_at"].isoformat(),
+                r["updated_at"].isoformat(),
+            ]
+        )
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Attendance.__tablename__} ({', '.join(_COPY_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_rows(db: Session, rows: List[dict]) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, rows)
+    else:
+        # executemany -> driver gộp thành multi-row INSERT
+        db.execute(insert(Attendance.__table__), rows)
+
+
+class ImportReport:
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.total_rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        # lô ghi DB thất bại (cả lô không được nhập)
+        self.batch_errors: List[dict] = []
+        # số người đi làm hôm nay tăng thêm (cho overview / dashboard)
+        self.present_today = 0
+        self.touched_today = False
+
+    def error(self, line: int, message: str, employee_id: Optional[int] = None) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "employee_id": employee_id, "error": message})
+
+    def batch_error(self, first_line: int, last_line: int, rows: int, message: str) -> None:
+        self.failed += rows
+        self.batch_errors.append(
+            {"first_line": first_line, "last_line": last_line, "rows": rows, "error": message}
+        )
+
+    def as_dict(self) -> dict:
+        row_errors = self.failed - sum(b["rows"] for b in self.batch_errors)
+        return {
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": row_errors > len(self.errors),
+            "batch_errors": self.batch_errors,
+        }
+
+
+def _db_errors(db: Session) -> tuple:
+    # COPY chạy thẳng trên cursor psycopg2 -> lỗi DBAPI không được SQLAlchemy bọc lại
+    return (SQLAlchemyError, db.get_bind().dialect.dbapi.Error)
+
+
+def _flush_batch(
+    db: Session,
+    batch: List[Tuple[int, int, date, Optional[time], Optional[time]]],
+    report: ImportReport,
+) -> None:
+    emp_ids = {emp_id for _, emp_id, _, _, _ in batch}
+    dates = [d for _, _, d, _, _ in batch]
+
+    # 2 query cho cả lô
+    known = {
+        emp_id for (emp_id,) in db.query(Employee.id).filter(Employee.id.in_(list(emp_ids)))
+    }
+    existing = set(
+        db.query(Attendance.employee_id, Attendance.date).filter(
+            Attendance.employee_id.in_(known or [-1]),
+            Attendance.date >= min(dates),
+            Attendance.date <= max(dates),
+        )
+    )
+
+    now = datetime.utcnow()
+    today = date.today()
+    seen = set()
+    rows = []
+    lines = []
+    touched_today = False
+    present_today = 0
+    for line, emp_id, d, check_in, check_out in batch:
+        if emp_id not in known:
+            report.error(line, "Không tìm thấy nhân viên", emp_id)
+            continue
+        key = (emp_id, d)
+        if key in existing:
+            report.error(line, "Nhân viên đã được chấm công cho ngày này rồi", emp_id)
+            continue
+        if key in seen:
+            report.error(line, "Trùng nhân viên + ngày với dòng khác trong file", emp_id)
+            continue
+        seen.add(key)
+        lines.append(line)
+        rows.append(
+            {
+                "employee_id": emp_id,
+                "date": d,
+                "check_in": check_in,
+                "check_out": check_out,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        if d == today:
+            touched_today = True
+            if check_in is not None:
+                present_today += 1
+
+    if not rows:
+        return
+
+    try:
+        _insert_rows(db, rows)
+        apply_day_changes(
+            db,
+            ((r["employee_id"], r["date"], None, (r["check_in"], r["check_out"])) for r in rows),
+        )
+        mark_payroll_dirty(
+            db, ((r["employee_id"], r["date"].year, r["date"].month) for r in rows)
+        )
+        db.commit()
+    except _db_errors(db) as e:
+        db.rollback()
+        message = str(getattr(e, "orig", None) or e).splitlines()[0][:200]
+        report.batch_error(
+            min(lines), max(lines), len(rows), f"Lỗi ghi DB, cả lô không được nhập: {message}"
+        )
+        return
+    except Exception:
+        db.rollback()
+        raise
+    report.inserted += len(rows)
+    report.touched_today = report.touched_today or touched_today
+    report.present_today += present_today
+
+
+def import_attendances(
+    db: Session,
+    records: Iterable[Tuple[int, dict]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    max_errors: int = IMPORT_MAX_ERRORS,
+) -> ImportReport:
+    """
+    Lô nào ghi xong là đã commit: lô lỗi DB được ghi vào report.batch_errors,
+    các lô trước và sau vẫn giữ. Chạy lại cùng file sẽ báo trùng cho phần đã
+    nhập, chỉ ghi thêm các dòng của lô lỗi.
+    """
+    report = ImportReport(max_errors)
+    batch = []
+
+    for line, record in records:
+        report.total_rows += 1
+        try:
+            emp_id, d, check_in, check_out = _parse_record(record)
+        except ValueError as e:
+            report.error(line, str(e))
+            continue
+        batch.append((line, emp_id, d, check_in, check_out))
+        if len(batch) >= batch_size:
+            _flush_batch(db, batch, report)
+            batch = []
+
+    if batch:
+        _flush_batch(db, batch, report)
+
+    return report
@@ -0,0 +1,97 @@
+# app/services/attendance_listing.py
+"""
+Danh sách chấm công có lọc + phân trang keyset theo (date, id) giảm dần.
+
+Mỗi trang là 1 câu SELECT ... LIMIT n+1 bắt đầu từ vị trí cursor, nên thời
+gian trả lời phụ thuộc kích thước trang chứ không phụ thuộc độ lớn bảng.
+Index dùng cho từng kiểu lọc:
+- không lọc / khoảng ngày / trạng thái: ix_attendances_date_id (date, id)
+- theo nhân viên: uq_attendances_employee_date (employee_id, date)
+- theo phòng ban: ix_employees_department -> (employee_id, date)
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(att: Attendance) -> str:
+    return f"{att.date.isoformat()}_{att.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        d, att_id = cursor.split("_", 1)
+        return date.fromisoformat(d), int(att_id)
+    except ValueError:
+        raise InvalidCursor(cursor)
+
+
+def _status_filter(status: str):
+    # present: có check_in | absent: chưa check_in
+    # missing_checkout: vào rồi chưa ra | complete: đủ vào + ra
+    if status == "present":
+        return Attendance.check_in.isnot(None)
+    if status == "absent":
+        return Attendance.check_in.is_(None)
+    if status == "missing_checkout":
+        return and_(Attendance.check_in.isnot(None), Attendance.check_out.is_(None))
+    return and_(Attendance.check_in.isnot(None), Attendance.check_out.isnot(None))
+
+
+def list_attendances(
+    db: Session,
+    employee_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> Tuple[List[Attendance], Optional[str]]:
+    """Trả về (các bản ghi của trang, cursor trang sau hoặc None)"""
+    q = db.query(Attendance)
+
+    if employee_id is not None:
+        q = q.filter(Attendance.employee_id == employee_id)
+    if department is not None:
+        q = q.filter(
+            Attendance.employee_id.in_(
+                select(Employee.id).where(Employee.department == department)
+            )
+        )
+    if from_date is not None:
+        q = q.filter(Attendance.date >= from_date)
+    if to_date is not None:
+        q = q.filter(Attendance.date <= to_date)
+    if status is not None:
+        q = q.filter(_status_filter(status))
+
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        # date <= d để DB seek theo khoảng trên index, phần OR chỉ lọc ngày biên
+        q = q.filter(
+            Attendance.date <= last_date,
+            or_(Attendance.date < last_date, Attendance.id < last_id),
+        )
+
+    rows = (
+        q.order_by(Attendance.date.desc(), Attendance.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
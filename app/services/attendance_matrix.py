@@ -0,0 +1,79 @@
+# app/services/attendance_matrix.py
+"""
+Ma trận chấm công cả công ty (nhân viên x ngày) cho 1 tháng.
+
+Chỉ 3 query set-based:
+  1) danh sách nhân viên
+  2) day_mask đi làm từ attendance_monthly_rollup (tháng chưa dựng: attendances)
+  3) các đơn nghỉ approved giao với tháng
+Mỗi nhân viên trả về 1 chuỗi mã trạng thái, ký tự thứ i = ngày i + 1.
+"""
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.employee import Employee
+from app.services.attendance_rollup import present_masks_by_employee
+from app.services.month_calendar import (
+    ABSENT,
+    FUTURE,
+    HEATMAP_ORDER,
+    PAID_LEAVE,
+    PRESENT,
+    WEEKEND,
+    day_statuses,
+)
+from app.services.payroll_service import paid_leave_masks_by_employee
+
+STATUS_CODES = {
+    "P": PRESENT,
+    "L": PAID_LEAVE,
+    "A": ABSENT,
+    "W": WEEKEND,
+    "F": FUTURE,
+}
+_CODE_OF = {name: code for code, name in STATUS_CODES.items()}
+
+
+def attendance_matrix(
+    db: Session, year: int, month: int, department: Optional[str] = None
+) -> List[dict]:
+    emp_q = db.query(Employee.id, Employee.full_name, Employee.department).order_by(
+        Employee.id
+    )
+    employee_ids = None
+    if department is not None:
+        emp_q = emp_q.filter(Employee.department == department)
+        employee_ids = select(Employee.id).where(Employee.department == department)
+
+    present_masks = present_masks_by_employee(db, year, month, employee_ids)
+    leave_masks = paid_leave_masks_by_employee(db, year, month, employee_ids)
+
+    # nhân viên không đi làm / không nghỉ ngày nào dùng chung 1 chuỗi
+    today = date.today()
+    empty = "".join(
+        _CODE_OF[st] for st in day_statuses(year, month, 0, 0, today, HEATMAP_ORDER)
+    )
+
+    rows = []
+    for emp_id, full_name, dept in emp_q:
+        present = present_masks.get(emp_id, 0)
+        leave = leave_masks.get(emp_id, 0)
+        if present | leave:
+            statuses = "".join(
+                _CODE_OF[st]
+                for st in day_statuses(year, month, present, leave, today, HEATMAP_ORDER)
+            )
+        else:
+            statuses = empty
+        rows.append(
+            {
+                "employee_id": emp_id,
+                "full_name": full_name,
+                "department": dept,
+                "statuses": statuses,
+            }
+        )
+    return rows
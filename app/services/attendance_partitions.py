@@ -0,0 +1,307 @@
+# app/services/attendance_partitions.py
+"""
+Chia partition theo tháng cho bảng attendances (chỉ PostgreSQL 12+).
+
+- Bảng cha: PARTITION BY RANGE (date), mỗi tháng 1 bảng con
+  attendances_yYYYYmMM = [ngày 1 tháng, ngày 1 tháng sau), cộng 1 partition
+  attendances_default hứng dòng rơi ngoài mọi khoảng (quên tạo tháng mới...).
+- Khoá chính thành (id, date) vì Postgres bắt khoá unique phải chứa cột
+  partition; model vẫn coi id là khoá (id lấy từ 1 sequence chung).
+- Query nào lọc date bằng so sánh trực tiếp (=, <, >=, IN) thì Postgres chỉ
+  quét các tháng liên quan (partition pruning). Không bọc date trong hàm
+  (extract, date_trunc...) ở đường nóng.
+- Lưu trữ: tháng cũ hơn RETENTION_MONTHS được DETACH, dump ra CSV nén gzip
+  rồi DROP. Rollup tháng (attendance_monthly_rollup) vẫn giữ nên bảng lương,
+  thống kê các tháng đó không đổi.
+
+MySQL / SQLite: các hàm ở đây báo lỗi (convert) hoặc không làm gì (ensure).
+"""
+import gzip
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+
+from app.database import BASE_DIR
+from app.models.attendance import Attendance
+
+AHEAD_MONTHS = int(os.getenv("ATTENDANCE_PARTITION_AHEAD_MONTHS", "3"))
+RETENTION_MONTHS = int(os.getenv("ATTENDANCE_RETENTION_MONTHS", "36"))
+ARCHIVE_DIR = Path(os.getenv("ATTENDANCE_ARCHIVE_DIR", BASE_DIR / "var" / "attendance_archive"))
+
+TABLE = Attendance.__tablename__
+LEGACY_TABLE = f"{TABLE}_legacy"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+_NAME_RE = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+_BOUND_RE = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+class PartitionError(RuntimeError):
+    pass
+
+
+# ====== Tháng ======
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, n: int) -> date:
+    """Ngày 1 của tháng cách d n tháng"""
+    idx = d.year * 12 + d.month - 1 + n
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def partition_name(d: date) -> str:
+    return f"{TABLE}_y{d.year:04d}m{d.month:02d}"
+
+
+# ====== Đọc catalog ======
+def _require_postgres(conn: Connection) -> None:
+    if conn.dialect.name != "postgresql":
+        raise PartitionError("Partition theo tháng chỉ hỗ trợ PostgreSQL")
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    kind = conn.exec_driver_sql(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (TABLE,)
+    ).scalar()
+    return kind == "p"
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, date, date]]:
+    """(tên, từ ngày, đến ngày - không gồm) của các partition tháng, tăng dần"""
+    rows = conn.exec_driver_sql(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        (TABLE,),
+    ).all()
+    out = []
+    for name, bound in rows:
+        m = _BOUND_RE.search(bound or "")
+        if m:  # bỏ qua DEFAULT
+            out.append((name, date.fromisoformat(m.group(1)), date.fromisoformat(m.group(2))))
+    return sorted(out, key=lambda p: p[1])
+
+
+def _detached_leftovers(conn: Connection) -> List[str]:
+    """Bảng tháng đã DETACH nhưng chưa dump xong (lần archive trước bị dừng giữa chừng)"""
+    names = conn.exec_driver_sql(
+        """
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND NOT relispartition
+          AND relnamespace = current_schema()::regnamespace
+          AND relname LIKE %s
+        """,
+        (f"{TABLE}_y%",),
+    ).scalars()
+    return sorted(n for n in names if _NAME_RE.match(n))
+
+
+# ====== Tạo partition ======
+def create_partition(conn: Connection, start: date) -> bool:
+    """
+    Tạo partition cho tháng chứa start. False nếu đã có.
+    Dòng của tháng đó đang nằm ở partition default được chuyển sang.
+    """
+    start = month_start(start)
+    end = add_months(start, 1)
+    name = partition_name(start)
+    if any(p[0] == name for p in list_partitions(conn)):
+        return False
+
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    has_default = conn.exec_driver_sql(
+        "SELECT to_regclass(%s) IS NOT NULL", (DEFAULT_PARTITION,)
+    ).scalar()
+    stray = has_default and conn.exec_driver_sql(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s)",
+        (start, end),
+    ).scalar()
+
+    if not stray:
+        conn.exec_driver_sql(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}")
+        return True
+
+    # Postgres không cho tạo partition khi default đang giữ dòng thuộc khoảng đó
+    conn.exec_driver_sql(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    conn.exec_driver_sql(
+        f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+        """,
+        (start, end),
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}")
+    return True
+
+
+def ensure_partitions(
+    conn: Connection, today: Optional[date] = None, ahead: int = AHEAD_MONTHS
+) -> List[str]:
+    """Tạo partition từ tháng hiện tại tới `ahead` tháng sau. Trả về tên vừa tạo."""
+    _require_postgres(conn)
+    if not is_partitioned(conn):
+        raise PartitionError(
+            f"Bảng {TABLE} chưa partition, chạy: python -m app.commands.partition_attendances convert"
+        )
+    first = month_start(today or date.today())
+    return [
+        partition_name(add_months(first, i))
+        for i in range(ahead + 1)
+        if create_partition(conn, add_months(first, i))
+    ]
+
+
+def ensure_future_partitions(engine: Engine) -> List[str]:
+    """Gọi lúc khởi động app: không làm gì nếu không phải Postgres đã partition"""
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        return ensure_partitions(conn)
+
+
+# ====== Chuyển bảng thường -> bảng partition ======
+def convert_to_partitioned(
+    conn: Connection, ahead: int = AHEAD_MONTHS, keep_legacy: bool = False
+) -> Dict[str, int]:
+    """
+    Dựng lại attendances thành bảng partition theo tháng, chép toàn bộ dữ liệu
+    sang, trong 1 transaction (khoá bảng suốt quá trình -> chạy lúc vắng).
+    keep_legacy: giữ bảng cũ dưới tên attendances_legacy để đối chiếu.
+    """
+    _require_postgres(conn)
+    if is_partitioned(conn):
+        return {"rows": 0, "partitions": 0}
+    if conn.exec_driver_sql("SELECT to_regclass(%s) IS NOT NULL", (LEGACY_TABLE,)).scalar():
+        raise PartitionError(f"Đã có bảng {LEGACY_TABLE}, xoá hoặc đổi tên trước khi convert")
+
+    conn.exec_driver_sql(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}")
+
+    # đổi tên index cũ (kèm constraint pkey / unique) để bảng mới dùng lại tên theo model
+    old_indexes = conn.exec_driver_sql(
+        """
+        SELECT i.relname FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = to_regclass(%s)
+        """,
+        (LEGACY_TABLE,),
+    ).scalars().all()
+    for ix in old_indexes:
+        conn.exec_driver_sql(f'ALTER INDEX "{ix}" RENAME TO "{ix[:55]}_legacy"')
+
+    conn.exec_driver_sql(
+        f"CREATE TABLE {TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (date)"
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, date)")
+    conn.exec_driver_sql(
+        f"ALTER TABLE {TABLE} ADD FOREIGN KEY (employee_id) REFERENCES employees (id)"
+    )
+    for ix in Attendance.__table__.indexes:
+        ix.create(bind=conn)
+
+    # sequence của id đi theo bảng mới (không bị xoá cùng bảng cũ)
+    seq = conn.exec_driver_sql(
+        "SELECT pg_get_serial_sequence(%s, 'id')", (LEGACY_TABLE,)
+    ).scalar()
+    if seq:
+        conn.exec_driver_sql(f"ALTER SEQUENCE {seq} OWNED BY {TABLE}.id")
+
+    first, last = conn.exec_driver_sql(f"SELECT min(date), max(date) FROM {LEGACY_TABLE}").one()
+    today = date.today()
+    start = month_start(min(first or today, today))
+    end = add_months(month_start(max(last or today, today)), ahead)
+    created = 0
+    d = start
+    while d <= end:
+        created += create_partition(conn, d)
+        d = add_months(d, 1)
+    conn.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+    rows = conn.exec_driver_sql(
+        f"INSERT INTO {TABLE} SELECT * FROM {LEGACY_TABLE}"
+    ).rowcount
+    if not keep_legacy:
+        conn.exec_driver_sql(f"DROP TABLE {LEGACY_TABLE}")
+    return {"rows": rows, "partitions": created}
+
+
+# ====== Lưu trữ tháng cũ ======
+def archive_cutoff(today: Optional[date] = None, retention_months: int = RETENTION_MONTHS) -> date:
+    """Các tháng kết thúc trước ngày này được lưu trữ (giữ tháng hiện tại + retention tháng trước)"""
+    if retention_months < 1:
+        raise PartitionError("retention_months phải >= 1")
+    return add_months(month_start(today or date.today()), -retention_months)
+
+
+def _dump_table(engine: Engine, name: str, out_dir: Path) -> Tuple[Path, int]:
+    """COPY bảng ra <out_dir>/<name>.csv.gz (ghi file tạm rồi đổi tên). Trả về (file, số dòng)"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{name}.csv.gz"
+    tmp = path.with_suffix(".gz.part")
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        with gzip.open(tmp, "wt", encoding="utf-8", newline="") as f:
+            cur.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        cur.execute(f"SELECT count(*) FROM {name}")
+        rows = cur.fetchone()[0]
+        raw.commit()
+    finally:
+        raw.close()
+
+    # đọc lại file để chắc chắn đủ dòng trước khi xoá bảng
+    with gzip.open(tmp, "rt", encoding="utf-8", newline="") as f:
+        dumped = sum(1 for _ in f) - 1
+    if dumped < rows:
+        raise PartitionError(f"{name}: dump {dumped}/{rows} dòng, giữ nguyên bảng")
+    os.replace(tmp, path)
+    return path, rows
+
+
+def archive_partitions(
+    engine: Engine,
+    retention_months: int = RETENTION_MONTHS,
+    out_dir: Path = ARCHIVE_DIR,
+    drop: bool = True,
+    dry_run: bool = False,
+) -> List[Dict[str, object]]:
+    """
+    DETACH các partition tháng cũ hơn cửa sổ lưu giữ, dump ra CSV gzip rồi DROP.
+    Mỗi tháng 1 transaction ngắn để detach; dump chạy sau khi đã detach nên
+    không giữ khoá bảng cha. Chạy lại được: bảng đã detach mà chưa dump xong
+    ở lần trước sẽ được xử lý tiếp.
+    """
+    cutoff = archive_cutoff(retention_months=retention_months)
+    with engine.connect() as conn:
+        _require_postgres(conn)
+        old = [p[0] for p in list_partitions(conn) if p[2] <= cutoff]
+        leftovers = _detached_leftovers(conn)
+
+    result = []
+    for name in sorted(set(old) | set(leftovers)):
+        if dry_run:
+            result.append({"partition": name, "rows": None, "file": None})
+            continue
+        if name not in old and not drop and (out_dir / f"{name}.csv.gz").exists():
+            continue  # đã dump ở lần trước, bảng được giữ lại theo yêu cầu
+        if name in old:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        path, rows = _dump_table(engine, name, out_dir)
+        if drop:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"DROP TABLE {name}")
+        result.append({"partition": name, "rows": rows, "file": str(path)})
+    return result
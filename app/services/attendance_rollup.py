@@ -0,0 +1,431 @@
+# app/services/attendance_rollup.py
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, case, distinct, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import upsert
+from app.models.attendance import (
+    Attendance,
+    AttendanceMonthlyRollup,
+    AttendanceRollupMonth,
+)
+from app.services.month_calendar import day_bit, month_bounds, months_between
+
+# số dòng tối đa trong 1 câu INSERT nhiều dòng
+CHUNK_SIZE = 1000
+
+
+def _worked_minutes(check_in, check_out) -> int:
+    if check_in is None or check_out is None:
+        return 0
+    minutes = (check_out.hour * 60 + check_out.minute) - (
+        check_in.hour * 60 + check_in.minute
+    )
+    return max(minutes, 0)
+
+
+class _Acc:
+    __slots__ = ("present_days", "worked_minutes", "day_mask")
+
+    def __init__(self):
+        self.present_days = 0
+        self.worked_minutes = 0
+        self.day_mask = 0
+
+    def add(self, d: date, check_in, check_out):
+        if check_in is None:
+            return
+        bit = day_bit(d)
+        if not self.day_mask & bit:
+            self.day_mask |= bit
+            self.present_days += 1
+        self.worked_minutes += _worked_minutes(check_in, check_out)
+
+
+def _write(db: Session, accs: Dict[Tuple[int, int, int], _Acc]) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "employee_id": emp_id,
+            "year": y,
+            "month": m,
+            "present_days": acc.present_days,
+            "worked_minutes": acc.worked_minutes,
+            "day_mask": acc.day_mask,
+            "updated_at": now,
+        }
+        for (emp_id, y, m), acc in accs.items()
+    ]
+    for i in range(0, len(rows), CHUNK_SIZE):
+        upsert(
+            db,
+            AttendanceMonthlyRollup,
+            rows[i:i + CHUNK_SIZE],
+            ["employee_id", "year", "month"],
+            update_cols=["present_days", "worked_minutes", "day_mask", "updated_at"],
+        )
+
+
+def refresh_rollups(db: Session, keys: Iterable[Tuple[int, int, int]]) -> None:
+    """
+    Tính lại hẳn rollup cho các (employee_id, year, month) từ attendances.
+    Đọc cả tháng rồi ghi đè -> 2 transaction song song ghi 2 ngày khác nhau
+    của cùng nhân viên sẽ mất ngày của nhau: chỉ dùng ở lệnh chạy offline
+    (add_attendance_unique_key). Đường ghi online dùng apply_day_changes().
+    """
+    by_period = defaultdict(set)
+    for emp_id, y, m in keys:
+        by_period[(y, m)].add(emp_id)
+
+    for (y, m), emp_ids in by_period.items():
+        start_month, end_month = month_bounds(y, m)
+        accs = {(emp_id, y, m): _Acc() for emp_id in emp_ids}
+
+        rows = db.query(
+            Attendance.employee_id,
+            Attendance.date,
+            Attendance.check_in,
+            Attendance.check_out,
+        ).filter(
+            Attendance.employee_id.in_(list(emp_ids)),
+            Attendance.date >= start_month,
+            Attendance.date <= end_month,
+        )
+        for emp_id, d, check_in, check_out in rows:
+            accs[(emp_id, y, m)].add(d, check_in, check_out)
+
+        _write(db, accs)
+
+
+def _set_days(db: Session, rows: List[dict]) -> None:
+    """Bật bit ngày (day_mask của mỗi dòng = 1 bit) + cộng worked_minutes, nguyên tử"""
+    col = AttendanceMonthlyRollup.__table__.c
+    upsert(
+        db,
+        AttendanceMonthlyRollup,
+        rows,
+        ["employee_id", "year", "month"],
+        update_cols=["updated_at"],
+        # MySQL gán lần lượt từ trái sang: present_days phải đứng trước day_mask
+        update_exprs=lambda new: {
+            "present_days": case(
+                (col.day_mask.op("&")(new.day_mask) != 0, col.present_days),
+                else_=col.present_days + 1,
+            ),
+            "worked_minutes": col.worked_minutes + new.worked_minutes,
+            "day_mask": col.day_mask.op("|")(new.day_mask),
+        },
+    )
+
+
+def _clear_days(db: Session, rows: List[dict]) -> None:
+    """Tắt bit ngày + trừ worked_minutes, nguyên tử (chưa có dòng rollup thì thôi)"""
+    col = AttendanceMonthlyRollup.__table__.c
+    is_set = col.day_mask.op("&")(bindparam("_bit")) != 0
+    db.execute(
+        update(AttendanceMonthlyRollup.__table__)
+        .where(
+            col.employee_id == bindparam("_emp"),
+            col.year == bindparam("_year"),
+            col.month == bindparam("_month"),
+        )
+        .ordered_values(
+            (col.present_days, case((is_set, col.present_days - 1), else_=col.present_days)),
+            (col.worked_minutes, col.worked_minutes + bindparam("_minutes")),
+            (col.day_mask, case((is_set, col.day_mask - bindparam("_bit")), else_=col.day_mask)),
+            (col.updated_at, bindparam("_ts")),
+        ),
+        rows,
+    )
+
+
+def apply_day_changes(
+    db: Session, changes: Iterable[Tuple[int, date, Optional[tuple], Optional[tuple]]]
+) -> None:
+    """
+    Cập nhật rollup theo từng ngày vừa ghi, cùng transaction với thao tác ghi.
+    changes: (employee_id, ngày, (check_in, check_out) cũ, mới); None = không có dòng.
+    Mỗi ngày là 1 phép bật / tắt bit + cộng phút ngay trong câu UPDATE, không
+    đọc lại cả tháng -> 2 transaction ghi 2 ngày khác nhau của cùng nhân viên
+    không ghi đè lên nhau. Người gọi đọc giá trị cũ bằng SELECT ... FOR UPDATE
+    trên dòng attendances (cùng 1 ngày thì xếp hàng theo khoá dòng đó).
+    """
+    now = datetime.utcnow()
+    set_rows, clear_rows = [], []
+    for emp_id, d, old, new in changes:
+        old_in, old_out = old or (None, None)
+        new_in, new_out = new or (None, None)
+        minutes = _worked_minutes(new_in, new_out) - _worked_minutes(old_in, old_out)
+        if new_in is not None:
+            set_rows.append(
+                {
+                    "employee_id": emp_id,
+                    "year": d.year,
+                    "month": d.month,
+                    "present_days": 1,
+                    "worked_minutes": minutes,
+                    "day_mask": day_bit(d),
+                    "updated_at": now,
+                }
+            )
+        elif old_in is not None:
+            clear_rows.append(
+                {
+                    "_emp": emp_id,
+                    "_year": d.year,
+                    "_month": d.month,
+                    "_bit": day_bit(d),
+                    "_minutes": minutes,
+                    "_ts": now,
+                }
+            )
+
+    for i in range(0, len(set_rows), CHUNK_SIZE):
+        _set_days(db, set_rows[i:i + CHUNK_SIZE])
+    if clear_rows:
+        _clear_days(db, clear_rows)
+
+
+def rebuild_rollups(
+    db: Session, year: Optional[int] = None, month: Optional[int] = None
+) -> int:
+    """
+    Dựng lại toàn bộ rollup từ bảng attendances (hoặc chỉ 1 năm / 1 tháng).
+    Dựng lại toàn bộ không đụng tới các tháng trước dòng chấm công cũ nhất.
+    Đọc theo lô bằng yield_per nên bộ nhớ không phụ thuộc số dòng.
+    Trả về số dòng rollup đã ghi.
+    """
+    delete_q = db.query(AttendanceMonthlyRollup)
+    att_q = select(
+        Attendance.employee_id,
+        Attendance.date,
+        Attendance.check_in,
+        Attendance.check_out,
+    )
+
+    if year is not None:
+        delete_q = delete_q.filter(AttendanceMonthlyRollup.year == year)
+        if month is not None:
+            start, end = month_bounds(year, month)
+            delete_q = delete_q.filter(AttendanceMonthlyRollup.month == month)
+        else:
+            start, end = date(year, 1, 1), date(year, 12, 31)
+        att_q = att_q.where(Attendance.date >= start, Attendance.date <= end)
+    else:
+        # tháng cũ đã lưu trữ (partition đã tách khỏi bảng) chỉ còn rollup
+        # -> giữ nguyên, chỉ dựng lại từ tháng cũ nhất còn dữ liệu gốc
+        first = db.query(func.min(Attendance.date)).scalar()
+        if first is not None:
+            delete_q = delete_q.filter(
+                AttendanceMonthlyRollup.year >= first.year,
+                or_(
+                    AttendanceMonthlyRollup.year > first.year,
+                    AttendanceMonthlyRollup.month >= first.month,
+                ),
+            )
+
+    delete_q.delete(synchronize_session=False)
+
+    written = 0
+    accs: Dict[Tuple[int, int, int], _Acc] = {}
+    current_emp = None
+
+    # đọc bằng connection riêng (server-side cursor) để vừa stream vừa ghi
+    with db.get_bind().connect() as read_conn:
+        result = read_conn.execution_options(
+            stream_results=True, yield_per=CHUNK_SIZE
+        ).execute(att_q.order_by(Attendance.employee_id, Attendance.date))
+
+        # sắp theo nhân viên -> gom xong 1 nhân viên là ghi được ngay
+        for emp_id, d, check_in, check_out in result:
+            if emp_id != current_emp and len(accs) >= CHUNK_SIZE:
+                _write(db, accs)
+                written += len(accs)
+                accs = {}
+            current_emp = emp_id
+
+            key = (emp_id, d.year, d.month)
+            acc = accs.get(key)
+            if acc is None:
+                acc = accs[key] = _Acc()
+            acc.add(d, check_in, check_out)
+
+    _write(db, accs)
+    written += len(accs)
+
+    if year is None:
+        # dựng lại toàn bộ -> mọi tháng tới tháng hiện tại đều đã đủ
+        _mark_months(db, _backfill_months(db, date.today()))
+    db.commit()
+    return written
+
+
+# ====== Tháng đã có rollup đầy đủ ======
+# DB cũ nâng cấp lên có bảng rollup rỗng / thiếu tháng. Tháng nào chưa được
+# dựng lại thì các hàm đọc phía dưới quét thẳng attendances (chậm hơn nhưng
+# đúng). Backfill chạy lúc khởi động, dựng từ tháng mới nhất lùi về trước;
+# tháng mới nhất đã đánh dấu = mốc: các tháng sau mốc chỉ có dữ liệu ghi bởi
+# code hiện tại (luôn cập nhật rollup) nên được coi là đủ.
+_rolled_up_cache: Set[Tuple[int, int]] = set()  # đã đủ thì đủ mãi, cache trong process
+
+
+def _mark_months(db: Session, months: Iterable[Tuple[int, int]]) -> None:
+    now = datetime.utcnow()
+    rows = [{"year": y, "month": m, "built_at": now} for y, m in months]
+    for i in range(0, len(rows), CHUNK_SIZE):
+        upsert(db, AttendanceRollupMonth, rows[i:i + CHUNK_SIZE], ["year", "month"])
+
+
+def _latest_marked(db: Session) -> Optional[Tuple[int, int]]:
+    row = (
+        db.query(AttendanceRollupMonth.year, AttendanceRollupMonth.month)
+        .order_by(AttendanceRollupMonth.year.desc(), AttendanceRollupMonth.month.desc())
+        .first()
+    )
+    return tuple(row) if row else None
+
+
+def is_rolled_up(db: Session, year: int, month: int) -> bool:
+    key = (year, month)
+    if key in _rolled_up_cache:
+        return True
+    marked = (
+        db.query(AttendanceRollupMonth.id)
+        .filter(AttendanceRollupMonth.year == year, AttendanceRollupMonth.month == month)
+        .first()
+        is not None
+    )
+    if not marked:
+        latest = _latest_marked(db)
+        marked = latest is not None and key > latest
+    if marked:
+        _rolled_up_cache.add(key)
+    return marked
+
+
+def _backfill_months(db: Session, today: date) -> List[Tuple[int, int]]:
+    """Các tháng cần có rollup đủ: từ tháng chấm công cũ nhất tới mốc, mới nhất trước"""
+    first, last = db.query(func.min(Attendance.date), func.max(Attendance.date)).one()
+    horizon = _latest_marked(db) or max(
+        (last.year, last.month) if last else (0, 0), (today.year, today.month)
+    )
+    start = date(horizon[0], horizon[1], 1)
+    if first is not None:
+        start = min(start, first)
+    return list(reversed(list(months_between(start, date(horizon[0], horizon[1], 1)))))
+
+
+def backfill_rollups(db: Session, today: Optional[date] = None) -> List[Tuple[int, int]]:
+    """
+    Dựng rollup cho các tháng chưa đánh dấu (DB cũ nâng cấp lên), mỗi tháng
+    1 transaction. Chạy lại được: tháng đã xong thì bỏ qua. Trả về các tháng đã dựng.
+    """
+    marked = set(db.query(AttendanceRollupMonth.year, AttendanceRollupMonth.month).all())
+    built = []
+    for y, m in _backfill_months(db, today or date.today()):
+        if (y, m) in marked:
+            continue
+        rebuild_rollups(db, y, m)
+        _mark_months(db, [(y, m)])
+        db.commit()
+        built.append((y, m))
+    return built
+
+
+# ====== Đọc rollup (tháng chưa dựng: đọc thẳng attendances) ======
+def _raw_present(db: Session, year: int, month: int, employee_ids=None):
+    start_month, end_month = month_bounds(year, month)
+    q = db.query(Attendance.employee_id, Attendance.date).filter(
+        Attendance.date >= start_month,
+        Attendance.date <= end_month,
+        Attendance.check_in.isnot(None),
+    )
+    if employee_ids is not None:
+        q = q.filter(Attendance.employee_id.in_(employee_ids))
+    return q
+
+
+def present_days_subquery(db: Session, year: int, month: int, employee_ids=None):
+    """Subquery (employee_id, present_days) của 1 tháng, dùng để JOIN / GROUP BY"""
+    if is_rolled_up(db, year, month):
+        q = select(
+            AttendanceMonthlyRollup.employee_id,
+            AttendanceMonthlyRollup.present_days,
+        ).where(
+            AttendanceMonthlyRollup.year == year,
+            AttendanceMonthlyRollup.month == month,
+        )
+        if employee_ids is not None:
+            q = q.where(AttendanceMonthlyRollup.employee_id.in_(employee_ids))
+        return q.subquery("present_days")
+
+    start_month, end_month = month_bounds(year, month)
+    q = (
+        select(
+            Attendance.employee_id,
+            func.count(distinct(Attendance.date)).label("present_days"),
+        )
+        .where(
+            Attendance.date >= start_month,
+            Attendance.date <= end_month,
+            Attendance.check_in.isnot(None),
+        )
+        .group_by(Attendance.employee_id)
+    )
+    if employee_ids is not None:
+        q = q.where(Attendance.employee_id.in_(employee_ids))
+    return q.subquery("present_days")
+
+
+def present_days_by_employee(
+    db: Session, year: int, month: int, employee_ids=None
+) -> Dict[int, int]:
+    sq = present_days_subquery(db, year, month, employee_ids)
+    q = db.query(sq.c.employee_id, sq.c.present_days).filter(sq.c.present_days > 0)
+    return {emp_id: days for emp_id, days in q}
+
+
+def present_masks_by_employee(
+    db: Session, year: int, month: int, employee_ids=None
+) -> Dict[int, int]:
+    """day_mask đi làm của 1 tháng cho nhiều nhân viên (None = tất cả)"""
+    if is_rolled_up(db, year, month):
+        q = db.query(
+            AttendanceMonthlyRollup.employee_id, AttendanceMonthlyRollup.day_mask
+        ).filter(
+            AttendanceMonthlyRollup.year == year,
+            AttendanceMonthlyRollup.month == month,
+        )
+        if employee_ids is not None:
+            q = q.filter(AttendanceMonthlyRollup.employee_id.in_(employee_ids))
+        return {emp_id: mask for emp_id, mask in q if mask}
+
+    masks: Dict[int, int] = defaultdict(int)
+    for emp_id, d in _raw_present(db, year, month, employee_ids):
+        masks[emp_id] |= day_bit(d)
+    return dict(masks)
+
+
+def present_mask(db: Session, employee_id: int, year: int, month: int) -> int:
+    return present_masks_by_employee(db, year, month, [employee_id]).get(employee_id, 0)
+
+
+def present_count_query(db: Session, d: date):
+    """SELECT số nhân viên có check_in trong ngày d (dùng riêng hoặc làm subquery)"""
+    if is_rolled_up(db, d.year, d.month):
+        return select(func.count(AttendanceMonthlyRollup.id)).where(
+            AttendanceMonthlyRollup.year == d.year,
+            AttendanceMonthlyRollup.month == d.month,
+            AttendanceMonthlyRollup.day_mask.op("&")(day_bit(d)) != 0,
+        )
+    return select(func.count(distinct(Attendance.employee_id))).where(
+        Attendance.date == d, Attendance.check_in.isnot(None)
+    )
+
+
+def present_count_on(db: Session, d: date) -> int:
+    """Số nhân viên có check_in trong ngày d (đọc bit trong day_mask)"""
+    return db.execute(present_count_query(db, d)).scalar() or 0
@@ -0,0 +1,72 @@
+# app/services/event_bus.py
+"""
+Event bus trong process cho stream SSE của dashboard.
+
+- Router (hàm sync, chạy trong threadpool) gọi publish() SAU khi commit.
+  publish() không chờ gì: chỉ đẩy sự kiện sang event loop bằng
+  call_soon_threadsafe rồi trả về ngay.
+- Mỗi kết nối SSE là 1 asyncio.Queue có giới hạn; kết nối idle chỉ là
+  1 coroutine đang await queue.get() -> vài trăm kết nối không tốn thread
+  hay DB session nào.
+- Client đọc chậm làm đầy queue -> bỏ các sự kiện đang chờ, gửi "resync"
+  để client tự tải lại snapshot (không để 1 client chậm giữ bộ nhớ mãi).
+Chạy nhiều worker thì mỗi worker chỉ thấy sự kiện của chính nó.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from typing import Optional, Set
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class EventBus:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+
+    # ----- phía stream (chạy trên event loop) -----
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ----- phía ghi (gọi từ thread nào cũng được) -----
+    def publish(self, event_type: str, **data) -> None:
+        with self._lock:
+            if not self._subscribers or self._loop is None:
+                return  # không ai nghe -> không tốn gì
+            loop = self._loop
+            event = {"id": next(self._ids), "type": event_type, "ts": time.time(), **data}
+
+        try:
+            loop.call_soon_threadsafe(self._fan_out, event)
+        except RuntimeError:
+            pass  # loop đã đóng (đang shutdown)
+
+    def _fan_out(self, event: dict) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # client quá chậm: bỏ hàng đợi, bắt client tải lại snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"id": event["id"], "type": "resync", "ts": event["ts"]})
+
+
+event_bus = EventBus()
@@ -0,0 +1,138 @@
+# app/services/month_calendar.py
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """Trả về (ngày đầu tháng, ngày cuối tháng)"""
+    last_day = monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def months_between(start: date, end: date) -> Iterator[Tuple[int, int]]:
+    """Các (year, month) mà khoảng [start, end] đi qua"""
+    y, m = start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        yield y, m
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+
+def day_bit(d: date) -> int:
+    """Bit của ngày d trong mask tháng (bit 0 = ngày 1)"""
+    return 1 << (d.day - 1)
+
+
+# ====== Lịch tháng dạng bitmask ======
+# 1 tháng = 1 số nguyên, bit (ngày - 1) = 1 nếu ngày đó thuộc tập.
+# Hợp / giao / trừ các tập ngày chỉ là | & ~, đếm ngày = bit_count().
+PRESENT = "present"
+PAID_LEAVE = "paid_leave"
+ABSENT = "absent_unexcused"
+WEEKEND = "weekend"
+FUTURE = "future"
+
+# thứ tự ưu tiên khi 1 ngày thuộc nhiều tập (không thuộc tập nào = ABSENT)
+HEATMAP_ORDER = (PRESENT, PAID_LEAVE, FUTURE, WEEKEND)
+CALENDAR_ORDER = (PRESENT, PAID_LEAVE, WEEKEND, FUTURE)
+
+
+def days_in_month(year: int, month: int) -> int:
+    return monthrange(year, month)[1]
+
+
+def full_mask(year: int, month: int) -> int:
+    return (1 << days_in_month(year, month)) - 1
+
+
+@lru_cache(maxsize=256)
+def weekend_mask(year: int, month: int) -> int:
+    """Thứ 7 + Chủ nhật"""
+    first_weekday = date(year, month, 1).weekday()
+    mask = 0
+    for i in range(days_in_month(year, month)):
+        if (first_weekday + i) % 7 >= 5:
+            mask |= 1 << i
+    return mask
+
+
+def future_mask(year: int, month: int, today: date) -> int:
+    """Các ngày sau hôm nay"""
+    start, end = month_bounds(year, month)
+    if today < start:
+        return full_mask(year, month)
+    if today >= end:
+        return 0
+    return full_mask(year, month) & ~((1 << today.day) - 1)
+
+
+def _clip_mask(start: date, end: date, month_start: date, month_end: date) -> int:
+    s = start if start > month_start else month_start
+    e = end if end < month_end else month_end
+    if s > e:
+        return 0
+    return ((1 << e.day) - 1) ^ ((1 << (s.day - 1)) - 1)
+
+
+def range_mask(year: int, month: int, start: date, end: date) -> int:
+    """Bit các ngày của khoảng [start, end] rơi vào tháng (đã cắt theo tháng)"""
+    return _clip_mask(start, end, *month_bounds(year, month))
+
+
+def leave_mask(year: int, month: int, intervals: Iterable[Tuple[date, date]]) -> int:
+    """Hợp nhiều khoảng nghỉ -> ngày trùng giữa các đơn chỉ tính 1 lần"""
+    month_start, month_end = month_bounds(year, month)
+    mask = 0
+    for start, end in intervals:
+        mask |= _clip_mask(start, end, month_start, month_end)
+    return mask
+
+
+def leave_masks_by_employee(
+    year: int, month: int, rows: Iterable[Tuple[int, date, date]]
+) -> Dict[int, int]:
+    """rows: (employee_id, start_date, end_date) của nhiều nhân viên"""
+    month_start, month_end = month_bounds(year, month)
+    masks: Dict[int, int] = defaultdict(int)
+    for emp_id, start, end in rows:
+        masks[emp_id] |= _clip_mask(start, end, month_start, month_end)
+    return dict(masks)
+
+
+def count_days(mask: int) -> int:
+    return mask.bit_count()
+
+
+def iter_days(mask: int) -> Iterator[int]:
+    """Số thứ tự ngày (1..31) của các bit đang bật"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length()
+        mask ^= low
+
+
+def day_statuses(
+    year: int,
+    month: int,
+    present: int,
+    paid_leave: int,
+    today: date,
+    order: Tuple[str, ...] = HEATMAP_ORDER,
+) -> List[str]:
+    """Trạng thái từng ngày trong tháng (phần tử i = ngày i + 1)"""
+    masks = {
+        PRESENT: present,
+        PAID_LEAVE: paid_leave,
+        WEEKEND: weekend_mask(year, month),
+        FUTURE: future_mask(year, month, today),
+    }
+    statuses = [ABSENT] * days_in_month(year, month)
+    taken = 0
+    for name in order:
+        own = masks[name] & ~taken
+        taken |= own
+        for day in iter_days(own):
+            statuses[day - 1] = name
+    return statuses
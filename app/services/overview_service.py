@@ -0,0 +1,108 @@
+# app/services/overview_service.py
+"""
+Số liệu tổng quan cho /dashboard/overview và /stats/overview.
+
+- Cache trong process với TTL (DASHBOARD_CACHE_TTL_SECONDS, mặc định 30s):
+  dashboard tự refresh liên tục cũng không chạm DB khi cache còn hạn.
+- Cache miss: tính cả 4 con số bằng 1 câu SELECT (scalar subquery).
+- Các đường ghi (nhân viên, chấm công, đơn nghỉ, bảng lương) gọi adjust()
+  hoặc invalidate() SAU khi commit để cache không lệch với DB.
+  Chạy nhiều worker thì mỗi worker có cache riêng -> TTL là độ trễ tối đa.
+"""
+import os
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.employee import Employee
+from app.models.leave_request import LeaveRequest
+from app.models.payroll import Payroll
+from app.services.attendance_rollup import present_count_query
+
+OVERVIEW_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+
+
+def compute_overview(db: Session, today: date) -> Dict[str, object]:
+    """4 con số tổng quan trong 1 round trip"""
+    total_employees = select(func.count(Employee.id)).scalar_subquery()
+    todays_attendance = present_count_query(db, today).scalar_subquery()
+    pending_leaves = (
+        select(func.count(LeaveRequest.id))
+        .where(LeaveRequest.status == "pending")
+        .scalar_subquery()
+    )
+    month_payroll = (
+        select(func.coalesce(func.sum(Payroll.net_salary), 0.0))
+        .where(Payroll.year == today.year, Payroll.month == today.month)
+        .scalar_subquery()
+    )
+
+    row = db.execute(
+        select(total_employees, todays_attendance, pending_leaves, month_payroll)
+    ).one()
+    return {
+        "total_employees": row[0] or 0,
+        "todays_attendance_count": row[1] or 0,
+        "pending_leave_requests": row[2] or 0,
+        "current_month_total_payroll": float(row[3] or 0.0),
+    }
+
+
+class OverviewCache:
+    def __init__(self, ttl: float = OVERVIEW_TTL_SECONDS):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._value: Optional[Dict[str, object]] = None
+        self._day: Optional[date] = None
+        self._expires = 0.0
+        # tăng mỗi lần invalidate / adjust -> bỏ kết quả của lần tính đang chạy dở
+        self._version = 0
+
+    def get(self, db: Session) -> Dict[str, object]:
+        today = date.today()
+        with self._lock:
+            if (
+                self._value is not None
+                and self._day == today
+                and time.monotonic() < self._expires
+            ):
+                return dict(self._value)
+            version = self._version
+
+        value = compute_overview(db, today)
+
+        with self._lock:
+            if version == self._version:
+                self._value = value
+                self._day = today
+                self._expires = time.monotonic() + self._ttl
+        return dict(value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._version += 1
+
+    def adjust(self, key: str, delta) -> None:
+        """Cộng dồn vào con số đang cache (không có cache thì thôi)"""
+        with self._lock:
+            self._version += 1
+            if self._value is not None:
+                self._value[key] += delta
+
+    # ----- tiện cho các đường ghi -----
+    def attendance_changed(self, d: date) -> None:
+        if d == date.today():
+            self.invalidate()
+
+    def payroll_changed(self, year: int, month: int) -> None:
+        today = date.today()
+        if (year, month) == (today.year, today.month):
+            self.invalidate()
+
+
+overview_cache = OverviewCache()
@@ -0,0 +1,252 @@
+# app/services/payroll_service.py
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    and_,
+    cast,
+    distinct,
+    func,
+    literal,
+    literal_column,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+from app.database import upsert
+from app.models.leave_request import LeaveRequest
+from app.models.payroll import Payroll, PayrollDirtyPeriod
+from app.services.analytics_cube import mark_months_stale
+from app.services.attendance_rollup import present_days_by_employee
+from app.services.event_bus import event_bus
+from app.services.month_calendar import (
+    leave_masks_by_employee,
+    month_bounds,
+    months_between,
+)
+from app.services.overview_service import overview_cache
+from app.services.slip_cache import slip_cache
+
+
+def attendance_days_by_employee(
+    db: Session, year: int, month: int, employee_ids=None
+) -> Dict[int, int]:
+    """
+    Số ngày đi làm (có check_in) trong tháng cho nhiều nhân viên,
+    đọc từ attendance_monthly_rollup (1 dòng / nhân viên); tháng chưa
+    backfill rollup thì đếm thẳng từ attendances.
+    - employee_ids: list id hoặc subquery select(Employee.id); None = tất cả
+    """
+    return present_days_by_employee(db, year, month, employee_ids)
+
+
+def paid_leave_masks_by_employee(
+    db: Session, year: int, month: int, employee_ids=None
+) -> Dict[int, int]:
+    """
+    Bitmask ngày nghỉ có phép (approved) trong tháng cho nhiều nhân viên,
+    1 câu query (chỉ lấy các cột cần thiết), các đơn trùng ngày được hợp lại.
+    - employee_ids: list id hoặc subquery select(Employee.id); None = tất cả
+    """
+    start_month, end_month = month_bounds(year, month)
+
+    q = (
+        db.query(
+            LeaveRequest.employee_id,
+            LeaveRequest.start_date,
+            LeaveRequest.end_date,
+        )
+        .filter(
+            LeaveRequest.status == "approved",
+            LeaveRequest.start_date <= end_month,
+            LeaveRequest.end_date >= start_month,
+        )
+    )
+    if employee_ids is not None:
+        q = q.filter(LeaveRequest.employee_id.in_(employee_ids))
+
+    return leave_masks_by_employee(year, month, q)
+
+
+def _month_days(db: Session, year: int, month: int):
+    """Bảng tạm 1 cột `day` = mọi ngày trong tháng (tối đa 31 dòng)"""
+    start_month, end_month = month_bounds(year, month)
+    if db.get_bind().dialect.name == "postgresql":
+        day = cast(
+            func.generate_series(
+                cast(start_month, DateTime),
+                cast(end_month, DateTime),
+                literal_column("interval '1 day'"),
+            ),
+            Date,
+        )
+        return select(day.label("day")).subquery("month_days")
+
+    # MySQL / SQLite: UNION ALL các ngày dạng literal
+    days = [
+        select(literal(start_month + timedelta(days=i), Date).label("day"))
+        for i in range(end_month.day)
+    ]
+    return union_all(*days).subquery("month_days")
+
+
+def paid_leave_days_by_employee(
+    db: Session, year: int, month: int, employee_ids=None
+) -> Dict[int, int]:
+    """
+    Số ngày nghỉ có phép trong tháng, tính hẳn trong DB:
+    nối đơn nghỉ với bảng ngày của tháng (tự cắt theo tháng) rồi
+    COUNT(DISTINCT day) -> các đơn trùng ngày nhau chỉ tính 1 lần,
+    mỗi nhân viên trả về đúng 1 dòng.
+    """
+    start_month, end_month = month_bounds(year, month)
+    days = _month_days(db, year, month)
+
+    q = (
+        db.query(
+            LeaveRequest.employee_id,
+            func.count(distinct(days.c.day)),
+        )
+        .join(
+            days,
+            and_(
+                days.c.day >= LeaveRequest.start_date,
+                days.c.day <= LeaveRequest.end_date,
+            ),
+        )
+        .filter(
+            LeaveRequest.status == "approved",
+            LeaveRequest.start_date <= end_month,
+            LeaveRequest.end_date >= start_month,
+        )
+        .group_by(LeaveRequest.employee_id)
+    )
+    if employee_ids is not None:
+        q = q.filter(LeaveRequest.employee_id.in_(employee_ids))
+    return {emp_id: days_count for emp_id, days_count in q}
+
+
+def compute_salary(
+    base_daily_salary: float,
+    attendance_days: int,
+    paid_leave_days: int,
+    deductions: float,
+) -> Tuple[float, float]:
+    """Trả về (gross_salary, net_salary)"""
+    gross_salary = base_daily_salary * (attendance_days + paid_leave_days)
+    return gross_salary, gross_salary - deductions
+
+
+
+# ====== Hàng đợi kỳ lương cần tính lại ======
+def mark_payroll_dirty(db: Session, keys: Iterable[Tuple[int, int, int]]) -> None:
+    """
+    Đánh dấu (employee_id, year, month) cần tính lại lương.
+    Chạy trong transaction của request ghi (không commit ở đây).
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"employee_id": emp_id, "year": y, "month": m, "marked_at": now}
+        for emp_id, y, m in set(keys)
+    ]
+    # trùng khoá -> cập nhật marked_at để worker không xoá nhầm dấu mới
+    upsert(
+        db,
+        PayrollDirtyPeriod,
+        rows,
+        ["employee_id", "year", "month"],
+        update_cols=["marked_at"],
+    )
+    # cùng các tháng đó, analytics cube cũng cần tính lại
+    mark_months_stale(db, ((r["year"], r["month"]) for r in rows))
+
+
+def mark_leave_dirty(db: Session, employee_id: int, start: date, end: date) -> None:
+    mark_payroll_dirty(
+        db, ((employee_id, y, m) for y, m in months_between(start, end))
+    )
+
+
+def recompute_dirty_payrolls(
+    db: Session, batch_size: int = 500, max_batches: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Lấy từng lô kỳ lương bị đánh dấu, tính lại ngày công / ngày nghỉ
+    có phép và lương của các Payroll đã tồn tại, rồi xoá dấu.
+    Mỗi lô 1 transaction; chi phí tỉ lệ với số thay đổi.
+    """
+    processed = updated = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        started_at = datetime.utcnow()
+        marks = (
+            db.query(PayrollDirtyPeriod)
+            .order_by(PayrollDirtyPeriod.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not marks:
+            break
+
+        by_period = defaultdict(list)
+        changed_ids = []
+        for mk in marks:
+            by_period[(mk.year, mk.month)].append(mk.employee_id)
+
+        for (year, month), emp_ids in by_period.items():
+            payrolls = (
+                db.query(Payroll)
+                .filter(
+                    Payroll.year == year,
+                    Payroll.month == month,
+                    Payroll.employee_id.in_(emp_ids),
+                )
+                .all()
+            )
+            if not payrolls:
+                continue
+
+            ids = [p.employee_id for p in payrolls]
+            attendance_map = attendance_days_by_employee(db, year, month, ids)
+            leave_map = paid_leave_days_by_employee(db, year, month, ids)
+
+            for p in payrolls:
+                p.attendance_days = attendance_map.get(p.employee_id, 0)
+                p.paid_leave_days = leave_map.get(p.employee_id, 0)
+                p.gross_salary, p.net_salary = compute_salary(
+                    p.base_daily_salary,
+                    p.attendance_days,
+                    p.paid_leave_days,
+                    p.deductions,
+                )
+            updated += len(payrolls)
+            changed_ids.extend(p.id for p in payrolls)
+            mark_months_stale(db, [(year, month)])
+
+        # dấu nào bị đánh lại trong lúc đang tính (marked_at mới hơn) thì giữ
+        (
+            db.query(PayrollDirtyPeriod)
+            .filter(
+                PayrollDirtyPeriod.id.in_([mk.id for mk in marks]),
+                PayrollDirtyPeriod.marked_at <= started_at,
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        # xoá phiếu lương cache sau khi commit: request đọc chen giữa không
+        # thể render lại từ số liệu cũ rồi cache lại bản cũ
+        slip_cache.invalidate(changed_ids)
+        for (year, month), emp_ids in by_period.items():
+            overview_cache.payroll_changed(year, month)
+            event_bus.publish(
+                "payroll", action="recomputed", year=year, month=month, count=len(emp_ids)
+            )
+
+        processed += len(marks)
+        batches += 1
+
+    return {"processed": processed, "updated": updated, "batches": batches}
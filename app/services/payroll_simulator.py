@@ -0,0 +1,158 @@
+# app/services/payroll_simulator.py
+"""
+Mô phỏng "what-if" bảng lương trên toàn bộ nhân sự.
+
+Dữ liệu 1 kỳ lương được nạp 1 lần thành các mảng NumPy theo cột,
+mỗi kịch bản chỉ là vài phép toán vector trên các mảng đó.
+Module này CHỈ ĐỌC, không bao giờ ghi Payroll.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.employee import Employee
+from app.models.payroll import Payroll
+from app.schemas.payroll import (
+    SimulationDistribution,
+    SimulationRule,
+    SimulationScenario,
+    SimulationScenarioResult,
+)
+
+
+class PayrollFrame:
+    """Dữ liệu lương 1 kỳ dạng cột (mỗi phần tử = 1 nhân viên)"""
+
+    def __init__(self, rows: list):
+        self.size = len(rows)
+
+        if rows:
+            emp_ids, depts, positions, att, leave, salary, deduct = zip(*rows)
+        else:
+            emp_ids = depts = positions = att = leave = salary = deduct = ()
+
+        self.employee_id = np.asarray(emp_ids, dtype=np.int64)
+        self.paid_days = np.asarray(att, dtype=np.float64) + np.asarray(
+            leave, dtype=np.float64
+        )
+        self.base_daily_salary = np.asarray(salary, dtype=np.float64)
+        self.deductions = np.asarray(deduct, dtype=np.float64)
+
+        # phòng ban / chức vụ -> mã số nguyên để so sánh vector
+        self.departments, self.department_code = np.unique(
+            np.asarray([d or "" for d in depts], dtype=object).astype(str),
+            return_inverse=True,
+        )
+        self.positions, self.position_code = np.unique(
+            np.asarray([p or "" for p in positions], dtype=object).astype(str),
+            return_inverse=True,
+        )
+
+    def _mask(self, department: Optional[str], position: Optional[str]) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        if department is not None:
+            mask &= _code_mask(self.departments, self.department_code, department)
+        if position is not None:
+            mask &= _code_mask(self.positions, self.position_code, position)
+        return mask
+
+    def apply(self, rules: List[SimulationRule]):
+        """Áp danh sách rule theo thứ tự, trả về (salary, deductions) mới"""
+        salary = self.base_daily_salary.copy()
+        deductions = self.deductions.copy()
+
+        for rule in rules:
+            target = salary if rule.field == "base_daily_salary" else deductions
+            mask = self._mask(rule.department, rule.position)
+            if rule.change == "percent":
+                target *= np.where(mask, 1.0 + rule.value / 100.0, 1.0)
+            else:
+                target += np.where(mask, rule.value, 0.0)
+
+        np.maximum(salary, 0.0, out=salary)
+        np.maximum(deductions, 0.0, out=deductions)
+        return salary, deductions
+
+
+def _code_mask(labels: np.ndarray, codes: np.ndarray, value: str) -> np.ndarray:
+    idx = np.searchsorted(labels, value)
+    if idx >= len(labels) or labels[idx] != value:
+        return np.zeros(len(codes), dtype=bool)
+    return codes == idx
+
+
+def load_payroll_frame(
+    db: Session, year: int, month: int, department: Optional[str] = None
+) -> PayrollFrame:
+    """Nạp bảng lương đã tính của 1 kỳ bằng 1 query (chỉ các cột cần)"""
+    q = (
+        db.query(
+            Payroll.employee_id,
+            Employee.department,
+            Employee.position,
+            Payroll.attendance_days,
+            Payroll.paid_leave_days,
+            Payroll.base_daily_salary,
+            Payroll.deductions,
+        )
+        .join(Employee, Payroll.employee_id == Employee.id)
+        .filter(Payroll.year == year, Payroll.month == month)
+    )
+    if department is not None:
+        q = q.filter(Employee.department == department)
+
+    return PayrollFrame(q.all())
+
+
+def _distribution(values: np.ndarray) -> SimulationDistribution:
+    if values.size == 0:
+        return SimulationDistribution(
+            min=0.0, p10=0.0, p50=0.0, p90=0.0, max=0.0, mean=0.0
+        )
+    p0, p10, p50, p90, p100 = np.percentile(values, [0, 10, 50, 90, 100])
+    return SimulationDistribution(
+        min=float(p0),
+        p10=float(p10),
+        p50=float(p50),
+        p90=float(p90),
+        max=float(p100),
+        mean=float(values.mean()),
+    )
+
+
+def run_scenario(
+    frame: PayrollFrame,
+    scenario: SimulationScenario,
+    baseline_net: Optional[float] = None,
+) -> SimulationScenarioResult:
+    salary, deductions = frame.apply(scenario.rules)
+    gross = salary * frame.paid_days
+    net = gross - deductions
+    total_net = float(net.sum())
+
+    by_department = np.bincount(
+        frame.department_code, weights=net, minlength=len(frame.departments)
+    )
+
+    return SimulationScenarioResult(
+        name=scenario.name,
+        employees=frame.size,
+        total_gross=float(gross.sum()),
+        total_deductions=float(deductions.sum()),
+        total_net=total_net,
+        delta_net=total_net - baseline_net if baseline_net is not None else 0.0,
+        net_distribution=_distribution(net),
+        net_by_department={
+            str(dept): float(total)
+            for dept, total in zip(frame.departments, by_department)
+        },
+    )
+
+
+def simulate(
+    frame: PayrollFrame, scenarios: List[SimulationScenario]
+) -> Dict[str, object]:
+    baseline = run_scenario(frame, SimulationScenario(name="baseline"))
+    results = [run_scenario(frame, sc, baseline.total_net) for sc in scenarios]
+    return {"baseline": baseline, "scenarios": results}
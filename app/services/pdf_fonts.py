@@ -0,0 +1,56 @@
+# app/services/pdf_fonts.py
+"""
+Font Unicode cho PDF (Helvetica chuẩn của reportlab không có dấu tiếng Việt).
+
+register_fonts() đăng ký font TTF 1 lần cho mỗi process: gọi lúc app khởi
+động và trong initializer của render pool. Thứ tự tìm font:
+REPORT_FONT_PATH / REPORT_FONT_BOLD_PATH -> DejaVu Sans -> Arial (Windows).
+Không tìm thấy font nào thì dùng tạm Helvetica.
+"""
+import os
+import threading
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+_CANDIDATES = [
+    (os.getenv("REPORT_FONT_PATH"), os.getenv("REPORT_FONT_BOLD_PATH")),
+    (
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    ),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", None),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+]
+
+_registered = False
+_lock = threading.Lock()
+
+
+def register_fonts() -> str:
+    """Đăng ký font (chỉ lần gọi đầu tiên có tác dụng), trả về tên font thường"""
+    global FONT, FONT_BOLD, _registered
+    with _lock:
+        if _registered:
+            return FONT
+        _registered = True
+
+        for regular, bold in _CANDIDATES:
+            if not regular or not os.path.exists(regular):
+                continue
+            try:
+                pdfmetrics.registerFont(TTFont("HR-Regular", regular))
+                FONT = FONT_BOLD = "HR-Regular"
+                if bold and os.path.exists(bold):
+                    pdfmetrics.registerFont(TTFont("HR-Bold", bold))
+                    FONT_BOLD = "HR-Bold"
+                return FONT
+            except Exception as e:
+                print(f"[WARN] Không nạp được font {regular}: {e}")
+
+        print("[WARN] Không tìm thấy font Unicode, PDF sẽ dùng Helvetica (mất dấu)")
+        return FONT
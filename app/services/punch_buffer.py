@@ -0,0 +1,400 @@
+# app/services/punch_buffer.py
+"""
+Chế độ ghi đệm (write-behind) cho clock-in / clock-out - tuỳ chọn,
+bật bằng PUNCH_BUFFER_ENABLED=true.
+
+- Lượt chấm được ghi vào journal SQLite (WAL) trên đĩa local rồi trả lời
+  ngay, không chạm DB chính (trừ lượt đầu của mỗi nhân viên: kiểm tra
+  nhân viên có tồn tại).
+- Thread nền gom journal mỗi PUNCH_FLUSH_INTERVAL_MS ms hoặc khi đủ
+  PUNCH_FLUSH_MAX_ROWS dòng: 1 transaction / lô (INSERT nhiều dòng +
+  UPDATE theo lô + rollup + đánh dấu bảng lương), commit xong mới xoá
+  khỏi journal.
+- Process chết giữa chừng: lúc khởi động, các dòng còn trong journal được
+  ghi lại. Ghi lại là idempotent (giờ vào lấy sớm nhất, giờ ra lấy muộn nhất)
+  nên lô đã commit nhưng chưa kịp xoá journal có chạy lại cũng không sao.
+- Chạy nhiều worker dùng chung 1 file journal cũng được (SQLite tự khoá,
+  ghi trùng lô không sao vì idempotent).
+- PUNCH_JOURNAL_SYNC=NORMAL (mặc định) an toàn khi process chết;
+  FULL thì an toàn cả khi mất điện nhưng fsync mỗi lượt chấm.
+- Lô vẫn lỗi dữ liệu sau 1 lần thử lại -> ghi riêng từng dòng, dòng nào
+  vẫn lỗi chuyển sang bảng punch_dead_letters (đếm trong metrics) để các
+  lượt chấm còn lại không bị kẹt. DB chính mất kết nối thì vẫn giữ journal.
+
+Đổi lại: lúc trả lời chưa biết đây có phải lần chấm vào đầu tiên không,
+và clock-out khi chưa có giờ vào bị bỏ lúc ghi (đếm trong metrics).
+"""
+import os
+import sqlite3
+import threading
+from collections import deque
+from datetime import date, datetime, time
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import BASE_DIR, SessionLocal
+from app.models.attendance import Attendance, PunchDeadLetter
+from app.models.employee import Employee
+from app.services.attendance_rollup import apply_day_changes
+from app.services.event_bus import event_bus
+from app.services.overview_service import overview_cache
+from app.services.payroll_service import mark_payroll_dirty
+
+BUFFER_ENABLED = os.getenv("PUNCH_BUFFER_ENABLED", "false").lower() == "true"
+JOURNAL_PATH = Path(os.getenv("PUNCH_JOURNAL_PATH", BASE_DIR / "var" / "punch_journal.sqlite3"))
+JOURNAL_SYNC = os.getenv("PUNCH_JOURNAL_SYNC", "NORMAL").upper()
+FLUSH_INTERVAL_MS = int(os.getenv("PUNCH_FLUSH_INTERVAL_MS", "200"))
+FLUSH_MAX_ROWS = int(os.getenv("PUNCH_FLUSH_MAX_ROWS", "1000"))
+
+CLOCK_IN = "in"
+CLOCK_OUT = "out"
+
+_att = Attendance.__table__
+
+
+def _earliest(a: Optional[time], b: Optional[time]) -> Optional[time]:
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _latest(a: Optional[time], b: Optional[time]) -> Optional[time]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+class PunchBuffer:
+    def __init__(
+        self,
+        path: Path = JOURNAL_PATH,
+        interval_ms: int = FLUSH_INTERVAL_MS,
+        max_rows: int = FLUSH_MAX_ROWS,
+        sync: str = JOURNAL_SYNC,
+    ):
+        self.path = Path(path)
+        self.interval = interval_ms / 1000
+        self.max_rows = max_rows
+        self.sync = sync if sync in ("OFF", "NORMAL", "FULL") else "NORMAL"
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # nhân viên đã xác nhận có tồn tại -> lần chấm sau không chạm DB chính
+        self._known_employees: Set[int] = set()
+
+        # metrics
+        self._depth = 0
+        self._replayed = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._dropped_clock_outs = 0
+        self._dead_letters = 0
+        self._errors = 0
+        self._last_error: Optional[str] = None
+        self._last_flush_at: Optional[datetime] = None
+        self._latencies = deque(maxlen=500)  # giây / lô
+
+    @property
+    def started(self) -> bool:
+        return self._conn is not None
+
+    # ====== Vòng đời ======
+    def start(self) -> None:
+        if self._conn is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.sync}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS punches ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " employee_id INTEGER NOT NULL,"
+            " ts TEXT NOT NULL)"
+        )
+        self._conn = conn
+        # dòng còn sót từ lần chạy trước (crash) -> flusher ghi lại ngay vòng đầu
+        self._depth = self._replayed = conn.execute("SELECT COUNT(*) FROM punches").fetchone()[0]
+        if self._replayed:
+            print(f"[PUNCH] Ghi lại {self._replayed} lượt chấm còn trong journal")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="punch-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._conn is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()  # cố ghi nốt
+        except Exception as e:
+            print(f"[PUNCH] Flush lúc tắt lỗi, journal giữ lại cho lần khởi động sau: {e}")
+        with self._lock:
+            self._conn.close()
+            self._conn = None
+
+    # ====== Ghi journal (đường request) ======
+    def employee_exists(self, db: Session, employee_id: int) -> bool:
+        """
+        Kiểm tra trước khi ghi journal. Chỉ nhớ kết quả "có": nhân viên bị xoá
+        sau đó thì lượt chấm rơi vào punch_dead_letters lúc flush.
+        """
+        if employee_id in self._known_employees:
+            return True
+        found = db.query(Employee.id).filter(Employee.id == employee_id).first() is not None
+        if found:
+            self._known_employees.add(employee_id)
+        return found
+
+    def append(self, kind: str, employee_id: int, ts: datetime) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO punches (kind, employee_id, ts) VALUES (?, ?, ?)",
+                (kind, employee_id, ts.isoformat()),
+            )
+            self._depth += 1
+            depth = self._depth
+        if depth >= self.max_rows:
+            self._wake.set()
+
+    # ====== Flusher ======
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                # DB chính lỗi -> giữ journal, thử lại vòng sau
+                self._errors += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+                print(f"[PUNCH] Flush lỗi: {self._last_error}")
+                self._stop.wait(min(5.0, self.interval * 10))
+
+    def _read_batch(self) -> List[Tuple[int, str, int, datetime]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, kind, employee_id, ts FROM punches ORDER BY seq LIMIT ?",
+                (self.max_rows,),
+            ).fetchall()
+        return [(seq, kind, emp, datetime.fromisoformat(ts)) for seq, kind, emp, ts in rows]
+
+    def _ack(self, last_seq: int, n: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM punches WHERE seq <= ?", (last_seq,))
+            self._depth = max(0, self._depth - n)
+
+    def flush(self) -> int:
+        """Ghi hết journal vào DB chính. Trả về số lượt chấm đã ghi."""
+        total = 0
+        while True:
+            batch = self._read_batch()
+            if not batch:
+                return total
+            t0 = perf_counter()
+            new_today = self._apply_or_dead_letter(batch)
+            self._latencies.append(perf_counter() - t0)
+            self._ack(batch[-1][0], len(batch))
+
+            self._flushes += 1
+            self._flushed_rows += len(batch)
+            self._last_flush_at = datetime.utcnow()
+            total += len(batch)
+
+            if new_today:
+                overview_cache.adjust("todays_attendance_count", new_today)
+            event_bus.publish(
+                "attendance",
+                action="punch_batch",
+                count=len(batch),
+                delta={"todays_attendance_count": new_today},
+            )
+
+    def _apply_or_dead_letter(self, batch) -> int:
+        try:
+            return self._apply_with_retry(batch)
+        except (IntegrityError, DataError):
+            pass
+
+        # lô vẫn lỗi dữ liệu -> ghi từng dòng (theo thứ tự seq: giờ vào trước
+        # giờ ra), dòng hỏng chuyển sang dead-letter, phần còn lại vẫn vào DB
+        new_today = 0
+        for row in batch:
+            try:
+                new_today += self._apply_with_retry([row])
+            except (IntegrityError, DataError) as e:
+                self._dead_letter(row, e)
+        return new_today
+
+    def _dead_letter(self, row, error: Exception) -> None:
+        _, kind, emp_id, ts = row
+        message = str(getattr(error, "orig", None) or error)
+        db = SessionLocal()
+        try:
+            db.add(
+                PunchDeadLetter(
+                    kind=kind,
+                    employee_id=emp_id,
+                    punched_at=ts,
+                    error=message[:500],
+                    failed_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        self._dead_letters += 1
+        self._known_employees.discard(emp_id)
+        print(f"[PUNCH] Chuyển lượt chấm {kind} của nhân viên {emp_id} ({ts}) sang dead-letter: {message}")
+
+    def _apply_with_retry(self, batch) -> int:
+        # request thường / worker khác chèn cùng (nhân viên, ngày) giữa lúc
+        # đọc và ghi -> unique key báo trùng, đọc lại rồi làm lại 1 lần
+        try:
+            return self._apply(batch)
+        except IntegrityError:
+            return self._apply(batch)
+
+    def _apply(self, batch) -> int:
+        """1 transaction cho cả lô. Trả về số người đi làm hôm nay tăng thêm."""
+        # gộp theo (nhân viên, ngày): giờ vào sớm nhất, giờ ra muộn nhất
+        ins: Dict[Tuple[int, date], time] = {}
+        outs: Dict[Tuple[int, date], time] = {}
+        for _, kind, emp_id, ts in batch:
+            key = (emp_id, ts.date())
+            t = ts.time().replace(microsecond=0)
+            if kind == CLOCK_IN:
+                ins[key] = _earliest(ins.get(key), t)
+            else:
+                outs[key] = _latest(outs.get(key), t)
+
+        keys = set(ins) | set(outs)
+        today = date.today()
+        now = datetime.utcnow()
+
+        db = SessionLocal()
+        try:
+            # lô thường chỉ có 1-2 ngày -> lọc IN rồi so khoá trong Python
+            q = db.query(
+                Attendance.id,
+                Attendance.employee_id,
+                Attendance.date,
+                Attendance.check_in,
+                Attendance.check_out,
+            ).filter(
+                Attendance.employee_id.in_({e for e, _ in keys}),
+                Attendance.date.in_({d for _, d in keys}),
+            ).with_for_update()  # giờ cũ dùng để cập nhật rollup theo chênh lệch
+            existing = {(e, d): (att_id, ci, co) for att_id, e, d, ci, co in q}
+
+            new_rows, changes, day_changes, periods = [], [], [], set()
+            new_today = dropped = 0
+            for key in keys:
+                emp_id, d = key
+                t_in, t_out = ins.get(key), outs.get(key)
+                old_id, old_in, old_out = existing.get(key, (None, None, None))
+
+                check_in = _earliest(old_in, t_in)
+                if check_in is None:
+                    dropped += 1  # clock-out mà chưa từng clock-in
+                    continue
+                check_out = _latest(old_out, t_out)
+
+                if old_id is None:
+                    new_rows.append(
+                        {
+                            "employee_id": emp_id,
+                            "date": d,
+                            "check_in": check_in,
+                            "check_out": check_out,
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                    )
+                elif (check_in, check_out) != (old_in, old_out):
+                    changes.append(
+                        {"_id": old_id, "_in": check_in, "_out": check_out, "_ts": now}
+                    )
+                else:
+                    continue  # chấm lặp lại, không đổi gì
+                old = None if old_id is None else (old_in, old_out)
+                day_changes.append((emp_id, d, old, (check_in, check_out)))
+                periods.add((emp_id, d.year, d.month))
+                if old_in is None and d == today:
+                    new_today += 1
+
+            if new_rows:
+                db.execute(insert(_att), new_rows)
+            if changes:
+                db.execute(
+                    update(_att)
+                    .where(_att.c.id == bindparam("_id"))
+                    .values(
+                        check_in=bindparam("_in"),
+                        check_out=bindparam("_out"),
+                        updated_at=bindparam("_ts"),
+                    ),
+                    changes,
+                )
+            if periods:
+                apply_day_changes(db, day_changes)
+                mark_payroll_dirty(db, periods)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self._dropped_clock_outs += dropped
+        return new_today
+
+    # ====== Metrics ======
+    def metrics(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2)
+
+        oldest_age = None
+        if self._conn is not None:
+            with self._lock:
+                row = self._conn.execute("SELECT MIN(ts) FROM punches").fetchone()
+            if row and row[0]:
+                oldest_age = round(
+                    (datetime.now() - datetime.fromisoformat(row[0])).total_seconds(), 3
+                )
+
+        return {
+            "enabled": self.started,
+            "journal_path": str(self.path),
+            "queue_depth": self._depth,
+            "oldest_pending_seconds": oldest_age,
+            "replayed_on_startup": self._replayed,
+            "flushes": self._flushes,
+            "flushed_rows": self._flushed_rows,
+            "dropped_clock_outs": self._dropped_clock_outs,
+            "dead_letters": self._dead_letters,
+            "errors": self._errors,
+            "last_error": self._last_error,
+            "last_flush_at": self._last_flush_at,
+            "flush_interval_ms": int(self.interval * 1000),
+            "flush_max_rows": self.max_rows,
+            "flush_latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+        }
+
+
+punch_buffer = PunchBuffer()
@@ -0,0 +1,116 @@
+# app/services/punch_service.py
+"""
+Clock-in / clock-out cho giờ cao điểm (mọi người chấm công trong ~10 phút).
+
+Dựa trên khoá unique (employee_id, date) của attendances:
+- clock_in: INSERT ... SELECT từ employees (đường chính: 1 câu lệnh), nhân
+  viên không tồn tại -> 0 dòng -> EmployeeNotFound (SQLite không kiểm tra
+  khoá ngoại nên không dựa vào lỗi FK). Trùng khoá -> UPDATE điền check_in
+  nếu đang trống. Lần chấm sau giữ nguyên giờ vào đầu tiên.
+  Không dùng ON CONFLICT vì MySQL không cho biết dòng vừa chèn hay đã có,
+  mà dashboard cần biết để cộng đúng số người đi làm hôm nay.
+- clock_out: SELECT ... FOR UPDATE dòng hôm nay (lấy giờ cũ cho rollup) rồi
+  UPDATE, lần sau ghi đè (giờ ra = lần chấm cuối).
+Rollup / đánh dấu bảng lương đi cùng transaction như mọi đường ghi khác.
+"""
+from datetime import datetime, time
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Time, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.services.attendance_rollup import apply_day_changes
+from app.services.payroll_service import mark_payroll_dirty
+
+_att = Attendance.__table__
+_emp = Employee.__table__
+
+
+class EmployeeNotFound(LookupError):
+    pass
+
+
+def punch_time(now: datetime) -> time:
+    return now.time().replace(microsecond=0)
+
+
+def clock_in(db: Session, employee_id: int, now: Optional[datetime] = None) -> bool:
+    """
+    Ghi giờ vào của ngày hôm nay. Trả về True nếu đây là lần chấm vào đầu tiên
+    trong ngày (đã commit), False nếu đã chấm vào từ trước (không ghi gì).
+    Nhân viên không tồn tại -> EmployeeNotFound.
+    """
+    now = now or datetime.now()
+    d = now.date()
+    t = punch_time(now)
+    stamp = datetime.utcnow()
+
+    try:
+        inserted = db.execute(
+            insert(_att).from_select(
+                ["employee_id", "date", "check_in", "created_at", "updated_at"],
+                select(
+                    _emp.c.id,
+                    literal(d, Date),
+                    literal(t, Time),
+                    literal(stamp, DateTime),
+                    literal(stamp, DateTime),
+                ).where(_emp.c.id == employee_id),
+            )
+        )
+    except IntegrityError:
+        # câu đầu tiên của transaction -> rollback không mất gì
+        db.rollback()
+        filled = db.execute(
+            update(_att)
+            .where(
+                _att.c.employee_id == employee_id,
+                _att.c.date == d,
+                _att.c.check_in.is_(None),
+            )
+            .values(check_in=t, updated_at=stamp)
+        )
+        if filled.rowcount == 0:
+            db.rollback()
+            return False
+    else:
+        if inserted.rowcount == 0:
+            db.rollback()
+            raise EmployeeNotFound(employee_id)
+
+    # dòng trống check_in thì cũng chưa có check_out -> 0 phút như dòng mới
+    apply_day_changes(db, [(employee_id, d, None, (t, None))])
+    mark_payroll_dirty(db, [(employee_id, d.year, d.month)])
+    db.commit()
+    return True
+
+
+def clock_out(db: Session, employee_id: int, now: Optional[datetime] = None) -> bool:
+    """Ghi giờ ra của hôm nay. False nếu hôm nay chưa chấm vào."""
+    now = now or datetime.now()
+    d = now.date()
+    t = punch_time(now)
+
+    # khoá dòng của ngày: giờ cũ dùng để cộng đúng số phút vào rollup
+    row = db.execute(
+        select(_att.c.check_in, _att.c.check_out)
+        .where(_att.c.employee_id == employee_id, _att.c.date == d)
+        .with_for_update()
+    ).first()
+    if row is None or row.check_in is None:
+        db.rollback()
+        return False
+
+    db.execute(
+        update(_att)
+        .where(_att.c.employee_id == employee_id, _att.c.date == d)
+        .values(check_out=t, updated_at=datetime.utcnow())
+    )
+
+    apply_day_changes(db, [(employee_id, d, tuple(row), (row.check_in, t))])
+    mark_payroll_dirty(db, [(employee_id, d.year, d.month)])
+    db.commit()
+    return True
@@ -0,0 +1,39 @@
+# app/services/render_pool.py
+"""
+Process pool dùng chung cho các bước render nặng CPU (PDF),
+để không giành GIL với các request API thường.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.services.pdf_fonts import register_fonts
+
+RENDER_PROCESSES = int(os.getenv("REPORT_RENDER_PROCESSES", max(1, (os.cpu_count() or 2) // 2)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: không fork cả process uvicorn đang chạy nhiều thread
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                # mỗi worker đăng ký font 1 lần khi khởi động
+                initializer=register_fonts,
+            )
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
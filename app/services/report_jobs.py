@@ -0,0 +1,295 @@
+# app/services/report_jobs.py
+"""
+Hàng đợi job xuất báo cáo chạy nền.
+
+- Trạng thái job nằm ở bảng report_jobs, file kết quả ở thư mục dùng chung
+  REPORT_JOB_DIR -> chạy nhiều worker uvicorn thì worker nào cũng trả được
+  trạng thái / file, dù job do worker khác nhận. Nhiều máy chủ: REPORT_JOB_DIR
+  phải là ổ mạng dùng chung.
+- Job chạy trong worker đã nhận nó. Số job chạy song song mỗi worker bị giới
+  hạn bởi REPORT_JOB_WORKERS (thread riêng, không dùng threadpool của
+  FastAPI) -> export lớn không chiếm hết API.
+- Số job đang chờ/chạy (mọi worker) tối đa REPORT_JOB_MAX_PENDING, vượt thì từ chối.
+- Bước render (PDF và Excel, đều nặng CPU) chạy trong process pool, thread
+  của job chỉ đếm số dòng rồi chờ kết quả.
+- File kết quả của job đã xong / lỗi giữ REPORT_JOB_RETENTION_SECONDS rồi tự
+  xoá. Job đang chờ / chạy không bao giờ bị xoá.
+- Worker giữ job nào thì định kỳ cập nhật heartbeat_at của job đó (kể cả
+  job còn xếp hàng). Job chờ / chạy không thuộc worker hiện tại mà quá
+  REPORT_JOB_STALE_SECONDS không có heartbeat -> worker kia đã chết -> failed.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import BASE_DIR, SessionLocal
+from app.models.report_job import ReportJob
+from app.schemas.report import ReportFilters
+from app.services import report_service
+from app.services.render_pool import get_render_pool
+
+JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+MAX_PENDING = int(os.getenv("REPORT_JOB_MAX_PENDING", "10"))
+RETENTION_SECONDS = int(os.getenv("REPORT_JOB_RETENTION_SECONDS", "3600"))
+STALE_SECONDS = int(os.getenv("REPORT_JOB_STALE_SECONDS", "900"))
+HEARTBEAT_SECONDS = max(1, STALE_SECONDS // 3)
+JOB_DIR = Path(os.getenv("REPORT_JOB_DIR", BASE_DIR / "var" / "report_jobs"))
+
+REPORTS = {
+    # report_type: (tên file, media type)
+    "payroll-excel": ("bang_luong.xlsx", report_service.XLSX_MEDIA_TYPE),
+    "payroll-pdf": ("bang_luong.pdf", report_service.PDF_MEDIA_TYPE),
+    "attendance-excel": ("cham_cong.xlsx", report_service.XLSX_MEDIA_TYPE),
+}
+ACTIVE = ("queued", "running")
+EXCEL_REPORTS = {
+    # report_type: (tên sheet, header, hàm đọc dòng)
+    "attendance-excel": (
+        "Cham cong", report_service.ATTENDANCE_HEADER, report_service.iter_attendance_rows
+    ),
+    "payroll-excel": (
+        "Bang luong", report_service.PAYROLL_HEADER, report_service.iter_payroll_rows
+    ),
+}
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _update_job(job_id: str, **values) -> None:
+    db = SessionLocal()
+    try:
+        db.query(ReportJob).filter(ReportJob.id == job_id).update(
+            values, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _progress(job_id: str):
+    def update(count: int):
+        # tiến độ chỉ để hiển thị: DB đang bận (SQLite khoá ghi) thì bỏ qua lần này
+        try:
+            _update_job(job_id, processed_rows=count, heartbeat_at=datetime.utcnow())
+        except OperationalError:
+            pass
+    return update
+
+
+def _render_payroll_pdf(job_id: str, path: str, filters_json: str) -> int:
+    """
+    Chạy trong process pool: tự đọc dữ liệu (stream theo FETCH_SIZE) và vẽ
+    PDF từng trang, báo tiến độ thẳng vào report_jobs -> không dựng list
+    mọi dòng, bộ nhớ không tăng theo số dòng.
+    """
+    filters = ReportFilters.model_validate_json(filters_json)
+    db = SessionLocal()
+    try:
+        with open(path, "wb") as f:
+            return report_service.write_payroll_pdf(
+                f, report_service.iter_payroll_pdf_rows(db, filters), _progress(job_id)
+            )
+    finally:
+        db.close()
+
+
+def _render_excel(job_id: str, report_type: str, path: str, filters_json: str) -> int:
+    """Chạy trong process pool như PDF: dựng XML của xlsx cũng nặng CPU"""
+    title, header, iter_rows = EXCEL_REPORTS[report_type]
+    filters = ReportFilters.model_validate_json(filters_json)
+    db = SessionLocal()
+    try:
+        with open(path, "wb") as f:
+            return report_service.write_excel(
+                f, title, header, iter_rows(db, filters), _progress(job_id)
+            )
+    finally:
+        db.close()
+
+
+class ReportJobManager:
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=JOB_WORKERS, thread_name_prefix="report-job"
+        )
+        # job do process này nhận, chưa xong (heartbeat, đánh dấu failed khi tắt)
+        self._mine = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = None
+
+    # ----- API -----
+    def submit(
+        self, db: Session, report_type: str, filters: ReportFilters, owner_id: int
+    ) -> ReportJob:
+        self.purge_expired(db)
+        active = db.query(ReportJob).filter(ReportJob.status.in_(ACTIVE)).count()
+        if active >= MAX_PENDING:
+            raise JobQueueFull()
+
+        now = datetime.utcnow()
+        job = ReportJob(
+            id=uuid.uuid4().hex,
+            report_type=report_type,
+            filters=filters.model_dump_json(),
+            owner_id=owner_id,
+            status="queued",
+            processed_rows=0,
+            created_at=now,
+            heartbeat_at=now,
+        )
+        db.add(job)
+        db.commit()
+
+        with self._lock:
+            self._mine.add(job.id)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._heartbeat_loop, name="report-job-heartbeat", daemon=True
+                )
+                self._heartbeat.start()
+        self._executor.submit(self._run, job.id, report_type, filters)
+        return job
+
+    def get(self, db: Session, job_id: str, owner_id: int) -> Optional[ReportJob]:
+        """Chỉ người tạo job mới xem / tải được"""
+        self.purge_expired(db)
+        return (
+            db.query(ReportJob)
+            .filter(ReportJob.id == job_id, ReportJob.owner_id == owner_id)
+            .first()
+        )
+
+    def file_of(self, job: ReportJob):
+        """(đường dẫn, tên file tải về, media type) của job đã xong"""
+        filename, media_type = REPORTS[job.report_type]
+        return JOB_DIR / job.file_name, filename, media_type
+
+    def purge_expired(self, db: Session) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            mine = list(self._mine)
+
+        # job của worker đã chết (không còn ai heartbeat) -> failed, rồi hết
+        # hạn như job thường. Job còn trong executor của process này thì bỏ qua.
+        stale_q = db.query(ReportJob).filter(
+            ReportJob.status.in_(ACTIVE),
+            ReportJob.heartbeat_at < now - timedelta(seconds=STALE_SECONDS),
+        )
+        if mine:
+            stale_q = stale_q.filter(ReportJob.id.notin_(mine))
+        stale_q.update(
+            {
+                "status": "failed",
+                "error": "Worker xử lý báo cáo đã dừng",
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=RETENTION_SECONDS),
+            },
+            synchronize_session=False,
+        )
+
+        expired = (
+            db.query(ReportJob)
+            .filter(ReportJob.status.notin_(ACTIVE), ReportJob.expires_at < now)
+            .all()
+        )
+        for job in expired:
+            if job.file_name:
+                (JOB_DIR / job.file_name).unlink(missing_ok=True)
+            db.delete(job)
+        db.commit()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            unfinished = list(self._mine)
+        for job_id in unfinished:
+            try:
+                self._finish(job_id, error="Server dừng trước khi báo cáo tạo xong")
+            except Exception:
+                pass
+
+    # ----- worker -----
+    def _heartbeat_loop(self) -> None:
+        # báo "worker còn sống" cho mọi job đang giữ, kể cả job còn xếp hàng
+        while not self._stopped.wait(HEARTBEAT_SECONDS):
+            with self._lock:
+                mine = list(self._mine)
+            if not mine:
+                continue
+            try:
+                db = SessionLocal()
+                try:
+                    db.query(ReportJob).filter(
+                        ReportJob.id.in_(mine), ReportJob.status.in_(ACTIVE)
+                    ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+            except OperationalError:
+                pass  # DB bận: lần sau báo lại, còn dư 2 nhịp trước khi bị coi là chết
+
+    def _finish(self, job_id: str, file_name: Optional[str] = None, error: Optional[str] = None):
+        now = datetime.utcnow()
+        values = {
+            "status": "failed" if error else "done",
+            "finished_at": now,
+            "heartbeat_at": now,
+            "expires_at": now + timedelta(seconds=RETENTION_SECONDS),
+        }
+        if error:
+            values["error"] = error[:500]
+        else:
+            values["file_name"] = file_name
+        _update_job(job_id, **values)
+        with self._lock:
+            self._mine.discard(job_id)
+
+    def _run(self, job_id: str, report_type: str, filters: ReportFilters) -> None:
+        now = datetime.utcnow()
+        _update_job(job_id, status="running", started_at=now, heartbeat_at=now)
+
+        JOB_DIR.mkdir(parents=True, exist_ok=True)
+        file_name = f"{job_id}_{REPORTS[report_type][0]}"
+        path = JOB_DIR / file_name
+        filters_json = filters.model_dump_json()
+
+        db = SessionLocal()
+        try:
+            if report_type == "attendance-excel":
+                total = report_service.count_attendance_rows(db, filters)
+            else:
+                total = report_service.count_payroll_rows(db, filters)
+            _update_job(job_id, total_rows=total)
+
+            # render (nặng CPU) ở process pool, process đó tự đọc dữ liệu
+            if report_type == "payroll-pdf":
+                task = (_render_payroll_pdf, job_id, str(path), filters_json)
+            else:
+                task = (_render_excel, job_id, report_type, str(path), filters_json)
+            get_render_pool().submit(*task).result()
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        else:
+            error = None
+        finally:
+            db.close()
+
+        if error:
+            path.unlink(missing_ok=True)
+            self._finish(job_id, error=error)
+        else:
+            self._finish(job_id, file_name=file_name)
+
+
+report_jobs = ReportJobManager()
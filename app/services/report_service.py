@@ -0,0 +1,661 @@
+# app/services/report_service.py
+import csv
+import io
+import json
+import zlib
+import zipfile
+from datetime import date
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from openpyxl import Workbook
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+from sqlalchemy import and_, false, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.models.payroll import Payroll
+from app.schemas.report import ReportFilters
+from app.services import pdf_fonts
+from app.services.month_calendar import month_bounds
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MEDIA_TYPE = "application/pdf"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_MEDIA_TYPE = "application/gzip"
+
+# số dòng lấy mỗi lần từ server-side cursor
+FETCH_SIZE = 2000
+# số dòng gom lại trước khi đẩy 1 chunk CSV/NDJSON ra client
+ROWS_PER_CHUNK = 500
+# số phiếu lương mỗi task gửi sang process pool
+SLIP_CHUNK_SIZE = 50
+# kích thước mỗi chunk gửi về client
+STREAM_CHUNK_SIZE = 64 * 1024
+
+PAYROLL_HEADER = [
+    "ID", "Ten nhan vien", "Thang", "Nam",
+    "So ngay lam", "Luong 1 ngay",
+    "Tong luong", "Khau tru", "Luong thuc",
+]
+
+ATTENDANCE_HEADER = [
+    "ID",
+    "Ten nhan vien",
+    "Ngay",
+    "Gio vao",
+    "Gio ra",
+    "Trang thai",
+]
+
+
+# ====== Lọc ======
+# Mọi điều kiện đều là so sánh trực tiếp trên cột (không bọc hàm) để dùng được
+# index: employees(department), employees(position), payrolls(year, month),
+# attendances(date), attendances(employee_id, date); khoảng date cũng để
+# Postgres chỉ quét các partition tháng liên quan.
+def _period_bounds(filters: ReportFilters) -> Tuple[Optional[tuple], Optional[tuple]]:
+    """Gộp year/month, from_*/to_*, from_date/to_date thành khoảng kỳ (year, month)"""
+    lows, highs = [], []
+    if filters.year is not None:
+        lows.append((filters.year, filters.month or 1))
+        highs.append((filters.year, filters.month or 12))
+    if filters.from_year is not None:
+        lows.append((filters.from_year, filters.from_month or 1))
+    if filters.to_year is not None:
+        highs.append((filters.to_year, filters.to_month or 12))
+    if filters.from_date is not None:
+        lows.append((filters.from_date.year, filters.from_date.month))
+    if filters.to_date is not None:
+        highs.append((filters.to_date.year, filters.to_date.month))
+    return (max(lows) if lows else None), (min(highs) if highs else None)
+
+
+def _date_bounds(filters: ReportFilters) -> Tuple[Optional[date], Optional[date]]:
+    """Khoảng kỳ + from_date/to_date -> khoảng ngày cho attendances.date"""
+    lo, hi = _period_bounds(filters)
+    start = date(lo[0], lo[1], 1) if lo else None
+    end = month_bounds(*hi)[1] if hi else None
+    if filters.from_date is not None:
+        start = max(start, filters.from_date) if start else filters.from_date
+    if filters.to_date is not None:
+        end = min(end, filters.to_date) if end else filters.to_date
+    return start, end
+
+
+def _employee_where(stmt, filters: ReportFilters):
+    if filters.department is not None:
+        stmt = stmt.where(Employee.department == filters.department)
+    if filters.position is not None:
+        stmt = stmt.where(Employee.position == filters.position)
+    return stmt
+
+
+def _payroll_where(stmt, filters: Optional[ReportFilters]):
+    if filters is None:
+        return stmt
+    if filters.employee_id is not None:
+        stmt = stmt.where(Payroll.employee_id == filters.employee_id)
+    stmt = _employee_where(stmt, filters)
+
+    lo, hi = _period_bounds(filters)
+    if lo is not None and lo == hi:
+        # 1 kỳ -> so sánh bằng, dùng trọn index (year, month)
+        stmt = stmt.where(Payroll.year == lo[0], Payroll.month == lo[1])
+    else:
+        if lo is not None:
+            stmt = stmt.where(
+                Payroll.year >= lo[0],
+                or_(Payroll.year > lo[0], Payroll.month >= lo[1]),
+            )
+        if hi is not None:
+            stmt = stmt.where(
+                Payroll.year <= hi[0],
+                or_(Payroll.year < hi[0], Payroll.month <= hi[1]),
+            )
+    if filters.month is not None and filters.year is None:
+        # chỉ có tháng -> tháng đó của mọi năm
+        stmt = stmt.where(Payroll.month == filters.month)
+    return stmt
+
+
+def _month_every_year(db: Session, month: int, start: Optional[date], end: Optional[date]):
+    """
+    "Tháng đó của mọi năm" thành OR các khoảng ngày (1 khoảng / năm) thay
+    vì EXTRACT(month) -> vẫn dùng index attendances(date) và cắt partition.
+    Năm đầu / cuối lấy từ khoảng lọc, thiếu thì từ MIN/MAX(date) (đọc index).
+    """
+    if start is None or end is None:
+        lo, hi = db.query(func.min(Attendance.date), func.max(Attendance.date)).one()
+        if lo is None:
+            return false()
+        start, end = start or lo, end or hi
+
+    ranges = []
+    for year in range(start.year, end.year + 1):
+        first, last = month_bounds(year, month)
+        if last < start or first > end:
+            continue
+        ranges.append(and_(Attendance.date >= first, Attendance.date <= last))
+    return or_(*ranges) if ranges else false()
+
+
+def _attendance_where(db: Session, stmt, filters: Optional[ReportFilters]):
+    if filters is None:
+        return stmt
+    if filters.employee_id is not None:
+        stmt = stmt.where(Attendance.employee_id == filters.employee_id)
+    stmt = _employee_where(stmt, filters)
+
+    start, end = _date_bounds(filters)
+    if start is not None:
+        stmt = stmt.where(Attendance.date >= start)
+    if end is not None:
+        stmt = stmt.where(Attendance.date <= end)
+    if filters.month is not None and filters.year is None:
+        # chỉ có tháng -> tháng đó của mọi năm
+        stmt = stmt.where(_month_every_year(db, filters.month, start, end))
+    return stmt
+
+
+# ====== Đọc dữ liệu theo lô (Core rows, không dựng ORM object) ======
+def iter_payroll_rows(
+    db: Session, filters: Optional[ReportFilters] = None
+) -> Iterator[tuple]:
+    stmt = (
+        select(
+            Payroll.id,
+            Employee.full_name,
+            Payroll.month,
+            Payroll.year,
+            Payroll.attendance_days,
+            Payroll.base_daily_salary,
+            Payroll.gross_salary,
+            Payroll.deductions,
+            Payroll.net_salary,
+        )
+        .join(Employee, Payroll.employee_id == Employee.id)
+        .order_by(Payroll.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    for row in db.execute(_payroll_where(stmt, filters)):
+        yield tuple(row)
+
+
+def iter_attendance_rows(
+    db: Session, filters: Optional[ReportFilters] = None
+) -> Iterator[tuple]:
+    stmt = (
+        select(
+            Attendance.id,
+            Employee.full_name,
+            Attendance.date,
+            Attendance.check_in,
+            Attendance.check_out,
+        )
+        .join(Employee, Attendance.employee_id == Employee.id)
+        .order_by(Attendance.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    for att_id, full_name, d, check_in, check_out in db.execute(
+        _attendance_where(db, stmt, filters)
+    ):
+        yield (
+            att_id,
+            full_name,
+            str(d),
+            str(check_in) if check_in else "",
+            str(check_out) if check_out else "",
+            "Có mặt" if check_in else "Vắng",
+        )
+
+
+# ====== Dữ liệu thô cho CSV / NDJSON (BI) ======
+PAYROLL_EXPORT_COLUMNS = [
+    "id", "employee_id", "full_name", "department", "year", "month",
+    "base_daily_salary", "attendance_days", "paid_leave_days",
+    "gross_salary", "deductions", "net_salary",
+]
+
+ATTENDANCE_EXPORT_COLUMNS = [
+    "id", "employee_id", "full_name", "department",
+    "date", "check_in", "check_out",
+]
+
+
+def iter_payroll_records(
+    db: Session, filters: Optional[ReportFilters] = None
+) -> Iterator[tuple]:
+    stmt = (
+        select(
+            Payroll.id,
+            Payroll.employee_id,
+            Employee.full_name,
+            Employee.department,
+            Payroll.year,
+            Payroll.month,
+            Payroll.base_daily_salary,
+            Payroll.attendance_days,
+            Payroll.paid_leave_days,
+            Payroll.gross_salary,
+            Payroll.deductions,
+            Payroll.net_salary,
+        )
+        .join(Employee, Payroll.employee_id == Employee.id)
+        .order_by(Payroll.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    return db.execute(_payroll_where(stmt, filters)).tuples()
+
+
+def iter_attendance_records(
+    db: Session, filters: Optional[ReportFilters] = None
+) -> Iterator[tuple]:
+    stmt = (
+        select(
+            Attendance.id,
+            Attendance.employee_id,
+            Employee.full_name,
+            Employee.department,
+            Attendance.date,
+            Attendance.check_in,
+            Attendance.check_out,
+        )
+        .join(Employee, Attendance.employee_id == Employee.id)
+        .order_by(Attendance.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    return db.execute(_attendance_where(db, stmt, filters)).tuples()
+
+
+def count_payroll_rows(db: Session, filters: Optional[ReportFilters] = None) -> int:
+    stmt = select(func.count(Payroll.id)).join(
+        Employee, Payroll.employee_id == Employee.id
+    )
+    return db.execute(_payroll_where(stmt, filters)).scalar() or 0
+
+
+def count_attendance_rows(db: Session, filters: Optional[ReportFilters] = None) -> int:
+    stmt = select(func.count(Attendance.id)).join(
+        Employee, Attendance.employee_id == Employee.id
+    )
+    return db.execute(_attendance_where(db, stmt, filters)).scalar() or 0
+
+
+# ====== Ghi Excel ở chế độ write_only (bộ nhớ không tăng theo số dòng) ======
+def write_excel(
+    out: IO[bytes],
+    title: str,
+    header: list,
+    rows: Iterable[tuple],
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(header)
+
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+        if progress is not None and count % FETCH_SIZE == 0:
+            progress(count)
+
+    wb.save(out)
+    return count
+
+
+# ====== PDF bảng lương ======
+PAYROLL_PDF_HEADER = [
+    "Phòng ban", "Nhân viên", "Kỳ", "Ngày công", "Nghỉ phép",
+    "Lương 1 ngày", "Tổng lương", "Khấu trừ", "Thực nhận",
+]
+PAYROLL_PDF_COL_WIDTHS = [95, 165, 50, 55, 55, 85, 90, 80, 90]
+# A4 ngang, mỗi dòng cao cố định -> biết trước số dòng / trang
+PDF_ROW_HEIGHT = 16
+PDF_ROWS_PER_PAGE = 28
+
+
+def iter_payroll_pdf_rows(
+    db: Session, filters: Optional[ReportFilters] = None
+) -> Iterator[tuple]:
+    """Dòng cho PDF bảng lương, sắp theo phòng ban để cộng dồn từng phòng"""
+    stmt = (
+        select(
+            Employee.department,
+            Employee.full_name,
+            Payroll.year,
+            Payroll.month,
+            Payroll.attendance_days,
+            Payroll.paid_leave_days,
+            Payroll.base_daily_salary,
+            Payroll.gross_salary,
+            Payroll.deductions,
+            Payroll.net_salary,
+        )
+        .join(Employee, Payroll.employee_id == Employee.id)
+        .order_by(Employee.department, Payroll.year, Payroll.month, Employee.full_name, Payroll.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    return db.execute(_payroll_where(stmt, filters)).tuples()
+
+
+def _money(v) -> str:
+    return f"{v or 0:,.0f}"
+
+
+def _payroll_pdf_lines(rows: Iterable[tuple]) -> Iterator[Tuple[str, list]]:
+    """
+    ("row" | "subtotal" | "total", ô) theo thứ tự in: chèn dòng cộng
+    khi đổi phòng ban và dòng tổng cuối báo cáo.
+    """
+    current = object()
+    dept_sum = [0.0, 0.0, 0.0]
+    total = [0.0, 0.0, 0.0]
+    has_rows = False
+
+    def subtotal_line(label, sums):
+        return [label, "", "", "", "", "", _money(sums[0]), _money(sums[1]), _money(sums[2])]
+
+    for dept, name, year, month, att, leave, base, gross, deduct, net in rows:
+        dept = dept or "(Chưa có phòng)"
+        if has_rows and dept != current:
+            yield "subtotal", subtotal_line(f"Cộng {current}", dept_sum)
+            dept_sum = [0.0, 0.0, 0.0]
+        current, has_rows = dept, True
+
+        for sums in (dept_sum, total):
+            sums[0] += gross or 0
+            sums[1] += deduct or 0
+            sums[2] += net or 0
+
+        yield "row", [
+            dept[:18], (name or "")[:32], f"{month:02d}/{year}", att, leave,
+            _money(base), _money(gross), _money(deduct), _money(net),
+        ]
+
+    if has_rows:
+        yield "subtotal", subtotal_line(f"Cộng {current}", dept_sum)
+    yield "total", subtotal_line("TỔNG CỘNG", total)
+
+
+def _draw_payroll_page(c, lines: list, page_no: int) -> None:
+    width, height = landscape(A4)
+
+    c.setFont(pdf_fonts.FONT_BOLD, 13)
+    c.drawCentredString(width / 2, height - 40, "BẢNG LƯƠNG NHÂN VIÊN")
+    c.setFont(pdf_fonts.FONT, 8)
+    c.drawRightString(width - 30, 20, f"Trang {page_no}")
+
+    style = [
+        ("FONT", (0, 0), (-1, -1), pdf_fonts.FONT, 8),
+        ("FONT", (0, 0), (-1, 0), pdf_fonts.FONT_BOLD, 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#dbe4f0")),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+    for i, (kind, _) in enumerate(lines, start=1):
+        if kind != "row":
+            style.append(("FONT", (0, i), (-1, i), pdf_fonts.FONT_BOLD, 8))
+            style.append(("BACKGROUND", (0, i), (-1, i), colors.HexColor("#f2f2f2")))
+            style.append(("SPAN", (0, i), (2, i)))
+
+    # header lặp lại ở đầu mỗi trang
+    data = [PAYROLL_PDF_HEADER] + [cells for _, cells in lines]
+    table = Table(
+        data,
+        colWidths=PAYROLL_PDF_COL_WIDTHS,
+        rowHeights=PDF_ROW_HEIGHT,
+        style=TableStyle(style),
+    )
+    _, table_height = table.wrapOn(c, width, height)
+    table.drawOn(c, 30, height - 60 - table_height)
+
+
+def write_payroll_pdf(
+    out, rows: Iterable[tuple], progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    rows: tuple như iter_payroll_pdf_rows (đã sắp theo phòng ban).
+    Dựng từng trang 1 (1 Table platypus / trang, vẽ xong là bỏ) nên bộ nhớ
+    không tăng theo số dòng.
+    Hàm top-level, chỉ nhận dữ liệu thuần -> chạy được trong process pool.
+    """
+    pdf_fonts.register_fonts()
+    c = canvas.Canvas(out, pagesize=landscape(A4))
+
+    count = 0
+    page_no = 0
+    page: list = []
+    for line in _payroll_pdf_lines(rows):
+        page.append(line)
+        if line[0] == "row":
+            count += 1
+            if progress is not None and count % FETCH_SIZE == 0:
+                progress(count)
+        if len(page) == PDF_ROWS_PER_PAGE:
+            page_no += 1
+            _draw_payroll_page(c, page, page_no)
+            c.showPage()
+            page = []
+
+    if page:
+        page_no += 1
+        _draw_payroll_page(c, page, page_no)
+        c.showPage()
+
+    c.save()
+    return count
+
+
+# ====== Phiếu lương ======
+def slip_data(payroll: Payroll, emp: Employee) -> dict:
+    """Chuyển Payroll + Employee thành dict thuần (pickle được sang process khác)"""
+    return {
+        "employee_id": payroll.employee_id,
+        "year": payroll.year,
+        "month": payroll.month,
+        "full_name": emp.full_name,
+        "position": emp.position,
+        "department": emp.department,
+        "attendance_days": payroll.attendance_days,
+        "paid_leave_days": payroll.paid_leave_days,
+        "base_daily_salary": payroll.base_daily_salary,
+        "gross_salary": payroll.gross_salary,
+        "deductions": payroll.deductions,
+        "net_salary": payroll.net_salary,
+    }
+
+
+def slip_filename(slip: dict) -> str:
+    return f"salary_slip_{slip['employee_id']}_{slip['year']}_{slip['month']}.pdf"
+
+
+# Format số tiền cho đẹp
+def fmt_money(v: float) -> str:
+    try:
+        return f"{v:,.0f} VND"
+    except Exception:
+        return f"{v} VND"
+
+
+def render_salary_slip(slip: dict) -> bytes:
+    """Render 1 phiếu lương PDF vào bộ nhớ"""
+    pdf_fonts.register_fonts()
+    out = io.BytesIO()
+    c = canvas.Canvas(out, pagesize=A4)
+
+    # Khởi tạo layout đơn giản
+    width, height = A4
+    y = height - 50
+
+    c.setFont(pdf_fonts.FONT_BOLD, 14)
+    c.drawCentredString(width / 2, y, "PHIẾU LƯƠNG NHÂN VIÊN")
+    y -= 30
+
+    c.setFont(pdf_fonts.FONT, 11)
+    c.drawString(50, y, f"Tháng/Năm: {slip['month']}/{slip['year']}")
+    y -= 20
+    c.drawString(50, y, f"Họ tên: {slip['full_name']}")
+    y -= 20
+    if slip["position"]:
+        c.drawString(50, y, f"Chức vụ: {slip['position']}")
+        y -= 20
+    if slip["department"]:
+        c.drawString(50, y, f"Phòng ban: {slip['department']}")
+        y -= 20
+
+    y -= 10
+    c.setFont(pdf_fonts.FONT_BOLD, 11)
+    c.drawString(50, y, "Chi tiết lương:")
+    y -= 20
+    c.setFont(pdf_fonts.FONT, 11)
+
+    lines = [
+        f"Số ngày làm việc       : {slip['attendance_days']}",
+        f"Số ngày nghỉ có phép   : {slip['paid_leave_days']}",
+        f"Lương cơ bản 1 ngày    : {fmt_money(slip['base_daily_salary'])}",
+        f"Tổng lương (gross)     : {fmt_money(slip['gross_salary'])}",
+        f"Khấu trừ               : {fmt_money(slip['deductions'])}",
+        f"Lương thực nhận (net)  : {fmt_money(slip['net_salary'])}",
+    ]
+
+    for line in lines:
+        c.drawString(70, y, line)
+        y -= 18
+
+    y -= 20
+    c.drawString(50, y, "Ghi chú: Phiếu lương này được tạo tự động từ hệ thống HR.")
+    y -= 40
+
+    c.drawRightString(width - 50, y, "Người lập phiếu")
+    y -= 60
+
+    c.setFont(pdf_fonts.FONT, 9)
+    c.drawString(50, 30, "Hệ thống HR Employee Management")
+
+    c.save()
+    return out.getvalue()
+
+
+def render_salary_slip_chunk(slips: List[dict]) -> List[Tuple[str, bytes]]:
+    """Render 1 lô phiếu lương (1 task của process pool -> ít lần pickle)"""
+    return [(slip_filename(s), render_salary_slip(s)) for s in slips]
+
+
+def render_salary_slips_zip(out, slips: List[dict], pool=None) -> int:
+    """
+    Render nhiều phiếu lương và ghi thành ZIP.
+    pool: Executor (process pool) để render song song; None = tuần tự.
+    """
+    chunks = [slips[i:i + SLIP_CHUNK_SIZE] for i in range(0, len(slips), SLIP_CHUNK_SIZE)]
+    results = (
+        pool.map(render_salary_slip_chunk, chunks)
+        if pool is not None
+        else map(render_salary_slip_chunk, chunks)
+    )
+
+    count = 0
+    # PDF đã nén sẵn -> ZIP_STORED, khỏi tốn CPU nén lần nữa
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as zf:
+        for chunk in results:
+            for name, data in chunk:
+                zf.writestr(name, data)
+                count += 1
+    return count
+
+
+# ====== CSV / NDJSON stream ======
+def _text(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[list]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def encode_csv(columns: List[str], rows: Iterable[tuple]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue()
+
+    for batch in _batched(rows, ROWS_PER_CHUNK):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_text(v) for v in row] for row in batch)
+        yield buf.getvalue()
+
+
+def encode_ndjson(columns: List[str], rows: Iterable[tuple]) -> Iterator[str]:
+    dumps = json.JSONEncoder(ensure_ascii=False, default=_text).encode
+    for batch in _batched(rows, ROWS_PER_CHUNK):
+        yield "".join(dumps(dict(zip(columns, row))) + "\n" for row in batch)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Nén gzip từng chunk (Z_SYNC_FLUSH -> client nhận được dữ liệu ngay)"""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield z.flush()
+
+
+def stream_records(
+    kind: str, fmt: str, filters: ReportFilters, gzip: bool = False
+) -> Iterator[bytes]:
+    """
+    Generator cho StreamingResponse: tự mở session riêng, đọc bằng
+    server-side cursor và mã hoá từng lô dòng -> byte đầu tiên ra ngay.
+    """
+    if kind == "attendance":
+        columns, source = ATTENDANCE_EXPORT_COLUMNS, iter_attendance_records
+    else:
+        columns, source = PAYROLL_EXPORT_COLUMNS, iter_payroll_records
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+
+    def generate():
+        db = SessionLocal()
+
+        def rows():
+            # chỉ chạy query khi encoder cần dòng đầu tiên (header đã gửi trước)
+            yield from source(db, filters)
+
+        try:
+            for text in encode(columns, rows()):
+                yield text.encode("utf-8")
+        finally:
+            db.close()
+
+    return gzip_chunks(generate()) if gzip else generate()
+
+
+def iter_file(f: IO[bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Đọc file theo chunk để StreamingResponse gửi dần, xong thì đóng file"""
+    try:
+        f.seek(0)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,106 @@
+# app/services/slip_cache.py
+"""
+Cache phiếu lương PDF đã render trên đĩa local.
+
+- Khoá = payroll_id + hash nội dung phiếu (số liệu lương + thông tin nhân viên)
+  -> tính lại lương / đổi tên là tự ra khoá mới, bản cũ không bao giờ bị trả về.
+- Giới hạn dung lượng SLIP_CACHE_MAX_MB, vượt thì xoá bản lâu chưa dùng nhất (LRU
+  theo mtime, mỗi lần hit sẽ "touch" file).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+CACHE_DIR = Path(os.getenv("SLIP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hr_slip_cache")))
+MAX_BYTES = int(os.getenv("SLIP_CACHE_MAX_MB", "256")) * 1024 * 1024
+# tăng khi đổi mẫu phiếu lương (font, bố cục) -> bản cache / ETag cũ tự hết hiệu lực
+SLIP_LAYOUT_VERSION = 2
+
+
+def slip_digest(slip: dict) -> str:
+    raw = json.dumps(
+        {"layout": SLIP_LAYOUT_VERSION, **slip}, sort_keys=True, default=str
+    ).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+class SlipCache:
+    def __init__(self, directory: Path, max_bytes: int):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._size = sum(f.stat().st_size for f in self.dir.glob("*/*.pdf"))
+
+    # mỗi payroll 1 thư mục con -> invalidate không phải quét cả cache
+    def _path(self, payroll_id: int, digest: str) -> Path:
+        return self.dir / str(payroll_id) / f"{digest}.pdf"
+
+    def get(self, payroll_id: int, digest: str) -> Optional[bytes]:
+        path = self._path(payroll_id, digest)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # đánh dấu vừa dùng (LRU)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, payroll_id: int, digest: str, data: bytes) -> None:
+        # xoá các bản cũ của cùng payroll trước khi ghi bản mới
+        self.invalidate([payroll_id])
+
+        path = self._path(payroll_id, digest)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, payroll_ids: Iterable[int]) -> None:
+        for payroll_id in payroll_ids:
+            folder = self.dir / str(payroll_id)
+            if folder.is_dir():
+                for path in folder.glob("*.pdf"):
+                    self._remove(path)
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def _evict(self) -> None:
+        # gọi khi đang giữ lock; xoá đến khi còn ~90% giới hạn
+        files = sorted(self.dir.glob("*/*.pdf"), key=_mtime)
+        target = self.max_bytes * 0.9
+        for f in files:
+            if self._size <= target:
+                break
+            try:
+                size = f.stat().st_size
+                f.unlink()
+            except FileNotFoundError:
+                continue
+            self._size -= size
+
+
+slip_cache = SlipCache(CACHE_DIR, MAX_BYTES)
@@ -0,0 +1,121 @@
+# benchmarks/bench_attendance_import.py
+"""
+Đo tốc độ nhập chấm công từ CSV (POST /attendances/import) trên 1 DB thật.
+
+    # Postgres (đường COPY) - dùng DB nháp, script tạo bảng + nhân viên giả
+    DATABASE_URL=postgresql://hr:hr@localhost/hr_bench python benchmarks/bench_attendance_import.py
+    # mặc định: SQLite file tạm
+    python benchmarks/bench_attendance_import.py --employees 20000 --days 3
+
+File giả lập giống file xuất của máy chấm công: mỗi ngày 1 dòng / nhân viên,
+thêm ~1% dòng lỗi (nhân viên không tồn tại, trùng dòng) để đo cả phần kiểm tra.
+In ra rows/sec của riêng phần đọc + kiểm tra file và của cả quá trình nhập.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(), "bench_import.db"
+    )
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import analytics, attendance, employee, leave_request, payroll  # noqa: E402,F401
+from app.models.attendance import Attendance  # noqa: E402
+from app.models.employee import Employee  # noqa: E402
+from app.services.attendance_import import (  # noqa: E402
+    _parse_record,
+    import_attendances,
+    iter_csv_records,
+)
+
+START = date(2030, 1, 6)
+
+
+def fake_csv(employees: int, days: int, day_offset: int) -> bytes:
+    lines = ["employee_id,date,check_in,check_out"]
+    for day in range(days):
+        d = (START + timedelta(days=day_offset + day)).isoformat()
+        for emp_id in range(1, employees + 1):
+            lines.append(f"{emp_id},{d},08:{emp_id % 60:02d},17:{emp_id % 60:02d}")
+            if emp_id % 100 == 0:
+                lines.append(f"{employees + emp_id},{d},08:00,17:00")  # không có NV
+            if emp_id % 150 == 0:
+                lines.append(f"{emp_id},{d},09:00,18:00")  # trùng trong file
+    return "\n".join(lines).encode()
+
+
+def ensure_employees(n: int) -> None:
+    db = SessionLocal()
+    try:
+        have = db.query(Employee.id).count()
+        if have < n:
+            db.execute(
+                insert(Employee.__table__),
+                [
+                    {
+                        "id": i,
+                        "full_name": f"Bench {i}",
+                        "email": f"bench{i}@example.com",
+                        "department": "Bench",
+                    }
+                    for i in range(have + 1, n + 1)
+                ],
+            )
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_employees(args.employees)
+
+    # chạy nhiều lần trên cùng DB thì dịch sang các ngày chưa nhập
+    db = SessionLocal()
+    offset = db.query(Attendance.date).filter(Attendance.date >= START).distinct().count()
+    db.close()
+
+    data = fake_csv(args.employees, args.days, offset)
+
+    t0 = time.perf_counter()
+    rows = 0
+    for _, record in iter_csv_records(io.BytesIO(data)):
+        try:
+            _parse_record(record)
+        except ValueError:
+            pass
+        rows += 1
+    parse_s = time.perf_counter() - t0
+
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        report = import_attendances(db, iter_csv_records(io.BytesIO(data)), args.batch_size)
+        total_s = time.perf_counter() - t0
+    finally:
+        db.close()
+
+    print(f"{engine.dialect.name}: {rows} rows ({len(data) / 1e6:.1f} MB)")
+    print(f"parse + validate only | {parse_s:6.2f} s | {rows / parse_s:10.0f} rows/s")
+    print(f"full import           | {total_s:6.2f} s | {rows / total_s:10.0f} rows/s")
+    print(f"inserted={report.inserted} failed={report.failed}")
+
+
+if __name__ == "__main__":
+    main()
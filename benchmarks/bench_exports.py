@@ -0,0 +1,122 @@
+# benchmarks/bench_exports.py
+"""
+Đo tốc độ (rows/sec), byte đầu tiên và RAM đỉnh (peak RSS) của export
+chấm công: Excel write_only so với CSV / NDJSON stream.
+
+    python benchmarks/bench_exports.py                  # 10k / 100k / 500k dòng, mọi format
+    python benchmarks/bench_exports.py --rows 200000 --format csv
+
+Mỗi kích thước chạy trong 1 process riêng để peak RSS không cộng dồn.
+Dữ liệu sinh giả lập trong bộ nhớ dạng generator (giống server-side cursor),
+nên con số phản ánh đúng chi phí ghi file.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.report_service import (  # noqa: E402
+    ATTENDANCE_EXPORT_COLUMNS,
+    ATTENDANCE_HEADER,
+    encode_csv,
+    encode_ndjson,
+    gzip_chunks,
+    write_excel,
+)
+
+SIZES = [10_000, 100_000, 500_000]
+FORMATS = ["xlsx", "csv", "ndjson", "csv.gz"]
+
+
+def fake_attendance_rows(n: int):
+    start = date(2020, 1, 1)
+    for i in range(n):
+        yield (
+            i + 1,
+            f"Nhân viên {i % 3000}",
+            str(start + timedelta(days=i // 3000)),
+            str(dtime(8, i % 60)),
+            str(dtime(17, i % 60)),
+            "Có mặt",
+        )
+
+
+def fake_attendance_records(n: int):
+    start = date(2020, 1, 1)
+    for i in range(n):
+        yield (
+            i + 1,
+            i % 3000,
+            f"Nhân viên {i % 3000}",
+            "Kế toán",
+            start + timedelta(days=i // 3000),
+            dtime(8, i % 60),
+            dtime(17, i % 60),
+        )
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả KB, macOS trả bytes
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_once(rows: int, fmt: str):
+    t0 = time.perf_counter()
+    first_byte = None
+    size = 0
+
+    if fmt == "xlsx":
+        with tempfile.TemporaryFile() as out:
+            write_excel(out, "Cham cong", ATTENDANCE_HEADER, fake_attendance_rows(rows))
+            size = out.tell()
+        first_byte = time.perf_counter() - t0
+    else:
+        encode = encode_ndjson if fmt == "ndjson" else encode_csv
+        chunks = (
+            t.encode("utf-8")
+            for t in encode(ATTENDANCE_EXPORT_COLUMNS, fake_attendance_records(rows))
+        )
+        if fmt.endswith(".gz"):
+            chunks = gzip_chunks(chunks)
+        for chunk in chunks:
+            if first_byte is None:
+                first_byte = time.perf_counter() - t0
+            size += len(chunk)
+
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{fmt:>7} | {rows:>9} rows | {elapsed:7.2f}s | {rows / elapsed:>10,.0f} rows/s | "
+        f"first byte {first_byte * 1000:8.1f} ms | {size / 1024 / 1024:6.1f} MB | "
+        f"peak RSS {peak_rss_mb():6.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args()
+
+    if args.rows and args.format:
+        run_once(args.rows, args.format)
+        return
+
+    for n in [args.rows] if args.rows else SIZES:
+        for fmt in [args.format] if args.format else FORMATS:
+            subprocess.run(
+                [sys.executable, __file__, "--rows", str(n), "--format", fmt],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
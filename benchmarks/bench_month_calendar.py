@@ -0,0 +1,142 @@
+# benchmarks/bench_month_calendar.py
+"""
+Micro-benchmark: lịch tháng bằng bitmask (app.services.month_calendar)
+so với vòng lặp từng ngày cũ (set ngày nghỉ + while d <= e).
+
+    python benchmarks/bench_month_calendar.py --employees 5000
+
+Chỉ đo phần tính toán trong Python, không có DB.
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.month_calendar import (  # noqa: E402
+    HEATMAP_ORDER,
+    count_days,
+    day_statuses,
+    leave_masks_by_employee,
+    month_bounds,
+)
+
+YEAR, MONTH = 2025, 3
+TODAY = date(2025, 3, 20)
+
+
+def fake_data(employees: int):
+    rnd = random.Random(42)
+    start_month, end_month = month_bounds(YEAR, MONTH)
+    presents, leaves = {}, []
+    for emp_id in range(1, employees + 1):
+        presents[emp_id] = {
+            date(YEAR, MONTH, d)
+            for d in range(1, end_month.day + 1)
+            if rnd.random() < 0.7
+        }
+        for _ in range(rnd.randint(0, 2)):
+            s = start_month + timedelta(days=rnd.randint(-5, 28))
+            leaves.append((emp_id, s, s + timedelta(days=rnd.randint(0, 6))))
+    return presents, leaves
+
+
+# ----- cách cũ -----
+def old_statuses(present_days, emp_leaves):
+    start_month, end_month = month_bounds(YEAR, MONTH)
+    paid_leave_days = set()
+    for start, end in emp_leaves:
+        d = max(start, start_month)
+        e = min(end, end_month)
+        while d <= e:
+            paid_leave_days.add(d)
+            d += timedelta(days=1)
+
+    out = []
+    d = start_month
+    while d <= end_month:
+        if d in present_days:
+            out.append("present")
+        elif d in paid_leave_days:
+            out.append("paid_leave")
+        elif d > TODAY:
+            out.append("future")
+        elif d.weekday() in (5, 6):
+            out.append("weekend")
+        else:
+            out.append("absent_unexcused")
+        d += timedelta(days=1)
+    return out
+
+
+def old_leave_days(leaves):
+    start_month, end_month = month_bounds(YEAR, MONTH)
+    days = {}
+    for emp_id, start, end in leaves:
+        s = max(start, start_month)
+        e = min(end, end_month)
+        if s <= e:
+            days[emp_id] = days.get(emp_id, 0) + (e - s).days + 1
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    presents, leaves = fake_data(args.employees)
+    leaves_by_emp = {}
+    for emp_id, s, e in leaves:
+        leaves_by_emp.setdefault(emp_id, []).append((s, e))
+    present_masks = {
+        emp_id: sum(1 << (d.day - 1) for d in days) for emp_id, days in presents.items()
+    }
+
+    def run_old_calendar():
+        for emp_id, days in presents.items():
+            old_statuses(days, leaves_by_emp.get(emp_id, ()))
+
+    def run_new_calendar():
+        masks = leave_masks_by_employee(YEAR, MONTH, leaves)
+        for emp_id, present in present_masks.items():
+            day_statuses(YEAR, MONTH, present, masks.get(emp_id, 0), TODAY, HEATMAP_ORDER)
+
+    def run_new_leave_days():
+        masks = leave_masks_by_employee(YEAR, MONTH, leaves)
+        return {emp_id: count_days(m) for emp_id, m in masks.items()}
+
+    # cùng kết quả trước khi so tốc độ
+    masks = leave_masks_by_employee(YEAR, MONTH, leaves)
+    for emp_id, days in presents.items():
+        assert old_statuses(days, leaves_by_emp.get(emp_id, ())) == day_statuses(
+            YEAR, MONTH, present_masks[emp_id], masks.get(emp_id, 0), TODAY, HEATMAP_ORDER
+        )
+
+    cases = [
+        ("calendar (loop)", run_old_calendar),
+        ("calendar (bitmask)", run_new_calendar),
+        ("leave days (loop)", lambda: old_leave_days(leaves)),
+        ("leave days (bitmask)", run_new_leave_days),
+    ]
+    print(f"{args.employees} employees, {len(leaves)} leaves, {YEAR}-{MONTH:02d}")
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<22} | {best * 1000:8.2f} ms | {best / args.employees * 1e6:6.2f} µs/employee")
+
+    # lưu ý: cách cũ cộng trùng khi 2 đơn nghỉ chồng ngày nhau
+    overlap = sum(
+        1 for emp_id, n in old_leave_days(leaves).items()
+        if n != count_days(masks.get(emp_id, 0))
+    )
+    print(f"employees double-counted by the old loop: {overlap}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_payroll_pdf.py
+"""
+Đo thời gian render PDF bảng lương (bảng platypus theo trang, font Unicode)
+và RAM đỉnh (peak RSS).
+
+    python benchmarks/bench_payroll_pdf.py                  # 1k / 10k / 50k dòng
+    python benchmarks/bench_payroll_pdf.py --rows 10000
+
+Mỗi kích thước chạy trong 1 process riêng để peak RSS không cộng dồn.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services import pdf_fonts  # noqa: E402
+from app.services.report_service import write_payroll_pdf  # noqa: E402
+
+SIZES = [1_000, 10_000, 50_000]
+DEPARTMENTS = ["Kế toán", "Kinh doanh", "Kỹ thuật", "Nhân sự", "Sản xuất"]
+
+
+def fake_payroll_rows(n: int):
+    # đã sắp theo phòng ban giống iter_payroll_pdf_rows
+    per_dept = -(-n // len(DEPARTMENTS))
+    for i in range(n):
+        yield (
+            DEPARTMENTS[i // per_dept],
+            f"Nguyễn Thị Ánh {i}",
+            2025,
+            12,
+            22,
+            1,
+            450_000.0,
+            10_350_000.0,
+            500_000.0,
+            9_850_000.0,
+        )
+
+
+def peak_rss_mb() -> float:
+    # Linux: KB, macOS: bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_once(rows: int):
+    t0 = time.perf_counter()
+    pdf_fonts.register_fonts()
+    t_font = time.perf_counter() - t0
+
+    with tempfile.TemporaryFile() as out:
+        t0 = time.perf_counter()
+        count = write_payroll_pdf(out, fake_payroll_rows(rows))
+        elapsed = time.perf_counter() - t0
+        size = out.tell()
+
+    print(
+        f"{count:>7} rows | {elapsed:7.2f}s | {count / elapsed:>8,.0f} rows/s | "
+        f"{size / 1024 / 1024:6.1f} MB | peak RSS {peak_rss_mb():6.1f} MB | "
+        f"font {pdf_fonts.FONT} ({t_font * 1000:.0f} ms, 1 lần / process)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int)
+    args = parser.parse_args()
+
+    if args.rows:
+        run_once(args.rows)
+        return
+
+    for n in SIZES:
+        subprocess.run([sys.executable, __file__, "--rows", str(n)], check=True)
+
+
+if __name__ == "__main__":
+    main()
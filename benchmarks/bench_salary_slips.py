@@ -0,0 +1,76 @@
+# benchmarks/bench_salary_slips.py
+"""
+Đo chi phí render phiếu lương: tuần tự vs process pool.
+
+    python benchmarks/bench_salary_slips.py --slips 2000 --processes 1 2 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.report_service import render_salary_slips_zip  # noqa: E402
+
+
+def fake_slips(n: int):
+    return [
+        {
+            "employee_id": i,
+            "year": 2025,
+            "month": 12,
+            "full_name": f"Nguyễn Văn {i}",
+            "position": "Nhân viên",
+            "department": "Kế toán" if i % 2 else "Kinh doanh",
+            "attendance_days": 22,
+            "paid_leave_days": 1,
+            "base_daily_salary": 450_000.0,
+            "gross_salary": 10_350_000.0,
+            "deductions": 500_000.0,
+            "net_salary": 9_850_000.0,
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def run(slips, pool):
+    with tempfile.TemporaryFile() as out:
+        t0 = time.perf_counter()
+        count = render_salary_slips_zip(out, slips, pool)
+        return count, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slips", type=int, default=2000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    slips = fake_slips(args.slips)
+
+    count, elapsed = run(slips, None)
+    print(
+        f"serial      | {count} slips | {elapsed:6.2f}s | "
+        f"{elapsed / count * 1000:6.2f} ms/slip"
+    )
+
+    ctx = multiprocessing.get_context("spawn")
+    for n in args.processes:
+        with ProcessPoolExecutor(max_workers=n, mp_context=ctx) as pool:
+            # khởi động worker trước, không tính vào thời gian render
+            list(pool.map(abs, range(n)))
+            count, elapsed = run(slips, pool)
+        print(
+            f"{n:2d} processes | {count} slips | {elapsed:6.2f}s | "
+            f"{elapsed / count * 1000:6.2f} ms/slip"
+        )
+
+
+if __name__ == "__main__":
+    main()
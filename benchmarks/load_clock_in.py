@@ -0,0 +1,161 @@
+# benchmarks/load_clock_in.py
+"""
+Load test giờ cao điểm: N nhân viên cùng clock-in rồi clock-out.
+
+    # server thật (uvicorn/gunicorn đang chạy, DB nháp đã có nhân viên 1..N)
+    python benchmarks/load_clock_in.py --url http://127.0.0.1:8000 --employees 5000 --concurrency 64
+    # trong process (TestClient + SQLite file tạm, tự tạo nhân viên) - đo chi phí phía app
+    python benchmarks/load_clock_in.py --employees 2000 --concurrency 8
+    # chế độ ghi đệm (journal + flusher nền)
+    PUNCH_BUFFER_ENABLED=true python benchmarks/load_clock_in.py --employees 2000 --concurrency 8
+
+Token được ký trực tiếp bằng SECRET_KEY (giống token /auth/login, có claim
+employee_id) nên không tốn request đăng nhập. Mỗi pha in ra requests/sec
+và p50 / p95 / p99 độ trễ; lần chấm lặp lại (recorded=false) cũng được đếm.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(), "bench_clock.db"
+    )
+
+from app.core.security import create_access_token  # noqa: E402
+
+
+def make_tokens(employees: int):
+    return {
+        emp_id: create_access_token(
+            {
+                "sub": 1_000_000 + emp_id,  # user giả, clock-in không tra bảng users
+                "username": f"bench{emp_id}",
+                "role": "employee",
+                "employee_id": emp_id,
+            }
+        )
+        for emp_id in range(1, employees + 1)
+    }
+
+
+def seed_employees(n: int) -> None:
+    from sqlalchemy import insert
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import analytics, attendance, employee, leave_request, payroll  # noqa: F401
+    from app.models.employee import Employee
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        have = db.query(Employee.id).count()
+        if have < n:
+            db.execute(
+                insert(Employee.__table__),
+                [
+                    {"id": i, "full_name": f"Bench {i}", "email": f"bench{i}@example.com"}
+                    for i in range(have + 1, n + 1)
+                ],
+            )
+            db.commit()
+    finally:
+        db.close()
+
+
+class HttpClient:
+    def __init__(self, base_url: str):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+        self._requests = requests
+
+    def post(self, path: str, headers: dict) -> int:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session.post(self.base_url + path, headers=headers).status_code
+
+
+class InProcessClient:
+    def __init__(self):
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        self._client = TestClient(app)
+        self._client.__enter__()
+
+    def post(self, path: str, headers: dict) -> int:
+        return self._client.post(path, headers=headers).status_code
+
+    def close(self) -> None:
+        from app.services.punch_buffer import punch_buffer
+
+        if punch_buffer.started:
+            m = punch_buffer.metrics()
+            print(
+                f"punch buffer: depth {m['queue_depth']} | flushes {m['flushes']} | "
+                f"rows {m['flushed_rows']} | flush latency {m['flush_latency_ms']}"
+            )
+        self._client.__exit__(None, None, None)  # shutdown -> flush nốt journal
+
+
+def run_phase(client, path: str, tokens: dict, concurrency: int):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(token):
+        t0 = time.perf_counter()
+        code = client.post(path, {"Authorization": f"Bearer {token}"})
+        dt = time.perf_counter() - t0
+        with lock:
+            latencies.append(dt)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, tokens.values()))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(
+        f"{path:<22} | {len(latencies):6d} req | {len(latencies) / elapsed:8.0f} req/s | "
+        f"p50 {q[49] * 1000:6.1f} ms | p95 {q[94] * 1000:6.1f} ms | p99 {q[98] * 1000:6.1f} ms | "
+        f"status {statuses}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="server đang chạy; bỏ trống = chạy trong process")
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", action="store_true", help="tạo nhân viên 1..N trong DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.seed or not args.url:
+        seed_employees(args.employees)
+
+    client = HttpClient(args.url) if args.url else InProcessClient()
+    tokens = make_tokens(args.employees)
+
+    run_phase(client, "/attendances/clock-in", tokens, args.concurrency)
+    run_phase(client, "/attendances/clock-in", tokens, args.concurrency)  # chấm lặp lại
+    run_phase(client, "/attendances/clock-out", tokens, args.concurrency)
+    if isinstance(client, InProcessClient):
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
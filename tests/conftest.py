@@ -0,0 +1,92 @@
+# tests/conftest.py
+"""
+DB là file SQLite tạm: đặt DATABASE_URL trước khi import app
+(app.database tạo engine ngay lúc import). Mỗi test chạy trên DB trống
+(tạo lại bảng, admin mặc định, 4 nhân viên).
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="hr_tests_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_TMP_DIR, "hr.db")
+os.environ["REPORT_JOB_DIR"] = os.path.join(_TMP_DIR, "report_jobs")
+os.environ["SLIP_CACHE_DIR"] = os.path.join(_TMP_DIR, "slip_cache")
+os.environ["PUNCH_BUFFER_ENABLED"] = "false"
+# fresh_db tự backfill đồng bộ, không để thread nền của startup chạy xen
+os.environ["AUTO_BACKFILL_ROLLUP"] = "false"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app, backfill_attendance_rollup, seed_default_admin  # noqa: E402
+from app.models.employee import Employee  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import attendance_rollup  # noqa: E402
+from app.services.overview_service import overview_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(client):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    overview_cache.invalidate()
+    attendance_rollup._rolled_up_cache.clear()
+
+    db = SessionLocal()
+    try:
+        for i in range(1, 5):
+            db.add(
+                Employee(
+                    id=i,
+                    full_name=f"Nhân viên {i}",
+                    email=f"nv{i}@example.com",
+                    department="Sales" if i % 2 else "IT",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+    # giống lúc khởi động app
+    seed_default_admin()
+    backfill_attendance_rollup()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _headers(claims: dict) -> dict:
+    return {"Authorization": "Bearer " + create_access_token(claims)}
+
+
+@pytest.fixture
+def admin_headers(db):
+    admin = db.query(User).filter(User.role == "admin").first()
+    return _headers({"sub": admin.id, "username": admin.username, "role": "admin"})
+
+
+@pytest.fixture
+def employee_headers(db):
+    """Header của tài khoản nhân viên gắn với employee_id"""
+    def make(employee_id: int) -> dict:
+        user = User(username=f"nv{employee_id}", password_hash="x", role="employee", employee_id=employee_id)
+        db.add(user)
+        db.commit()
+        return _headers(
+            {"sub": user.id, "username": user.username, "role": "employee", "employee_id": employee_id}
+        )
+    return make
@@ -0,0 +1,51 @@
+import json
+from datetime import date, datetime, time, timedelta
+
+from app.models.attendance import Attendance
+from app.services.attendance_changes import CHANGES_OVERLAP_SECONDS
+
+
+def _changes(client, headers, since=None):
+    params = {"since": since} if since else {}
+    r = client.get("/reports/attendance/changes", headers=headers, params=params)
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[-1]["op"] == "cursor"
+    return lines[:-1], lines[-1]["cursor"]
+
+
+def test_late_commit_inside_overlap_window_is_not_missed(client, db, admin_headers):
+    _, cursor = _changes(client, admin_headers)
+
+    # transaction flush trước lần đồng bộ trên nhưng commit sau nó
+    stamp = datetime.fromisoformat(cursor) - timedelta(seconds=CHANGES_OVERLAP_SECONDS // 2)
+    db.add(
+        Attendance(
+            employee_id=1, date=date(2025, 3, 3), check_in=time(8),
+            created_at=stamp, updated_at=stamp,
+        )
+    )
+    db.commit()
+
+    changes, next_cursor = _changes(client, admin_headers, cursor)
+    assert [(c["op"], c["employee_id"]) for c in changes] == [("insert", 1)]
+
+    # lần sau đọc lại đúng thay đổi đó -> client bỏ trùng theo (op, id, changed_at)
+    again, _ = _changes(client, admin_headers, next_cursor)
+    key = lambda c: (c["op"], c["id"], c["changed_at"])  # noqa: E731
+    assert [key(c) for c in again] == [key(c) for c in changes]
+
+
+def test_change_older_than_overlap_window_is_skipped(client, db, admin_headers):
+    _, cursor = _changes(client, admin_headers)
+    stamp = datetime.fromisoformat(cursor) - timedelta(seconds=CHANGES_OVERLAP_SECONDS + 60)
+    db.add(
+        Attendance(
+            employee_id=2, date=date(2025, 3, 3), check_in=time(8),
+            created_at=stamp, updated_at=stamp,
+        )
+    )
+    db.commit()
+
+    changes, _ = _changes(client, admin_headers, cursor)
+    assert changes == []
@@ -0,0 +1,86 @@
+from sqlalchemy.exc import OperationalError
+
+from app.models.attendance import Attendance
+from app.services import attendance_import
+
+
+def _upload(client, headers, text, **params):
+    return client.post(
+        "/attendances/import",
+        headers=headers,
+        params=params,
+        files={"file": ("may_cham_cong.csv", text.encode("utf-8"), "text/csv")},
+    )
+
+
+def test_import_reports_bad_rows_and_keeps_good_ones(client, db, admin_headers):
+    text = (
+        "employee_id,date,check_in,check_out\n"
+        "1,2025-03-03,08:00,17:00\n"       # dòng 2: ok
+        "2,2025-03-03,08:15,\n"            # dòng 3: ok (chưa có giờ ra)
+        "99,2025-03-03,08:00,17:00\n"      # dòng 4: không có nhân viên
+        "1,2025-03-03,09:00,17:00\n"       # dòng 5: trùng dòng 2 trong file
+        "3,03/03/2025x,08:00,17:00\n"      # dòng 6: sai ngày
+        "4,2025-03-03,17:00,08:00\n"       # dòng 7: giờ ra trước giờ vào
+        ",2025-03-03,08:00,17:00\n"        # dòng 8: thiếu employee_id
+    )
+    r = _upload(client, admin_headers, text)
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["total_rows"], body["inserted"], body["failed"]) == (7, 2, 5)
+    assert [e["line"] for e in body["errors"]] == [4, 5, 6, 7, 8]
+    assert {e["line"]: e.get("employee_id") for e in body["errors"]}[4] == 99
+
+    db.expire_all()
+    assert sorted(a.employee_id for a in db.query(Attendance)) == [1, 2]
+
+    # nhập lại cùng file: phần đã có báo trùng, không ghi thêm
+    body = _upload(client, admin_headers, text).json()
+    assert body["inserted"] == 0
+    assert body["failed"] == 7
+
+
+def test_import_truncates_error_list(client, admin_headers):
+    text = "employee_id,date,check_in,check_out\n" + "".join(
+        f"{100 + i},2025-03-03,08:00,17:00\n" for i in range(5)
+    )
+    body = _upload(client, admin_headers, text, max_errors=2).json()
+    assert body["failed"] == 5
+    assert len(body["errors"]) == 2
+    assert body["errors_truncated"] is True
+
+
+def test_import_rejects_file_without_required_columns(client, admin_headers):
+    r = _upload(client, admin_headers, "ma_nv,ngay\n1,2025-03-03\n")
+    assert r.status_code == 400
+
+
+def test_db_error_in_later_batch_returns_partial_report(db, monkeypatch):
+    real_insert = attendance_import._insert_rows
+    calls = []
+
+    def flaky_insert(session, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        real_insert(session, rows)
+
+    monkeypatch.setattr(attendance_import, "_insert_rows", flaky_insert)
+    records = [
+        (line, {"employee_id": emp_id, "date": f"2025-03-0{day}", "check_in": "08:00"})
+        for line, (emp_id, day) in enumerate(
+            [(1, 3), (2, 3), (3, 3), (4, 3), (1, 4), (2, 4)], start=2
+        )
+    ]
+    report = attendance_import.import_attendances(db, records, batch_size=2).as_dict()
+
+    assert (report["inserted"], report["failed"]) == (4, 2)
+    assert report["errors"] == []
+    [batch] = report["batch_errors"]
+    assert (batch["first_line"], batch["last_line"], batch["rows"]) == (4, 5, 2)
+    assert "database is locked" in batch["error"]
+
+    db.expire_all()
+    assert sorted((a.employee_id, a.date.day) for a in db.query(Attendance)) == [
+        (1, 3), (1, 4), (2, 3), (2, 4),
+    ]
@@ -0,0 +1,84 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.models.attendance import Attendance
+from app.services.attendance_listing import InvalidCursor, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def attendances(db):
+    """4 nhân viên x 6 ngày; nhân viên chẵn chưa chấm ra, ngày 3 nhân viên 4 vắng"""
+    start = date(2025, 3, 1)
+    for i in range(6):
+        d = start + timedelta(days=i)
+        for emp_id in range(1, 5):
+            absent = i == 2 and emp_id == 4
+            db.add(
+                Attendance(
+                    employee_id=emp_id,
+                    date=d,
+                    check_in=None if absent else time(8),
+                    check_out=time(17) if emp_id % 2 and not absent else None,
+                )
+            )
+    db.commit()
+    return db.query(Attendance).all()
+
+
+def _all_pages(client, headers, limit, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, limit=limit)
+        if cursor:
+            query["cursor"] = cursor
+        r = client.get("/attendances/", headers=headers, params=query)
+        assert r.status_code == 200
+        body = r.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    att = Attendance(id=42, date=date(2025, 3, 9))
+    assert decode_cursor(encode_cursor(att)) == (date(2025, 3, 9), 42)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("khong-hop-le")
+
+
+@pytest.mark.parametrize("limit", [1, 5, 24, 100])
+def test_pages_cover_every_row_once_in_order(client, admin_headers, attendances, limit):
+    pages = _all_pages(client, admin_headers, limit)
+    rows = [a for page in pages for a in page]
+
+    assert all(len(page) <= limit for page in pages)
+    assert len(rows) == len(attendances)
+    assert len({a["id"] for a in rows}) == len(rows)
+    keys = [(a["date"], a["id"]) for a in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_pages_with_filters(client, admin_headers, attendances):
+    rows = [
+        a
+        for page in _all_pages(
+            client, admin_headers, 4,
+            department="IT", from_date="2025-03-02", to_date="2025-03-05", status="missing_checkout",
+        )
+        for a in page
+    ]
+    expected = {
+        a.id
+        for a in attendances
+        if a.employee_id % 2 == 0
+        and date(2025, 3, 2) <= a.date <= date(2025, 3, 5)
+        and a.check_in is not None
+    }
+    assert {a["id"] for a in rows} == expected
+
+
+def test_invalid_cursor_is_rejected(client, admin_headers):
+    r = client.get("/attendances/", headers=admin_headers, params={"cursor": "abc"})
+    assert r.status_code == 400
@@ -0,0 +1,141 @@
+import threading
+from datetime import date, time
+
+from app.database import SessionLocal, leader_lock
+from app.main import _backfill_rollup_leader
+from app.models.attendance import Attendance, AttendanceMonthlyRollup
+from app.services.attendance_rollup import (
+    apply_day_changes,
+    backfill_rollups,
+    is_rolled_up,
+    present_days_by_employee,
+    rebuild_rollups,
+)
+
+
+def _rollup(db, year, month):
+    db.expire_all()
+    rows = db.query(AttendanceMonthlyRollup).filter_by(year=year, month=month)
+    return {
+        r.employee_id: (r.present_days, r.worked_minutes, r.day_mask)
+        for r in rows
+        if r.present_days or r.worked_minutes or r.day_mask
+    }
+
+
+def _months_ago(today: date, n: int):
+    index = today.year * 12 + today.month - 1 - n
+    return index // 12, index % 12 + 1
+
+
+def test_rollup_matches_rebuild_after_create_delete_and_clock_in(
+    client, db, admin_headers, employee_headers
+):
+    today = date.today()
+    first = today.replace(day=1)
+
+    r = client.post(
+        "/attendances/",
+        headers=admin_headers,
+        json={"employee_id": 1, "date": first.isoformat(), "check_in": "08:00:00", "check_out": "17:00:00"},
+    )
+    assert r.status_code == 200
+    r = client.post(
+        "/attendances/",
+        headers=admin_headers,
+        json={"employee_id": 2, "date": first.isoformat(), "check_in": "08:30:00"},
+    )
+    assert r.status_code == 200
+    assert client.delete(f"/attendances/{r.json()['id']}", headers=admin_headers).status_code == 200
+    headers_3 = employee_headers(3)
+    assert client.post("/attendances/clock-in", headers=headers_3).status_code == 200
+    assert client.post("/attendances/clock-out", headers=headers_3).status_code == 200
+
+    # sửa giờ ra: phút làm việc cộng theo chênh lệch (17:00 -> 12:00)
+    att_id = db.query(Attendance.id).filter_by(employee_id=1).scalar()
+    r = client.put(f"/attendances/{att_id}", headers=admin_headers, json={"check_out": "12:00:00"})
+    assert r.status_code == 200
+
+    incremental = _rollup(db, today.year, today.month)
+    assert incremental[1] == (1, 240, 1)
+    assert incremental[3][0] == 1
+    assert 2 not in incremental
+
+    rebuild_rollups(db, today.year, today.month)
+    db.commit()
+    assert _rollup(db, today.year, today.month) == incremental
+
+
+def test_unbuilt_month_reads_raw_rows_until_backfilled(db):
+    year, month = _months_ago(date.today(), 3)
+    # ghi thẳng vào attendances (như DB cũ chưa có rollup); dòng không check_in không tính
+    for emp_id, day, check_in in [(1, 2, time(8)), (1, 3, time(8)), (2, 3, time(8)), (2, 4, None)]:
+        db.add(Attendance(employee_id=emp_id, date=date(year, month, day), check_in=check_in))
+    db.commit()
+
+    assert not is_rolled_up(db, year, month)
+    assert _rollup(db, year, month) == {}
+    assert present_days_by_employee(db, year, month) == {1: 2, 2: 1}
+
+    assert (year, month) in backfill_rollups(db)
+    assert is_rolled_up(db, year, month)
+    assert _rollup(db, year, month)[1][0] == 2
+    assert present_days_by_employee(db, year, month) == {1: 2, 2: 1}
+    assert backfill_rollups(db) == []
+
+
+
+def test_startup_backfill_runs_only_in_lock_holder(db):
+    year, month = _months_ago(date.today(), 3)
+    db.add(Attendance(employee_id=1, date=date(year, month, 2), check_in=time(8)))
+    db.commit()
+
+    # worker khác đang giữ khoá -> worker này bỏ qua
+    with leader_lock("attendance_rollup_backfill") as leader:
+        assert leader
+        _backfill_rollup_leader()
+        assert not is_rolled_up(db, year, month)
+
+    _backfill_rollup_leader()
+    assert is_rolled_up(db, year, month)
+
+def test_concurrent_writes_to_different_days_keep_both_days(db):
+    """
+    2 session ghi 2 ngày khác nhau của cùng nhân viên, session sau ghi khi
+    session trước chưa commit: rollup phải có đủ cả 2 ngày.
+    """
+    year, month = _months_ago(date.today(), 1)
+    a_flushed, b_started = threading.Event(), threading.Event()
+    errors = []
+
+    def write_day(day: int):
+        session = SessionLocal()
+        try:
+            d = date(year, month, day)
+            session.add(Attendance(employee_id=1, date=d, check_in=time(8), check_out=time(9)))
+            session.flush()
+            apply_day_changes(session, [(1, d, None, (time(8), time(9)))])
+            if day == 1:
+                a_flushed.set()
+                b_started.wait(5)
+                threading.Event().wait(0.2)  # để B chạy chen vào trước khi A commit
+            session.commit()
+        except Exception as e:  # pragma: no cover - in lỗi ra assert bên dưới
+            errors.append(e)
+        finally:
+            session.close()
+
+    a = threading.Thread(target=write_day, args=(1,))
+    a.start()
+    assert a_flushed.wait(5)
+    b = threading.Thread(target=lambda: (b_started.set(), write_day(2)))
+    b.start()
+    a.join()
+    b.join()
+    assert errors == []
+
+    incremental = _rollup(db, year, month)
+    assert incremental[1] == (2, 120, 0b11)
+    rebuild_rollups(db, year, month)
+    db.commit()
+    assert _rollup(db, year, month) == incremental
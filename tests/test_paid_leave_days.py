@@ -0,0 +1,42 @@
+from datetime import date
+
+from app.models.leave_request import LeaveRequest
+from app.services.month_calendar import count_days
+from app.services.payroll_service import (
+    paid_leave_days_by_employee,
+    paid_leave_masks_by_employee,
+)
+
+
+def _leave(employee_id, start, end, status="approved"):
+    return LeaveRequest(
+        employee_id=employee_id, start_date=start, end_date=end, reason="x", status=status
+    )
+
+
+def test_overlapping_leaves_count_each_day_once(db):
+    db.add_all(
+        [
+            # nhân viên 1: 2 đơn trùng nhau 3 ngày (10-12) + 1 đơn nằm gọn trong đơn đầu
+            _leave(1, date(2025, 3, 5), date(2025, 3, 12)),
+            _leave(1, date(2025, 3, 10), date(2025, 3, 14)),
+            _leave(1, date(2025, 3, 6), date(2025, 3, 7)),
+            # nhân viên 2: đơn vắt qua 2 tháng -> chỉ tính phần trong tháng 3
+            _leave(2, date(2025, 2, 25), date(2025, 3, 2)),
+            _leave(2, date(2025, 3, 31), date(2025, 4, 3)),
+            # đơn chưa duyệt / bị từ chối không tính
+            _leave(3, date(2025, 3, 1), date(2025, 3, 5), status="pending"),
+            _leave(4, date(2025, 3, 1), date(2025, 3, 5), status="rejected"),
+        ]
+    )
+    db.commit()
+
+    days = paid_leave_days_by_employee(db, 2025, 3)
+    assert days == {1: 10, 2: 3}
+
+    # cùng kết quả với đường bitmask (heatmap / ma trận)
+    masks = paid_leave_masks_by_employee(db, 2025, 3)
+    assert {emp: count_days(mask) for emp, mask in masks.items()} == days
+
+    assert paid_leave_days_by_employee(db, 2025, 3, [2]) == {2: 3}
+    assert paid_leave_days_by_employee(db, 2025, 2) == {2: 4}
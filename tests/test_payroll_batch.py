@@ -0,0 +1,57 @@
+from app.models.payroll import Payroll
+from app.services.slip_cache import slip_cache
+
+
+def _batch(client, headers, **body):
+    r = client.post(
+        "/payrolls/calculate-batch",
+        headers=headers,
+        json={"year": 2025, "month": 3, "default_daily_salary": 500000, **body},
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def _slip(client, headers, employee_id=1):
+    r = client.get(
+        "/reports/payroll-slip-pdf",
+        headers=headers,
+        params={"employee_id": employee_id, "year": 2025, "month": 3},
+    )
+    assert r.status_code == 200
+    return r
+
+
+def test_batch_result_counts_created_and_updated_separately(client, db, admin_headers):
+    first = _batch(client, admin_headers, department="Sales")
+    assert (first["created"], first["updated"], first["failed"]) == (2, 0, 0)
+
+    again = _batch(client, admin_headers, mode="recalculate")
+    assert (again["created"], again["updated"], again["failed"]) == (2, 2, 0)
+    statuses = {item["employee_id"]: item["status"] for item in again["items"]}
+    assert statuses == {1: "recalculated", 2: "created", 3: "recalculated", 4: "created"}
+
+
+def test_batch_recalculate_invalidates_cached_slip(client, db, admin_headers):
+    _batch(client, admin_headers)
+    before = _slip(client, admin_headers)
+    payroll_id = db.query(Payroll.id).filter_by(employee_id=1, year=2025, month=3).scalar()
+    assert list((slip_cache.dir / str(payroll_id)).glob("*.pdf"))
+
+    _batch(client, admin_headers, mode="recalculate", default_deductions=100000)
+    # bản cache của số liệu cũ đã bị xoá ngay sau khi commit
+    assert not list((slip_cache.dir / str(payroll_id)).glob("*.pdf"))
+
+    after = _slip(client, admin_headers)
+    assert after.headers["ETag"] != before.headers["ETag"]
+    db.expire_all()
+    assert db.get(Payroll, payroll_id).deductions == 100000
+
+
+def test_slip_batch_rejects_invalid_month(client, admin_headers):
+    r = client.post(
+        "/reports/payroll-slips/batch",
+        headers=admin_headers,
+        json={"year": 2025, "month": 13},
+    )
+    assert r.status_code == 422
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.database import engine
+from app.models.attendance import Attendance, PunchDeadLetter
+from app.services import punch_buffer as punch_buffer_module
+from app.services.punch_buffer import CLOCK_IN, CLOCK_OUT, PunchBuffer
+
+
+@pytest.fixture
+def make_buffer(tmp_path):
+    buffers = []
+
+    def make():
+        # flusher nền gần như không tự chạy: test gọi flush() trực tiếp
+        b = PunchBuffer(path=tmp_path / "journal.sqlite3", interval_ms=600_000)
+        b.start()
+        buffers.append(b)
+        return b
+
+    yield make
+    for b in buffers:
+        b.stop()
+
+
+def _punches(db):
+    db.expire_all()
+    return {
+        a.employee_id: (a.check_in, a.check_out)
+        for a in db.query(Attendance).order_by(Attendance.employee_id)
+    }
+
+
+def test_journal_replayed_after_failed_flush(db, make_buffer, monkeypatch):
+    now = datetime.now().replace(microsecond=0)
+    b = make_buffer()
+    b.append(CLOCK_IN, 1, now - timedelta(minutes=10))
+    b.append(CLOCK_IN, 1, now - timedelta(minutes=20))  # giờ vào sớm nhất thắng
+    b.append(CLOCK_IN, 2, now - timedelta(minutes=5))
+    b.append(CLOCK_OUT, 1, now)
+
+    def db_down():
+        raise OperationalError("SELECT 1", {}, Exception("DB chính mất kết nối"))
+
+    monkeypatch.setattr(punch_buffer_module, "SessionLocal", db_down)
+    with pytest.raises(OperationalError):
+        b.flush()
+    assert b.metrics()["queue_depth"] == 4
+    b.stop()  # flush lúc tắt cũng lỗi -> journal giữ nguyên
+    assert _punches(db) == {}
+
+    monkeypatch.undo()
+    b2 = make_buffer()
+    assert b2.metrics()["replayed_on_startup"] == 4
+    assert b2.flush() == 4
+    assert b2.metrics()["queue_depth"] == 0
+
+    punches = _punches(db)
+    assert punches[1] == ((now - timedelta(minutes=20)).time(), now.time())
+    assert punches[2] == ((now - timedelta(minutes=5)).time(), None)
+
+    # ghi lại lượt đã ghi (commit xong nhưng chưa kịp xoá journal) không đổi gì
+    b2.append(CLOCK_IN, 1, now - timedelta(minutes=10))
+    b2.flush()
+    assert _punches(db) == punches
+
+
+def test_rows_failing_alone_go_to_dead_letter(db, make_buffer):
+    # SQLite mặc định không kiểm tra khoá ngoại -> bật để nhân viên 99 gây lỗi
+    def enable_fk(conn, _):
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    event.listen(engine, "connect", enable_fk)
+    engine.dispose()
+    try:
+        now = datetime.now().replace(microsecond=0)
+        b = make_buffer()
+        b.append(CLOCK_IN, 1, now)
+        b.append(CLOCK_IN, 99, now)
+        b.append(CLOCK_IN, 2, now)
+        assert b.flush() == 3
+    finally:
+        event.remove(engine, "connect", enable_fk)
+        engine.dispose()
+
+    assert set(_punches(db)) == {1, 2}
+    dead = db.query(PunchDeadLetter).all()
+    assert [(d.kind, d.employee_id) for d in dead] == [(CLOCK_IN, 99)]
+    assert b.metrics()["dead_letters"] == 1
+    assert b.metrics()["queue_depth"] == 0
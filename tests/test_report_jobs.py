@@ -0,0 +1,79 @@
+import time
+from datetime import datetime, timedelta
+
+from app.models.report_job import ReportJob
+from app.services.report_jobs import (
+    JOB_DIR,
+    RETENTION_SECONDS,
+    STALE_SECONDS,
+    report_jobs,
+)
+
+
+def _job(db, job_id, status, age_seconds, **values):
+    at = datetime.utcnow() - timedelta(seconds=age_seconds)
+    db.add(
+        ReportJob(
+            id=job_id, report_type="payroll-excel", filters="{}", owner_id=1,
+            status=status, processed_rows=0, created_at=at, heartbeat_at=at, **values,
+        )
+    )
+    db.commit()
+
+
+def _status(db, job_id):
+    db.expire_all()
+    job = db.get(ReportJob, job_id)
+    return job.status if job else None
+
+
+def test_purge_only_expires_terminal_jobs_and_skips_jobs_held_here(db):
+    old = RETENTION_SECONDS + STALE_SECONDS + 60
+    past = datetime.utcnow() - timedelta(seconds=1)
+    JOB_DIR.mkdir(parents=True, exist_ok=True)
+    (JOB_DIR / "done_file.xlsx").write_bytes(b"x")
+
+    _job(db, "done", "done", old, expires_at=past, file_name="done_file.xlsx")
+    # expires_at sót lại trên job còn chạy: không được xoá
+    _job(db, "running_expired", "running", 0, expires_at=past)
+    _job(db, "queued_here", "queued", old)
+    _job(db, "queued_dead", "queued", old)
+    _job(db, "running_dead", "running", STALE_SECONDS + 60)
+
+    with report_jobs._lock:
+        report_jobs._mine.add("queued_here")
+    try:
+        report_jobs.purge_expired(db)
+    finally:
+        with report_jobs._lock:
+            report_jobs._mine.discard("queued_here")
+
+    assert _status(db, "done") is None
+    assert not (JOB_DIR / "done_file.xlsx").exists()
+    assert _status(db, "running_expired") == "running"
+    # vẫn còn trong executor của process này -> chưa bị coi là chết
+    assert _status(db, "queued_here") == "queued"
+    assert _status(db, "queued_dead") == "failed"
+    assert _status(db, "running_dead") == "failed"
+
+
+def test_excel_job_renders_in_process_pool(client, admin_headers):
+    r = client.post(
+        "/reports/jobs",
+        headers=admin_headers,
+        json={"report_type": "attendance-excel"},
+    )
+    assert r.status_code == 202
+    job_id = r.json()["id"]
+
+    deadline = time.monotonic() + 60
+    while True:
+        job = client.get(f"/reports/jobs/{job_id}", headers=admin_headers).json()
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            break
+        time.sleep(0.2)
+    assert job["status"] == "done", job
+
+    r = client.get(job["download_url"], headers=admin_headers)
+    assert r.status_code == 200
+    assert r.content[:2] == b"PK"  # xlsx = file zip